@@ -0,0 +1,957 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+@File    :   benchmarks.py
+@Time    :   2026/10/18 10:02:11
+@Author  :   Ysm
+@Contact :   rootlulu@163.com
+
+Measure the excel_utils hot paths on the synthetic workbooks.
+
+    python benchmarks.py read_memory --rows 100000
+    python benchmarks.py write_memory --rows 100000
+    python benchmarks.py style_cache --rows 10000
+    python benchmarks.py extend --rows 10000
+    python benchmarks.py records_memory --rows 100000
+    python benchmarks.py read_rows --rows 500000
+    python benchmarks.py sheet_cache --rows 100000
+    python benchmarks.py async_latency --rows 100000
+    python benchmarks.py native_write --rows 100000
+    python benchmarks.py fast_read --rows 100000
+    python benchmarks.py lazy_strings --rows 300000
+    python benchmarks.py compression --rows 100000
+    python benchmarks.py style_rules --rows 100000
+    python benchmarks.py autofit --rows 100000
+    python benchmarks.py row_style --rows 20000 --cols 100
+    python benchmarks.py template --rows 500
+    python benchmarks.py render_many --rows 20000
+
+Run the suite of the hot paths at several sizes, write the results in json
+and compare them with the stored baseline, exit with 1 if it's regressed or
+a case isn't in both of them, so the baseline is updated with the cases.
+
+    python benchmarks.py --suite --json results.json --baseline benchmarks_baseline.json
+    python benchmarks.py --suite --sizes 500x10 --update-baseline benchmarks_baseline.json
+"""
+
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing as t
+
+import openpyxl
+from openpyxl import Workbook as WB
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.styles import PatternFill
+
+from excel_utils import AsyncWorkSheet
+from excel_utils import COL_NAMES
+from excel_utils import COMPRESSIONS
+from excel_utils import CellStyler
+from excel_utils import SheetCache
+from excel_utils import TemplateCache
+from excel_utils import WorkSheet
+from excel_utils import _RowIndex
+from excel_utils import _StyleCache
+from excel_utils import render_many
+
+
+def make_workbook(
+    filename: str,
+    rows: int,
+    cols: int = 10,
+    title: str = "Sheet1",
+    styled: bool = False,
+) -> str:
+    """write a synthetic workbook whose first row is the headers.
+    the workbook is written in write_only mode, so it's cheap even for a big one.
+    the cells are in 3 fonts and fills alternately if it's styled.
+    """
+    wb = WB(write_only=True)
+    ws = wb.create_sheet(title)
+    ws.append([f"col{i}" for i in range(cols)])
+    styles = [
+        (Font(bold=True), PatternFill()),
+        (Font(color="00FF0000"), PatternFill("solid", fgColor="00FFFF00")),
+        (Font(italic=True, size=14), PatternFill()),
+    ]
+    for r in range(rows):
+        row = [f"text{r}" if i % 2 else r * i for i in range(cols)]
+        if styled:
+            font, fill = styles[r % len(styles)]
+            cells = []
+            for value in row:
+                cell = WriteOnlyCell(ws, value)
+                cell.font, cell.fill = font, fill
+                cells.append(cell)
+            row = cells
+        ws.append(row)
+    wb.save(filename)
+    return filename
+
+
+def measure(func: t.Callable, *args, **kwargs) -> t.Dict:
+    """call the func twice, return its seconds and its peak traced memory.
+    the seconds is from the untraced call because the tracemalloc is slow.
+    """
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(seconds, 4), "peak_bytes": peak}
+
+
+def _consume(filename: str, **kwargs) -> None:
+    with WorkSheet(filename, **kwargs) as ws:
+        for _ in ws.to_dict():
+            pass
+
+
+def bench_read_memory(rows: int, cols: int) -> t.Dict:
+    """compare the peak memory of to_dict in full-load and read_only mode."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = make_workbook(os.path.join(tmp, "read.xlsx"), rows, cols)
+        return {
+            "full": measure(_consume, filename),
+            "read_only": measure(_consume, filename, read_only=True),
+        }
+
+
+STYLES = [
+    {"color": "00FF0000", "bold": True},
+    {"size": 14, "fgColor": "00FFFF00", "fill_type": "solid"},
+    {"italic": True},
+]
+
+
+def _append(
+    filename: str, rows: int, cols: int, styled: bool = False, **kwargs
+) -> None:
+    if os.path.exists(filename):
+        os.remove(filename)
+    with WorkSheet(filename, **kwargs) as ws:
+        ws.append([f"col{i}" for i in range(cols)])
+        for r in range(rows):
+            ws.append(
+                [f"text{r}" if i % 2 else r * i for i in range(cols)],
+                style=STYLES[r % len(STYLES)] if styled else None,
+            )
+
+
+def bench_write_memory(rows: int, cols: int) -> t.Dict:
+    """compare the peak memory of append in full and write_only mode."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "write.xlsx")
+        return {
+            "full": measure(_append, filename, rows, cols),
+            "write_only": measure(
+                _append, filename, rows, cols, write_only=True
+            ),
+        }
+
+
+def _rows_per_sec(func: t.Callable, rows: int, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return round(rows / (time.perf_counter() - start), 1)
+
+
+def bench_style_cache(rows: int, cols: int) -> t.Dict:
+    """compare the styled append throughput with and without the style cache."""
+    cache = CellStyler.CACHE
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "style.xlsx")
+        try:
+            res = {}
+            for name, maxsize in (("uncached", 0), ("cached", 1024)):
+                CellStyler.CACHE = _StyleCache(maxsize)
+                res[f"{name}_rows_per_sec"] = _rows_per_sec(
+                    _append, rows, filename, rows, cols, styled=True
+                )
+            return res
+        finally:
+            CellStyler.CACHE = cache
+
+
+def _append_dicts(filename: str, rows: t.List[dict], bulk: bool) -> float:
+    """return the rows/sec of appending, the saving is not included."""
+    ws = WorkSheet(filename)
+    try:
+        start = time.perf_counter()
+        if bulk:
+            ws.extend(rows, style=STYLES)
+        else:
+            for row in rows:
+                ws.append(row, style=STYLES)
+        return round(len(rows) / (time.perf_counter() - start), 1)
+    finally:
+        ws.close(save=False)
+
+
+def bench_extend(rows: int, cols: int) -> t.Dict:
+    """compare the styled dict rows throughput of append and extend."""
+    data = [
+        {f"col{i}": f"text{r}" if i % 2 else r * i for i in range(cols)}
+        for r in range(rows)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "extend.xlsx")
+        return {
+            "append_rows_per_sec": _append_dicts(filename, data, bulk=False),
+            "extend_rows_per_sec": _append_dicts(filename, data, bulk=True),
+        }
+
+
+def bench_native_write(rows: int, cols: int) -> t.Dict:
+    """compare the rows/sec of appending and saving in write_only mode by the
+    openpyxl and the native engine, and the file sizes of them.
+    """
+    res = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "native.xlsx")
+        for name, kwargs in (
+            ("openpyxl", {}),
+            ("native", {"engine": "native"}),
+            ("native_shared", {"engine": "native", "shared_strings": True}),
+            ("native_level1", {"engine": "native", "compresslevel": 1}),
+        ):
+            for styled in (False, True):
+                key = f"{name}/styled" if styled else name
+                res[key] = {
+                    "rows_per_sec": _rows_per_sec(
+                        _append,
+                        rows,
+                        filename,
+                        rows,
+                        cols,
+                        styled=styled,
+                        write_only=True,
+                        **kwargs,
+                    ),
+                    "bytes": os.path.getsize(filename),
+                }
+        return res
+
+
+def bench_fast_read(rows: int, cols: int) -> t.Dict:
+    """compare the rows/sec of to_dict in read_only mode by the openpyxl and
+    the fast engine, on the file with the dimension or without.
+    """
+    res = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # the openpyxl write_only file is without the dimension.
+        unsized = make_workbook(os.path.join(tmp, "unsized.xlsx"), rows, cols)
+        sized = os.path.join(tmp, "sized.xlsx")
+        _append(sized, rows, cols, write_only=True, engine="native")
+        for name, filename in (("unsized", unsized), ("sized", sized)):
+            for engine in ("openpyxl", "fast"):
+                res[f"{name}/{engine}"] = _rows_per_sec(
+                    _consume, rows, filename, read_only=True, engine=engine
+                )
+        return res
+
+
+def _first_row(filename: str, **kwargs) -> None:
+    with WorkSheet(filename, read_only=True, **kwargs) as ws:
+        next(ws.to_dict())
+
+
+def bench_lazy_strings(rows: int, cols: int) -> t.Dict:
+    """compare the seconds and the peak memory to the first row of to_dict,
+    and the rows/sec of the whole to_dict, with the shared strings loaded
+    eagerly or lazily. all the strings of the file are unique.
+    """
+    res = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "strings.xlsx")
+        with WorkSheet(
+            filename, write_only=True, engine="native", shared_strings=True
+        ) as ws:
+            ws.append([f"col{i}" for i in range(cols)])
+            for r in range(rows):
+                ws.append([f"text{r}/{i}" for i in range(cols)])
+        for engine in ("openpyxl", "fast"):
+            for lazy in (False, True):
+                key = f"{engine}/lazy" if lazy else engine
+                res[key] = {
+                    "first_row": measure(
+                        _first_row, filename, engine=engine, lazy_strings=lazy
+                    ),
+                    "rows_per_sec": _rows_per_sec(
+                        _consume,
+                        rows,
+                        filename,
+                        read_only=True,
+                        engine=engine,
+                        lazy_strings=lazy,
+                    ),
+                }
+        return res
+
+
+def bench_compression(rows: int, cols: int) -> t.Dict:
+    """compare the save seconds and the file size of the compression presets,
+    in the full mode and in write_only mode by the native engine.
+    """
+    res = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "compression.xlsx")
+        for name, kwargs in (
+            ("full", {}),
+            ("native", {"write_only": True, "engine": "native"}),
+        ):
+            for compression in (None, *COMPRESSIONS):
+                if os.path.exists(filename):
+                    os.remove(filename)
+                ws = WorkSheet(filename, compression=compression, **kwargs)
+                ws.append([f"col{i}" for i in range(cols)])
+                for r in range(rows):
+                    ws.append(
+                        [f"text{r}" if i % 2 else r * i for i in range(cols)]
+                    )
+                res[f"{name}/{compression or 'default'}"] = {
+                    "save_seconds": _seconds(ws.close),
+                    "bytes": os.path.getsize(filename),
+                }
+        return res
+
+
+ZEBRA = {"fgColor": "00EEEEEE", "fill_type": "solid"}
+NEGATIVE = {"color": "00FF0000"}
+
+
+def _style_per_cell(ws: WorkSheet, rows: t.List[list]) -> None:
+    """style the header, the stripes and the negatives while appending."""
+    ws.append([f"col{i}" for i in range(len(rows[0]))], style={"bold": True})
+    for r, row in enumerate(rows):
+        ws.append(
+            row,
+            style=[
+                {**(ZEBRA if r % 2 else {}), **(NEGATIVE if v < 0 else {})}
+                for v in row
+            ],
+        )
+
+
+def _style_by_rules(ws: WorkSheet, rows: t.List[list]) -> None:
+    """style the same cells by the rules applied in one pass."""
+    ws.append([f"col{i}" for i in range(len(rows[0]))])
+    ws.extend(rows)
+    ws.add_style_rule({"bold": True}, rows="header")
+    ws.add_style_rule(ZEBRA, rows=slice(3, None, 2))
+    ws.add_style_rule(NEGATIVE, when=lambda v: v < 0)
+    ws._apply_style_rules()
+
+
+def bench_style_rules(rows: int, cols: int) -> t.Dict:
+    """compare the seconds of styling the header, the stripes and the
+    negatives cell by cell while appending, and by the rules, the appending
+    without the style is the baseline. the saving isn't included.
+    """
+    data = [[(r * i) % 7 - 3 for i in range(cols)] for r in range(rows)]
+    res = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, func in (
+            ("plain", lambda ws, rows: ws.extend(rows)),
+            ("per_cell", _style_per_cell),
+            ("rules", _style_by_rules),
+        ):
+            ws = WorkSheet(os.path.join(tmp, f"{name}.xlsx"))
+            res[name] = _seconds(func, ws, data)
+            ws.close(save=False)
+        return res
+
+
+def _fit_by_second_pass(ws: WorkSheet, rows: t.List[list]) -> None:
+    """extend the rows and then compute the widths over the rows again."""
+    ws.extend(rows)
+    widths = [0] * len(rows[0])
+    for row in ws.ws.iter_rows(values_only=True):
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], len(str(value)))
+    for i, width in enumerate(widths):
+        ws.set_col_style(COL_NAMES[i], {"width": width + 2})
+
+
+def bench_autofit(rows: int, cols: int) -> t.Dict:
+    """compare the seconds of extending the rows without the widths, with a
+    second pass over the rows for the widths, and with the autofit. the
+    saving isn't included.
+    """
+    data = [
+        [f"名字{r}" if i % 3 == 0 else r * i for i in range(cols)]
+        for r in range(rows)
+    ]
+    res = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, func, autofit in (
+            ("plain", lambda ws, rows: ws.extend(rows), False),
+            ("second_pass", _fit_by_second_pass, False),
+            ("autofit", lambda ws, rows: ws.extend(rows), True),
+        ):
+            ws = WorkSheet(os.path.join(tmp, f"{name}.xlsx"), autofit=autofit)
+            res[name] = _seconds(func, ws, data)
+            if autofit:
+                res[name] += _seconds(ws._before_save)
+            ws.close(save=False)
+        return res
+
+
+SUBTOTAL = {"bold": True, "fgColor": "00DDEBF7", "fill_type": "solid"}
+
+
+def _report(
+    filename: str, rows: int, cols: int, by_row: bool, **kwargs
+) -> None:
+    """write a report whose every 5th row is a subtotal row in bold and
+    filled, styled cell by cell or by the row.
+    """
+    ws = WorkSheet(filename, **kwargs)
+    ws.append([f"col{i}" for i in range(cols)])
+    if by_row:
+        for r in range(2, rows + 2, 5):
+            ws.set_row_style(r, SUBTOTAL)
+    for r in range(rows):
+        style = None if by_row or r % 5 else SUBTOTAL
+        ws.append([r * i for i in range(cols)], style=style)
+    ws.close()
+
+
+def bench_row_style(rows: int, cols: int) -> t.Dict:
+    """compare the seconds of writing and saving a wide report whose
+    subtotal rows are styled cell by cell and by the row, and the file
+    sizes, in the full mode and by the native engine.
+    """
+    res = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, kwargs in (
+            ("full", {}),
+            ("native", {"write_only": True, "engine": "native"}),
+        ):
+            for name, by_row in (("per_cell", False), ("row", True)):
+                filename = os.path.join(tmp, f"{mode}_{name}.xlsx")
+                res[f"{mode}/{name}"] = {
+                    "seconds": _seconds(
+                        _report, filename, rows, cols, by_row, **kwargs
+                    ),
+                    "bytes": os.path.getsize(filename),
+                }
+        return res
+
+
+def bench_template(rows: int, cols: int, reports: int = 20) -> t.Dict:
+    """compare the seconds per report of opening a styled template of the
+    rows, and of rendering a report of 10 rows from it, without and with the
+    TemplateCache. the first report parses the cached template.
+    """
+    res = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        template = make_workbook(
+            os.path.join(tmp, "template.xlsx"), rows, cols, styled=True
+        )
+        data = [[r * i for i in range(cols)] for r in range(10)]
+        for name, cache in (("copy", None), ("cache", TemplateCache())):
+            open_seconds = render_seconds = 0
+            for i in range(reports):
+                filename = os.path.join(tmp, f"{name}{i}.xlsx")
+                start = time.perf_counter()
+                ws = WorkSheet(
+                    filename, template=template, template_cache=cache
+                )
+                open_seconds += time.perf_counter() - start
+                ws.extend(data)
+                ws.close()
+                render_seconds += time.perf_counter() - start
+                os.remove(filename)
+            res[name] = {
+                "open_seconds": round(open_seconds / reports, 4),
+                "render_seconds": round(render_seconds / reports, 4),
+            }
+        return res
+
+
+def _render_serial(template: str, partitions: t.Dict[str, list]) -> None:
+    for filename, rows in partitions.items():
+        with WorkSheet(filename, template=template) as ws:
+            ws.extend(rows)
+
+
+def _render_parallel(template: str, partitions: t.Dict[str, list]) -> None:
+    for res in render_many(template, partitions):
+        if res.error:
+            raise RuntimeError(res.error)
+
+
+def bench_render_many(rows: int, cols: int, files: int = 100) -> t.Dict:
+    """compare the seconds of rendering the files from a template for the
+    partitions of the rows in a serial loop, and by render_many in the
+    process pool of the cpu count, the dict rows are in the same keys.
+    """
+    res = {"cpus": os.cpu_count()}
+    with tempfile.TemporaryDirectory() as tmp:
+        template = make_workbook(os.path.join(tmp, "template.xlsx"), 0, cols)
+        headers = [f"col{i}" for i in range(cols)]
+        for name in ("serial", "render_many"):
+            directory = os.path.join(tmp, name)
+            os.mkdir(directory)
+            partitions = {
+                os.path.join(directory, f"{f}.xlsx"): [
+                    dict(zip(headers, (r * i for i in range(cols))))
+                    for r in range(f, rows, files)
+                ]
+                for f in range(files)
+            }
+            render = _render_serial if name == "serial" else _render_parallel
+            res[name] = _seconds(render, template, partitions)
+        return res
+
+
+def _materialize(filename: str, method: str) -> list:
+    with WorkSheet(filename, read_only=True) as ws:
+        return list(getattr(ws, method)())
+
+
+def bench_records_memory(rows: int, cols: int) -> t.Dict:
+    """compare the peak memory of the rows kept by to_dict and to_records."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = make_workbook(os.path.join(tmp, "records.xlsx"), rows, cols)
+        res = {
+            method: measure(_materialize, filename, method)
+            for method in ("to_dict", "to_records")
+        }
+        for item in res.values():
+            item["bytes_per_row"] = item["peak_bytes"] // max(rows, 1)
+        return res
+
+
+def _seconds(func: t.Callable, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return round(time.perf_counter() - start, 4)
+
+
+def _last_page(ws: WorkSheet, rows: int, size: int, indexed: bool) -> None:
+    if indexed:
+        list(ws.read_rows(rows + 2 - size))
+    else:
+        list(itertools.islice(ws.to_dict(), rows - size, None))
+
+
+def bench_read_rows(rows: int, cols: int, size: int = 500) -> t.Dict:
+    """compare the seconds of reading the last page by to_dict and read_rows
+    in read_only mode, the first read_rows builds the row index and the
+    second one reuses it. the opening isn't included, which scans the whole
+    sheet in openpyxl while there isn't the dimension in the sheet xml.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = make_workbook(os.path.join(tmp, "rows.xlsx"), rows, cols)
+        res = {}
+        for name, indexed in (
+            ("to_dict", False),
+            ("read_rows_build", True),
+            ("read_rows", True),
+        ):
+            with WorkSheet(filename, read_only=True) as ws:
+                res[name] = _seconds(_last_page, ws, rows, size, indexed)
+        res["index_bytes"] = os.path.getsize(filename + _RowIndex.SUFFIX)
+        return res
+
+
+def bench_sheet_cache(rows: int, cols: int) -> t.Dict:
+    """compare the seconds of to_dict in read_only mode without the cache, in
+    the cache missing, which dumps the snapshot, and in the cache hitting.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = make_workbook(os.path.join(tmp, "cache.xlsx"), rows, cols)
+        cache = SheetCache(os.path.join(tmp, "cache"))
+        res = {"uncached": _seconds(_consume, filename, read_only=True)}
+        for name in ("miss", "hit"):
+            res[name] = _seconds(
+                _consume, filename, read_only=True, cache=cache
+            )
+        res["cache_bytes"] = cache.size()
+        res["file_bytes"] = os.path.getsize(filename)
+        return res
+
+
+async def _max_lag(coro: t.Awaitable, interval: float = 0.01) -> float:
+    """return the max lag of a ticker on the event loop while awaiting."""
+    lag = 0.0
+
+    async def tick():
+        nonlocal lag
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = max(lag, time.perf_counter() - start - interval)
+
+    ticker = asyncio.ensure_future(tick())
+    await asyncio.sleep(0)
+    try:
+        await coro
+        # let the ticker wake up to measure the last lag.
+        await asyncio.sleep(interval * 2)
+    finally:
+        ticker.cancel()
+    return round(lag, 4)
+
+
+async def _read_blocking(filename: str) -> None:
+    _consume(filename, read_only=True)
+
+
+async def _read_async(filename: str) -> None:
+    async with AsyncWorkSheet(filename, read_only=True) as ws:
+        async for _ in ws.to_dict():
+            pass
+
+
+def bench_async_latency(rows: int, cols: int) -> t.Dict:
+    """compare the max event loop lag while reading by the WorkSheet in the
+    loop and by the AsyncWorkSheet.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = make_workbook(os.path.join(tmp, "async.xlsx"), rows, cols)
+        return {
+            "blocking_max_lag": asyncio.run(
+                _max_lag(_read_blocking(filename))
+            ),
+            "async_max_lag": asyncio.run(_max_lag(_read_async(filename))),
+        }
+
+
+SIZES = ((500, 10), (2000, 10), (1000, 40))
+TOLERANCE = 0.5
+# the regression less than it in seconds is the noise.
+MIN_SECONDS = 0.005
+
+
+def calibrate(repeat: int = 10) -> float:
+    """return the seconds of a fixed pure python loop, the suite results are
+    divided by it, so they can be compared across the machines.
+    """
+
+    def loop():
+        values = {}
+        for i in range(200000):
+            values[i % 1000] = str(i)
+
+    return _best(loop, repeat=repeat)
+
+
+def _best(
+    run: t.Callable,
+    setup: t.Optional[t.Callable] = None,
+    teardown: t.Optional[t.Callable] = None,
+    repeat: int = 3,
+    budget: float = 0.0,
+) -> float:
+    """return the min seconds of the run in the repeats, the setup and the
+    teardown are not timed. the run takes the result of the setup if any.
+    it's repeated until the budget seconds is used up at most 10 times of
+    the repeat, so the short one is repeated more to reduce the noise.
+    """
+    best, used = float("inf"), 0.0
+    for i in range(repeat * 10):
+        if i >= repeat and used >= budget:
+            break
+        state = setup() if setup else None
+        start = time.perf_counter()
+        try:
+            run(state) if setup else run()
+            seconds = time.perf_counter() - start
+            best, used = min(best, seconds), used + seconds
+        finally:
+            if teardown:
+                teardown(state)
+    return best
+
+
+def _read(filename: str, **kwargs) -> None:
+    # the unmodified workbook isn't saved on close, so only reading is timed.
+    with WorkSheet(filename, skip_unmodified=True) as ws:
+        for _ in ws.to_dict(**kwargs):
+            pass
+
+
+def _suite_cases(tmp: str, rows: int, cols: int) -> t.Dict[str, t.Tuple]:
+    """return the cases in {name: (run, setup, teardown)} of the size."""
+    size = f"{rows}x{cols}"
+    headers = [f"col{i}" for i in range(cols)]
+    lists = [
+        [f"text{r}" if i % 2 else r * i for i in range(cols)]
+        for r in range(rows)
+    ]
+    dicts = [dict(zip(headers, row)) for row in lists]
+    col_mapping = {k: k.upper() for k in headers[::2]}
+    cases = {}
+    for styled in (False, True):
+        suffix = f"{size}/styled" if styled else size
+        filename = make_workbook(
+            os.path.join(tmp, f"read_{suffix.replace('/', '_')}.xlsx"),
+            rows,
+            cols,
+            styled=styled,
+        )
+        for name, kwargs in (
+            ("plain", {}),
+            ("show_col_names", {"show_col_names": True}),
+            ("col_mapping", {"col_mapping": col_mapping}),
+        ):
+            cases[f"to_dict/{name}/{suffix}"] = (
+                functools.partial(_read, filename, **kwargs),
+                None,
+                None,
+            )
+        for engine in ("openpyxl", "fast"):
+            cases[f"read_only/{engine}/{suffix}"] = (
+                functools.partial(
+                    _consume, filename, read_only=True, engine=engine
+                ),
+                None,
+                None,
+            )
+
+    new_file = os.path.join(tmp, "write.xlsx")
+
+    def new_sheet(compression=None):
+        if os.path.exists(new_file):
+            os.remove(new_file)
+        return WorkSheet(new_file, compression=compression)
+
+    def autofit_sheet():
+        if os.path.exists(new_file):
+            os.remove(new_file)
+        return WorkSheet(new_file, autofit=True)
+
+    def filled_sheet(styled=False, compression=None):
+        ws = new_sheet(compression)
+        ws.append(headers)
+        for row in lists:
+            ws.append(row, style=STYLES if styled else None)
+        return ws
+
+    def discard(ws):
+        ws.close(save=False)
+
+    def append_rows(rows, style=None):
+        def run(ws):
+            for row in rows:
+                ws.append(row, style=style)
+
+        return run
+
+    cases[f"append/list/{size}"] = (append_rows(lists), new_sheet, discard)
+    cases[f"append/dict/{size}"] = (append_rows(dicts), new_sheet, discard)
+    cases[f"extend/autofit/{size}"] = (
+        lambda ws: ws.extend(lists),
+        autofit_sheet,
+        discard,
+    )
+    cases[f"append/styled/{size}"] = (
+        append_rows(lists, style=STYLES),
+        new_sheet,
+        discard,
+    )
+
+    def set_col_styles(ws):
+        for i in range(cols):
+            ws.set_col_style(COL_NAMES[i], {"width": 20})
+
+    def set_row_styles(ws):
+        for i in range(1, rows + 2):
+            ws.set_row_style(i, {"height": 20})
+
+    def style_rules(ws):
+        ws.add_style_rule({"bold": True}, rows="header")
+        ws.add_style_rule({"fgColor": "00EEEEEE"}, rows=slice(3, None, 2))
+        ws.add_style_rule({"color": "00FF0000"}, when=lambda v: v == 0)
+        ws._apply_style_rules()
+
+    cases[f"set_col_style/{size}"] = (set_col_styles, filled_sheet, discard)
+    cases[f"style_rules/{size}"] = (style_rules, filled_sheet, discard)
+    cases[f"set_row_style/{size}"] = (set_row_styles, filled_sheet, discard)
+    for styled in (False, True):
+        suffix = f"{size}/styled" if styled else size
+        for engine in ("openpyxl", "native"):
+            cases[f"write_only/{engine}/{suffix}"] = (
+                functools.partial(
+                    _append,
+                    new_file,
+                    rows,
+                    cols,
+                    styled=styled,
+                    write_only=True,
+                    engine=engine,
+                ),
+                None,
+                None,
+            )
+        cases[f"save/{suffix}"] = (
+            lambda ws: ws.close(),
+            functools.partial(filled_sheet, styled),
+            None,
+        )
+        for compression in COMPRESSIONS:
+            cases[f"save/{compression}/{suffix}"] = (
+                lambda ws: ws.close(),
+                functools.partial(filled_sheet, styled, compression),
+                None,
+            )
+    return cases
+
+
+def run_suite(
+    sizes: t.Sequence[t.Tuple[int, int]] = SIZES, repeat: int = 3
+) -> t.Dict:
+    """run the cases of the sizes, the seconds of a case is the min one in
+    the repeats, and the normalized one is divided by the calibration.
+    """
+    calibration = calibrate()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows, cols in sizes:
+            for name, (run, setup, teardown) in _suite_cases(
+                tmp, rows, cols
+            ).items():
+                seconds = _best(
+                    run, setup, teardown, repeat=repeat, budget=1.0
+                )
+                results[name] = {"seconds": round(seconds, 6)}
+    # the machine may be busy while calibrating, so calibrate it again.
+    calibration = min(calibration, calibrate())
+    for res in results.values():
+        res["normalized"] = round(res["seconds"] / calibration, 4)
+    return {
+        "calibration": round(calibration, 6),
+        "python": platform.python_version(),
+        "openpyxl": openpyxl.__version__,
+        "results": results,
+    }
+
+
+def compare(
+    current: t.Dict, baseline: t.Dict, tolerance: float = TOLERANCE
+) -> t.Tuple[t.List[str], t.List[str], t.List[str]]:
+    """compare the normalized results with the baseline, return the report
+    lines, the regressed cases, whose ratio is more than 1 + tolerance and
+    whose seconds is more than the baseline's by MIN_SECONDS at least, and
+    the unmatched cases, which are in the results or the baseline only.
+    """
+    lines, regressed, unmatched = [], [], []
+    base = baseline.get("results", {})
+    for name, res in sorted(current["results"].items()):
+        if name not in base:
+            lines.append(f"{name:40} {res['seconds']:10.4f}s  NO BASELINE")
+            unmatched.append(name)
+            continue
+        ratio = res["normalized"] / base[name]["normalized"]
+        slower = res["seconds"] - base[name]["seconds"]
+        status = "ok"
+        if ratio > 1 + tolerance and slower > MIN_SECONDS:
+            status = "REGRESSED"
+            regressed.append(name)
+        elif ratio < 1 - tolerance:
+            status = "improved"
+        lines.append(
+            f"{name:40} {res['seconds']:10.4f}s  x{ratio:.2f}  {status}"
+        )
+    for name in sorted(set(base) - set(current["results"])):
+        lines.append(f"{name:40} {'':10}   MISSING")
+        unmatched.append(name)
+    return lines, regressed, unmatched
+
+
+def _size(value: str) -> t.Tuple[int, int]:
+    rows, _, cols = value.partition("x")
+    return int(rows), int(cols)
+
+
+BENCHMARKS = {
+    "read_memory": bench_read_memory,
+    "write_memory": bench_write_memory,
+    "style_cache": bench_style_cache,
+    "extend": bench_extend,
+    "records_memory": bench_records_memory,
+    "read_rows": bench_read_rows,
+    "sheet_cache": bench_sheet_cache,
+    "async_latency": bench_async_latency,
+    "native_write": bench_native_write,
+    "fast_read": bench_fast_read,
+    "lazy_strings": bench_lazy_strings,
+    "compression": bench_compression,
+    "style_rules": bench_style_rules,
+    "autofit": bench_autofit,
+    "row_style": bench_row_style,
+    "template": bench_template,
+    "render_many": bench_render_many,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "names", nargs="*", help=f"the benchmarks in {list(BENCHMARKS)}"
+    )
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument(
+        "--suite", action="store_true", help="run the suite of the hot paths"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda v: [_size(size) for size in v.split(",")],
+        default=SIZES,
+        help="the suite sizes, like: 500x10,2000x10",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write the suite results to the file")
+    parser.add_argument("--baseline", help="compare with the baseline file")
+    parser.add_argument(
+        "--update-baseline", help="write the suite results as the baseline"
+    )
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+    if not args.suite:
+        for name in args.names or BENCHMARKS:
+            print(name, BENCHMARKS[name](args.rows, args.cols))
+        return 0
+
+    current = run_suite(args.sizes, repeat=args.repeat)
+    for path in filter(None, (args.json, args.update_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+    if not args.baseline:
+        print(json.dumps(current, indent=2, sort_keys=True))
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    lines, regressed, unmatched = compare(current, baseline, args.tolerance)
+    print("\n".join(lines))
+    if unmatched:
+        print(
+            f"{len(unmatched)} not in both the results and the baseline: "
+            f"{', '.join(unmatched)}, update the baseline."
+        )
+    if regressed:
+        print(f"{len(regressed)} regressed: {', '.join(regressed)}")
+    return 1 if regressed or unmatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,27 +8,462 @@
 @Contact :   rootlulu@163.com
 """
 
+import array
+import asyncio
+import bisect
+import contextlib
+import copy
+import datetime
+import functools
+import hashlib
+import itertools
+import json
+import keyword
 import logging as log
+import math
+import mmap
+import multiprocessing
 import os
+import pickle
+import posixpath
+import re
 import shutil
+import struct
+import tempfile
+import threading
+import time
 import traceback
 import typing as t
+import unicodedata
+import warnings
+import zipfile
+import zlib
+from collections import OrderedDict
+from collections import defaultdict
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from concurrent.futures import wait
+from queue import Empty
+from queue import Full
+from xml.etree import ElementTree
+from xml.parsers import expat
+from xml.sax.saxutils import escape
+from xml.sax.saxutils import quoteattr
+
+try:
+    import fcntl
+except ImportError:  # windows
+    import msvcrt
+
+    fcntl = None
+
+try:
+    import numpy as np
+except ImportError:  # the numpy is optional, see WorkSheet.to_columns
+    np = None
+
+try:
+    from openpyxl.worksheet.formula import ArrayFormula
+    from openpyxl.worksheet.formula import DataTableFormula
+except ImportError:  # openpyxl < 3.1 reads all the formulas as the str.
+    ArrayFormula = DataTableFormula = None
 
 from openpyxl import Workbook as WB
 from openpyxl import load_workbook
 from openpyxl.cell import Cell
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ERROR_CODES
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.cell.cell import _TYPES
+from openpyxl.cell.cell import get_time_format
+from openpyxl.cell.cell import get_type
+from openpyxl.cell.text import Text
+from openpyxl.formatting.rule import Rule
+from openpyxl.formula.translate import Translator
+from openpyxl.packaging.core import DocumentProperties
+from openpyxl.packaging.extended import ExtendedProperties
 from openpyxl.styles import Font
 from openpyxl.styles import PatternFill
 from openpyxl.styles import Alignment
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.styles.differential import DifferentialStyle
+from openpyxl.styles.styleable import StyleableObject
+from openpyxl.reader.excel import ExcelReader
+from openpyxl.reader.strings import read_string_table
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.styles.stylesheet import write_stylesheet
 from openpyxl.utils import column_index_from_string
+from openpyxl.utils import get_column_letter
+from openpyxl.utils import range_boundaries
+from openpyxl.utils.datetime import MAC_EPOCH
+from openpyxl.utils.datetime import WINDOWS_EPOCH
+from openpyxl.utils.datetime import from_excel
+from openpyxl.utils.datetime import from_ISO8601
+from openpyxl.utils.datetime import to_excel
+from openpyxl.utils.exceptions import IllegalCharacterError
 from openpyxl.utils.exceptions import InvalidFileException
+from openpyxl.utils.exceptions import ReadOnlyWorkbookException
+from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+from openpyxl.worksheet._reader import WorkSheetParser
+from openpyxl.worksheet._reader import _cast_number
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+from openpyxl.writer.excel import ExcelWriter
+from openpyxl.writer.theme import theme_xml
+from openpyxl.xml.constants import ARC_APP
+from openpyxl.xml.constants import ARC_CONTENT_TYPES
+from openpyxl.xml.constants import ARC_CORE
+from openpyxl.xml.constants import ARC_ROOT_RELS
+from openpyxl.xml.constants import ARC_SHARED_STRINGS
+from openpyxl.xml.constants import ARC_STYLE
+from openpyxl.xml.constants import ARC_THEME
+from openpyxl.xml.constants import ARC_WORKBOOK
+from openpyxl.xml.constants import ARC_WORKBOOK_RELS
+from openpyxl.xml.constants import CONTYPES_NS
+from openpyxl.xml.constants import PKG_REL_NS
+from openpyxl.xml.constants import REL_NS
+from openpyxl.xml.constants import SHARED_STRINGS
+from openpyxl.xml.constants import SHEET_MAIN_NS
+from openpyxl.xml.constants import STYLES_TYPE
+from openpyxl.xml.constants import THEME_TYPE
+from openpyxl.xml.constants import WORKSHEET_TYPE
+from openpyxl.xml.constants import XLSX
+from openpyxl.xml.functions import tostring
 
 SUPPORTED_FILE_TYPE = ".xlsx"
 
+# the max col in excel, whose col_name is XFD.
+MAX_COL = 16384
+# the col_name <-> col_idx tables, the col_idx starts from 1.
+COL_NAMES = tuple(get_column_letter(i) for i in range(1, MAX_COL + 1))
+COL_INDEXES = {col_name: i for i, col_name in enumerate(COL_NAMES, 1)}
+# the zip compression presets of the saved workbook, the (compression,
+# compresslevel) of the zip members.
+COMPRESSIONS = {
+    "stored": (zipfile.ZIP_STORED, None),
+    "fast": (zipfile.ZIP_DEFLATED, 1),
+    "max": (zipfile.ZIP_DEFLATED, 9),
+}
+
+
+class WorkBookConflictError(RuntimeError):
+    """the file is modified by another process since it's opened."""
+
+
+def _fingerprint(filename: str) -> t.Optional[t.Tuple[int, int]]:
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _FileLock:
+    """the advisory lock across the processes, which is held on the sidecar
+    file `<filename>.lock` because the workbook itself is rewritten while saving.
+
+    the shared lock is held while loading and the exclusive one while saving.
+    the waits and the contention are counted in `stats` of current process.
+
+    Args:
+        `filename`: the workbook's filename.
+
+        `timeout`: the seconds to wait for the lock, wait forever if it's None.
+    """
+
+    stats = {
+        "acquired": 0,
+        "contended": 0,
+        "timeouts": 0,
+        "wait_seconds": 0.0,
+        "max_wait_seconds": 0.0,
+        "conflicts": 0,
+        "merged": 0,
+    }
+
+    def __init__(self, filename: str, timeout: t.Optional[float] = None):
+        self.path = f"{filename}.lock"
+        self.timeout = timeout
+
+    @staticmethod
+    def _try_lock(fd: int, exclusive: bool) -> bool:
+        try:
+            if fcntl:
+                flag = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                fcntl.flock(fd, flag | fcntl.LOCK_NB)
+            else:
+                # there is the exclusive lock only in windows.
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    @staticmethod
+    def _unlock(fd: int) -> None:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive: bool):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        try:
+            start = time.perf_counter()
+            if not self._try_lock(fd, exclusive):
+                self.stats["contended"] += 1
+                delay = 0.001
+                while not self._try_lock(fd, exclusive):
+                    waited = time.perf_counter() - start
+                    if self.timeout is not None and waited >= self.timeout:
+                        self.stats["timeouts"] += 1
+                        raise TimeoutError(
+                            f"Wait for the lock: {self.path} over "
+                            f"{self.timeout} seconds."
+                        )
+                    time.sleep(delay)
+                    delay = min(delay * 2, 0.05)
+            waited = time.perf_counter() - start
+            self.stats["acquired"] += 1
+            self.stats["wait_seconds"] += waited
+            self.stats["max_wait_seconds"] = max(
+                self.stats["max_wait_seconds"], waited
+            )
+            try:
+                yield
+            finally:
+                self._unlock(fd)
+        finally:
+            os.close(fd)
+
+    def shared(self):
+        return self._locked(exclusive=False)
+
+    def exclusive(self):
+        return self._locked(exclusive=True)
+
+
+class _ParallelZipFile(zipfile.ZipFile):
+    """
+    The zip file to write whose members are deflated in a thread pool, the
+    zlib releases the GIL while compressing, so the sheets, the styles and
+    the shared strings are compressed at the same time. the members are
+    written in the order they're added while closing.
+
+    it's the drop-in of the zip file for openpyxl's ExcelWriter, which adds
+    the members by `writestr` and `write` only.
+
+    the deflated member is written by the public `open(zinfo, "w")` as the
+    stored one, so the zip file keeps its own records, and then its local
+    header is rewritten with the deflated method, the crc and the size. it's
+    checked on CPython 3.9 to 3.13.
+
+    Args:
+        `file`: the filename or the seekable file object to write.
+
+        `compresslevel`: the deflate level in 0-9, default is the zlib's.
+    """
+
+    CHUNK = 1 << 20
+    # the compressed member is kept in memory if it's smaller than it.
+    SPOOL = 1 << 24
+    WORKERS = min(4, os.cpu_count() or 1)
+
+    def __init__(self, file, compresslevel: t.Optional[int] = None):
+        super().__init__(
+            file,
+            "w",
+            zipfile.ZIP_DEFLATED,
+            allowZip64=True,
+            compresslevel=compresslevel,
+        )
+        self._level = (
+            zlib.Z_DEFAULT_COMPRESSION
+            if compresslevel is None
+            else compresslevel
+        )
+        self._executor = ThreadPoolExecutor(self.WORKERS)
+        # the (zinfo, future of the deflated member) to write.
+        self._pending = []
+
+    def _add(self, zinfo: zipfile.ZipInfo, chunks: t.Iterable[bytes]):
+        self._pending.append(
+            (zinfo, self._executor.submit(self._deflate, chunks))
+        )
+
+    def _deflate(
+        self, chunks: t.Iterable[bytes]
+    ) -> t.Tuple[int, int, t.BinaryIO]:
+        """return the crc, the size and the deflated data of the chunks."""
+        compressor = zlib.compressobj(self._level, zlib.DEFLATED, -15)
+        crc = size = 0
+        out = tempfile.SpooledTemporaryFile(self.SPOOL)
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            out.write(compressor.compress(chunk))
+        out.write(compressor.flush())
+        return crc, size, out
+
+    def _read(self, f: t.BinaryIO) -> t.Generator:
+        with f:
+            yield from iter(functools.partial(f.read, self.CHUNK), b"")
+
+    def writestr(
+        self, zinfo_or_arcname, data, compress_type=None, compresslevel=None
+    ) -> None:
+        if isinstance(zinfo_or_arcname, zipfile.ZipInfo):
+            zinfo = zinfo_or_arcname
+        else:
+            zinfo = zipfile.ZipInfo(
+                zinfo_or_arcname, time.localtime(time.time())[:6]
+            )
+            zinfo.external_attr = 0o600 << 16
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._add(zinfo, [data])
+
+    def write(
+        self, filename, arcname=None, compress_type=None, compresslevel=None
+    ) -> None:
+        zinfo = zipfile.ZipInfo.from_file(filename, arcname)
+        # the file is opened at once, openpyxl removes it after it's added,
+        # but windows can't remove an opened file, so it's read at once.
+        f = open(filename, "rb")
+        if os.name == "nt":
+            with f:
+                self._add(zinfo, [f.read()])
+        else:
+            self._add(zinfo, self._read(f))
+
+    def writestream(self, arcname: str, chunks: t.Iterable[bytes]) -> None:
+        """add the member of the chunks, which are read in the pool."""
+        zinfo = zipfile.ZipInfo(arcname, time.localtime(time.time())[:6])
+        zinfo.external_attr = 0o600 << 16
+        self._add(zinfo, chunks)
+
+    def namelist(self) -> t.List[str]:
+        return super().namelist() + [
+            zinfo.filename for zinfo, _ in self._pending
+        ]
+
+    def _write_deflated(
+        self, zinfo: zipfile.ZipInfo, crc: int, size: int, out: t.BinaryIO
+    ) -> None:
+        with out:
+            # the zip64 is decided as `open` does, so the header rewritten
+            # is in the same length.
+            zinfo.file_size = max(size, out.tell())
+            zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+            zinfo.compress_type = zipfile.ZIP_STORED
+            out.seek(0)
+            with self.open(zinfo, "w", force_zip64=zip64) as dst:
+                shutil.copyfileobj(out, dst, self.CHUNK)
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            zinfo.CRC, zinfo.file_size = crc, size
+            end = self.fp.tell()
+            self.fp.seek(zinfo.header_offset)
+            self.fp.write(zinfo.FileHeader(zip64))
+            self.fp.seek(end)
+
+    def close(self) -> None:
+        if self.fp is None:
+            return
+        try:
+            for zinfo, future in self._pending:
+                self._write_deflated(zinfo, *future.result())
+        finally:
+            self._pending = []
+            self._executor.shutdown(cancel_futures=True)
+            super().close()
+
+
+def _zip_file(filename: str, compression: str) -> zipfile.ZipFile:
+    """open the zip file to write the workbook in the compression preset, see
+    the `COMPRESSIONS`. the members are deflated in parallel if there are
+    more than one cpu.
+    """
+    method, compresslevel = COMPRESSIONS[compression]
+    if method == zipfile.ZIP_DEFLATED and _ParallelZipFile.WORKERS > 1:
+        return _ParallelZipFile(filename, compresslevel)
+    return zipfile.ZipFile(
+        filename, "w", method, allowZip64=True, compresslevel=compresslevel
+    )
+
+
+def _save_workbook(
+    wb: WB, filename: str, compression: t.Optional[str] = None
+) -> None:
+    """save the workbook in the compression preset, see the `_zip_file`, it's
+    saved by the `wb.save` if the compression is None.
+    """
+    if isinstance(wb, _NativeWorkbook):
+        wb.save(filename, compression)
+        return
+    if compression is None:
+        wb.save(filename)
+        return
+    if wb.write_only and not wb.worksheets:
+        wb.create_sheet()
+    wb.properties.modified = datetime.datetime.now(
+        tz=datetime.timezone.utc
+    ).replace(tzinfo=None)
+    ExcelWriter(wb, _zip_file(filename, compression)).save()
+
+
+def _save_atomic(
+    wb: WB, filename: str, compression: t.Optional[str] = None
+) -> None:
+    """save the workbook to a temp file in the same directory, fsync it and
+    rename it to the filename, so the file is either the old one or the new
+    one even if it's crashed while saving. the file mode is kept. see the
+    `_save_workbook` for the compression.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    tmp = os.path.join(
+        directory,
+        f".~{os.path.basename(filename)}.{os.getpid()}.{time.time_ns()}.tmp",
+    )
+    try:
+        _save_workbook(wb, tmp, compression)
+        with open(tmp, "rb+") as f:
+            os.fsync(f.fileno())
+        if os.path.exists(filename):
+            shutil.copymode(filename, tmp)
+        os.replace(tmp, filename)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+    # persist the rename, the directory can't be opened on windows.
+    with contextlib.suppress(OSError, AttributeError):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
 
 class _WorkBook:
     """the singleton workbook if its filename is the same.
 
+    the singleton is in current process only, pass the lock to load the file
+    under the shared lock of `_FileLock` if the file is shared by processes.
+    the file's fingerprint while loading is kept in the workbook to find out
+    whether it's modified by another process before saving. pass the cache
+    to read the sheets of the read_only workbook from the `SheetCache`. the
+    write_only workbook is the `_NativeWorkbook` if the engine is "native",
+    see its args, and the read_only one is the `_FastWorkbook` if the engine
+    is "fast". the new file is a clone of the template from the
+    `TemplateCache` if there is a template.
+
+    the workbook is `dirty` if it's modified since it's loaded, the loaded one
+    isn't saved if it's not dirty and the worksheet skips the unmodified
+    one, and the new one is always saved.
+
     Raises:
         InvalidFileException: the invalid file type.
 
@@ -36,25 +471,90 @@ class _WorkBook:
         [WorkBook]:
     """
 
-    # todo： multiprocess in problem.
     singleton = {}
     SUFFIX = SUPPORTED_FILE_TYPE
 
-    def __new__(cls, filename: t.AnyStr) -> WB:
+    def __new__(
+        cls,
+        filename: t.AnyStr,
+        read_only: bool = False,
+        write_only: bool = False,
+        lock: t.Optional[_FileLock] = None,
+        cache: t.Optional["SheetCache"] = None,
+        engine: str = "openpyxl",
+        compresslevel: t.Optional[int] = None,
+        shared_strings: bool = False,
+        lazy_strings: bool = False,
+        template: t.Optional[str] = None,
+        template_cache: t.Optional["TemplateCache"] = None,
+    ) -> WB:
+        if read_only and write_only:
+            raise ValueError("The read_only and write_only are exclusive.")
         if filename not in cls.singleton:
+            fingerprint = None
             if not filename.endswith(cls.SUFFIX):
                 raise InvalidFileException(
                     f"The file: {filename} is invalid. the"
                     "filename must ends with .xlsx, bitch."
                 )
-            if os.path.exists(filename):
+            if write_only:
+                if os.path.exists(filename):
+                    raise FileExistsError(
+                        f"The file: {filename} is existed, the write_only "
+                        "mode creates a new file only."
+                    )
+                log.info(f"Open a new file in write_only mode: {filename}")
+                # the write_only workbook flushes the rows to a temp file while
+                # appending, and the temp file is zipped while saving.
+                if engine == "native":
+                    wb = _NativeWorkbook(compresslevel, shared_strings)
+                else:
+                    wb = WB(write_only=True)
+            elif template is not None and template_cache is not None:
+                log.info(f"Open a new file: {filename} by the template.")
+                wb = template_cache.load(template)
+            elif read_only and cache and os.path.exists(filename):
+                log.info(f"Open the existed file by the cache: {filename}")
+                wb = _CachedWorkbook(
+                    filename,
+                    cache,
+                    lock=lock,
+                    engine=engine,
+                    lazy_strings=lazy_strings,
+                )
+                fingerprint = wb.fingerprint
+            elif os.path.exists(filename):
                 log.info(f"Open the existed file: {filename}")
-                wb = load_workbook(filename)
+                # the read_only workbook parses the sheet lazily while the
+                # rows are iterated, so the memory keeps flat.
+                with lock.shared() if lock else contextlib.nullcontext():
+                    if read_only:
+                        wb = _load_read_only(filename, engine, lazy_strings)
+                    else:
+                        wb = load_workbook(filename)
+                    fingerprint = _fingerprint(filename)
+            elif read_only:
+                raise FileNotFoundError(
+                    f"The file: {filename} not found, can't read it in "
+                    "read_only mode."
+                )
             else:
                 log.info(f"Open a new file: {filename}")
                 wb = WB()
+            wb.fingerprint = fingerprint
             wb.filename = filename
+            wb.dirty = fingerprint is None
+            wb.engine = engine
             cls.singleton[filename] = wb
+        elif (
+            cls.singleton[filename].read_only != read_only
+            or cls.singleton[filename].write_only != write_only
+            or cls.singleton[filename].engine != engine
+        ):
+            raise ValueError(
+                f"The file: {filename} is already opened in another mode, "
+                "close it at first."
+            )
         return cls.singleton[filename]
 
 
@@ -68,17 +568,15 @@ class Validator:
 class _WorkSheetMixin:
     @staticmethod
     def _gen_col_name() -> t.AnyStr:
-        """generate the col_name from A to Z.
+        """generate the col_name from A to XFD.
 
         Yields:
-            [str]: A B C ... X Y Z"
+            [str]: A B C ... Z AA AB ... XFC XFD"
         """
-        _start = 65
-        _end = 91
-
-        for i in range(_start, _end):
-            yield chr(i)
-        raise ValueError("The col nums is too big, which supported only A-Z!")
+        yield from COL_NAMES
+        raise ValueError(
+            "The col nums is too big, which supported only A-XFD!"
+        )
 
 
 class Styler:
@@ -129,11 +627,56 @@ class ColStyler(Styler):
             raise TypeError("The col style must be dict")
 
 
-class RowStyler(Styler):
-    """
-    to be padded in the future. Not in use in current.
+_ResolvedStyle = namedtuple(
+    "_ResolvedStyle", ("font", "pattern_fill", "others")
+)
+
+
+class _StyleCache:
+    """the bounded LRU cache of the resolved styles.
+
+    each distinct style dict is frozen to a key, and the openpyxl style objects
+    built for it are shared by all the cells in the same style. The least
+    recently used one is evicted if there are more than `maxsize` styles.
+
+    Args:
+        `maxsize`: the max styles cached, the cache is disabled if it's 0.
     """
 
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get(self, style: dict, factory: t.Callable) -> t.Any:
+        try:
+            key = frozenset(style.items())
+        except TypeError:
+            # the unhashable style value, such as a list, is not cached.
+            self.misses += 1
+            return factory(style)
+        try:
+            value = self._cache[key]
+        except KeyError:
+            self.misses += 1
+            value = factory(style)
+            if self.maxsize > 0:
+                self._cache[key] = value
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+            return value
+        self.hits += 1
+        self._cache.move_to_end(key)
+        return value
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = self.misses = 0
+
 
 class CellStyler(Styler):
     """
@@ -160,6 +703,9 @@ class CellStyler(Styler):
 
         `width`:        width
         `height`:       height
+
+    The styles are resolved once for each distinct style dict and cached in
+    `CACHE`, the cells in the same style share the same Font and PatternFill.
     """
 
     SUPPORTED_STYLES = {
@@ -181,6 +727,9 @@ class CellStyler(Styler):
         # ...
         "others": ("width", "height"),
     }
+    _SUPPORTED_KEYS = sum(SUPPORTED_STYLES.values(), ())
+
+    CACHE = _StyleCache()
 
     def __call__(self, cell: Cell) -> None:
 
@@ -197,32 +746,39 @@ class CellStyler(Styler):
 
     def _styled_cell(self, style: dict, cell: Cell) -> None:
         if style:
-            self._set_font(cell, style)
-            self._set_pattern_fill(cell, style)
+            resolved = self.resolve(style)
+            self._set_font(cell, resolved)
+            self._set_pattern_fill(cell, resolved)
             # ...
             # ...
-            self._set_others(cell, style)
+            self._set_others(cell, resolved)
         return cell
 
-    def _set_font(self, cell: Cell, style: dict) -> None:
-        font = Font(
-            **{
+    @classmethod
+    def _build(cls, style: dict) -> _ResolvedStyle:
+        def kwargs(kind):
+            return {
                 k: v
                 for k, v in style.items()
-                if k in self.SUPPORTED_STYLES["font"]
+                if k in cls.SUPPORTED_STYLES[kind]
             }
-        )
-        cell.font = font
 
-    def _set_pattern_fill(self, cell: Cell, style: dict) -> None:
-        pattern_fill = PatternFill(
-            **{
-                k: v
-                for k, v in style.items()
-                if k in self.SUPPORTED_STYLES["pattern_fill"]
-            }
+        return _ResolvedStyle(
+            Font(**kwargs("font")),
+            PatternFill(**kwargs("pattern_fill")),
+            tuple(kwargs("others").items()),
         )
-        cell.fill = pattern_fill
+
+    @classmethod
+    def resolve(cls, style: dict) -> _ResolvedStyle:
+        """return the cached style objects of the style dict."""
+        return cls.CACHE.get(style, cls._build)
+
+    def _set_font(self, cell: Cell, style: _ResolvedStyle) -> None:
+        cell.font = style.font
+
+    def _set_pattern_fill(self, cell: Cell, style: _ResolvedStyle) -> None:
+        cell.fill = style.pattern_fill
 
     def _set_aligment(self, cell: Cell, style: dict) -> None:
         alignment = Alignment(
@@ -234,14 +790,13 @@ class CellStyler(Styler):
         )
         cell.alignment = alignment
 
-    def _set_others(self, cell: Cell, style: dict) -> None:
-        for k, v in style.items():
-            if k in self.SUPPORTED_STYLES["others"]:
-                setattr(cell, k, v)
+    def _set_others(self, cell: Cell, style: _ResolvedStyle) -> None:
+        for k, v in style.others:
+            setattr(cell, k, v)
 
     def _validate(self) -> None:
         "validate the supported style."
-        supported_styles = sum(self.SUPPORTED_STYLES.values(), ())
+        supported_styles = self._SUPPORTED_KEYS
         if isinstance(self.style, dict):
             keys = self.style.keys()
         if isinstance(self.style, list):
@@ -256,6 +811,112 @@ class CellStyler(Styler):
                 )
 
 
+class RowStyler(Styler):
+    """
+    The utils class:
+        to set the style to a row dimension, the row is a single record in
+        the sheet xml however many cells there are in it.
+
+    Supported styles:
+        `height`:           the row height in points.
+        `hidden`:           hide the row.
+        `outline_level`:    the outline level to group the rows, 0-7.
+
+        the font and the pattern fill keys of the `CellStyler`.
+
+        `horizontal`:       Alignment.horizontal
+        `vertical`:         Alignment.vertical
+        `wrapText`:         Alignment.wrapText
+
+    the excel applies the row style to the empty cells of the row only, so
+    the cells appended without a style to the row styled by the
+    `WorkSheet.set_row_style` share the row's style record, see the
+    `_row_style_array`.
+    """
+
+    SUPPORTED_STYLES = {
+        "height": (int, float),
+        "hidden": bool,
+        "outline_level": int,
+    }
+    MAX_OUTLINE_LEVEL = 7
+    ALIGNMENT = ("horizontal", "vertical", "wrapText")
+    _CELL_STYLES = {
+        "font": CellStyler.SUPPORTED_STYLES["font"],
+        "fill": CellStyler.SUPPORTED_STYLES["pattern_fill"],
+        "alignment": ALIGNMENT,
+    }
+
+    CACHE = _StyleCache()
+
+    def __init__(self, style: dict):
+        if not isinstance(style, dict):
+            raise TypeError("the row style must be a dict")
+        super().__init__(style)
+
+    def __call__(self, row) -> None:
+        for k, v in self.style.items():
+            if k in self.SUPPORTED_STYLES:
+                setattr(row, k, v)
+        for k, v in self.CACHE.get(self.style, self._build):
+            setattr(row, k, v)
+
+    @classmethod
+    def _build(cls, style: dict) -> t.Tuple[t.Tuple[str, t.Any], ...]:
+        """return the style objects of the row, a object is set only if
+        there is a key of it, so the row without them isn't styled.
+        """
+        factories = {"font": Font, "fill": PatternFill, "alignment": Alignment}
+        resolved = []
+        for name, keys in cls._CELL_STYLES.items():
+            kwargs = {k: v for k, v in style.items() if k in keys}
+            if kwargs:
+                resolved.append((name, factories[name](**kwargs)))
+        return tuple(resolved)
+
+    def _validate(self) -> None:
+        "validate the supported style."
+        for k, v in self.style.items():
+            if k in self.SUPPORTED_STYLES:
+                if not isinstance(v, self.SUPPORTED_STYLES[k]) or (
+                    k != "hidden" and isinstance(v, bool)
+                ):
+                    raise ValueError(
+                        f"the style: {self.style} is not supported!"
+                    )
+            elif not any(k in keys for keys in self._CELL_STYLES.values()):
+                raise ValueError(
+                    f"The type keyword: {k} is not supproted, the supported "
+                    f"keyword is {(*self.SUPPORTED_STYLES, *self._CELL_STYLES)}"
+                )
+        level = self.style.get("outline_level", 0)
+        if not 0 <= level <= self.MAX_OUTLINE_LEVEL:
+            raise ValueError(
+                f"The outline_level must be in 0-{self.MAX_OUTLINE_LEVEL}."
+            )
+
+
+def _row_style_array(
+    array: t.Optional[StyleArray], row: StyleArray
+) -> t.Optional[StyleArray]:
+    """return the style of a cell in the styled row, which is the row's
+    style with the cell's number format, or None if the cell is styled
+    itself.
+    """
+    if array is not None and (
+        array.fontId
+        or array.fillId
+        or array.borderId
+        or array.alignmentId
+        or array.protectionId
+    ):
+        return None
+    styled = StyleArray(row)
+    if array is not None and array.numFmtId:
+        styled.numFmtId = array.numFmtId
+    return styled
+
+
 class Style:
     """
     `type_`:
@@ -340,7 +1001,11 @@ class Cell_:
         value=None,
     ):
         self.ws = ws.ws
-        self.cell = self.ws.cell(row=row_idx, column=col_idx, value=value)
+        if self.ws.parent.write_only:
+            # the write_only cell is positioned by the worksheet while appending.
+            self.cell = WriteOnlyCell(self.ws, value=value)
+        else:
+            self.cell = self.ws.cell(row=row_idx, column=col_idx, value=value)
         self.style = Style(style)
 
     def set(self):
@@ -403,115 +1068,2592 @@ class IterStyledCell(t.List):
                 f"the {type(self.row_data)} of {self.row_data} is unsupported."
             )
 
+    def _next_row_idx(self):
+        if self.ws.parent.write_only:
+            return None
+        return self.ws._current_row + 1
+
     def _seq_styled_cells(self):
-        row_idx = self.ws._current_row + 1
+        row_idx = self._next_row_idx()
         for col_idx, col_val in enumerate(self.row_data, 1):
             cell = Cell_(row_idx, col_idx, self.style(col_idx), self, col_val)
             cell.set()
             yield cell
 
     def _map_styled_cells(self):
-        row_idx = self.ws._current_row + 1
+        row_idx = self._next_row_idx()
         for col_idx, col_val in self.row_data.items():
             if isinstance(col_idx, str):
-                col_idx = column_index_from_string(col_idx)
+                col_idx = COL_INDEXES[col_idx]
             cell = Cell_(row_idx, col_idx, self.style(col_idx), self, col_val)
             cell.set()
             yield cell
 
 
-class WorkSheet(_WorkSheetMixin):
-    """if there is the worksheet in the workbook, return it.
-       if there is not the worksheet, return a new worksheet.
-
-       the headers is a row that return dict with it as the keys and write to
-       excel in dict format with it as the keys.
-
-    Properties:
-        `parent`: the workbook instance.
-
-        `ws`: the worksheet instance.
-
-        `headers`: the headers and col_names correspondency in current worksheet.
-            {"name": "A", "sex": "B", "age": "C"}
-
-    Args:
-        `filename`: the destination file.
-
-        `title`: the sheet title, default is Sheet1.
+class _BatchStyler:
+    """
+    The styled cells factory for a batch of rows, see `WorkSheet.extend`.
+    each distinct style is resolved to the workbook's style array once, and
+    the cells in the batch are created with it directly, there is not a
+    wrapper object for each cell.
 
-        `index`: the sheet index, default is 1. if the index is set, the title in invalid.
+    supported parameters see the `IterStyledCell`
+    """
 
-        `headers_idx`: the headers index in all rows. if there is a headers_idx, the to_dict
-                read would start from the headers_idx row.
+    def __init__(self, style: t.Union[list, dict], ws: "WorkSheet"):
+        if isinstance(style, dict):
+            self.style = lambda i: style
+        elif isinstance(style, list):
+            self.style = lambda i: style[i - 1] if len(style) >= i else {}
+        else:
+            raise TypeError(
+                f"the style must be a dict or list, but it's {type(style)}"
+            )
+        self.ws = ws.ws
+        # the style array of each col, None if the col is not styled.
+        self._col_arrays = []
+        self._arrays = {}
 
-        `template`: if there is a template, copy it to filename and write to the copy.
+    def _style_array(self, style: dict):
+        if not style:
+            return None
+        try:
+            return self._arrays[id(style)]
+        except KeyError:
+            cell = Cell(self.ws)
+            CellStyler(style)(cell)
+            self._arrays[id(style)] = cell._style
+            return cell._style
 
-        `before_styled`: the style before reading or writing the worksheet.
-                        {"A": {"color" :"#0FF00"}}
+    def __call__(self, values: t.Sequence) -> list:
+        for col_idx in range(len(self._col_arrays) + 1, len(values) + 1):
+            self._col_arrays.append(self._style_array(self.style(col_idx)))
+        return [
+            (
+                value
+                if array is None
+                else Cell(self.ws, 1, 1, value, style_array=array)
+            )
+            for value, array in zip(values, self._col_arrays)
+        ]
 
-        `before_styled`: the style after reading or writing but before saving the worksheet.
 
+class _StyleRule:
     """
+    The rule to style the cells of a range in bulk, see the
+    `WorkSheet.add_style_rule`. the font and the fill parts of the style are
+    merged into the cell's own ones, so the rules on the same cells and the
+    style of the append are combined, and each distinct merged style is
+    resolved once.
 
-    CLOSE = True
-    SUFFIX = SUPPORTED_FILE_TYPE
+    the cells are styled in one pass by `apply`, or the rule is written as
+    the excel conditional formatting by `conditional`, which excel evaluates
+    while opening the file.
+    """
 
     def __init__(
         self,
-        filename: str,
-        title: t.Optional[str] = "Sheet1",
-        index: t.Optional[int] = None,
-        headers_idx: t.Optional[int] = 1,
-        template: t.Optional[str] = None,
-        before_styled: t.Optional[dict] = None,
-        after_styled: t.Optional[dict] = None,
+        style: dict,
+        cols: t.Optional[t.Union[str, t.Sequence[str]]] = None,
+        rows: t.Optional[t.Union[int, str, slice]] = None,
+        when: t.Optional[t.Union[t.Callable, str]] = None,
     ):
-        if template:
-            if not os.path.exists(template):
-                raise FileNotFoundError(
-                    f"The template file: {template} not found!"
-                )
-            if not template.endswith(self.SUFFIX):
-                raise InvalidFileException(
-                    f"The file suffix must be {self.SUFFIX}!"
-                )
-            if template == filename:
-                raise InvalidFileException(
-                    f"The template file: {template} is the same"
-                    f"file as destination file {filename}"
-                )
-            if os.path.exists(filename):
-                raise FileExistsError(
-                    f"The destination {filename} is existed, can't override it by tempate file."
-                )
-            shutil.copyfile(template, filename)
+        if not isinstance(style, dict) or not style:
+            raise TypeError("The style of the rule must be a non-empty dict.")
+        keys = CellStyler.SUPPORTED_STYLES
+        unsupported = (
+            set(style) - set(keys["font"]) - set(keys["pattern_fill"])
+        )
+        if unsupported:
+            raise ValueError(
+                f"The style keywords: {unsupported} are not supported by the "
+                "rule, it supports the font and the fill ones only."
+            )
+        self.font = {k: v for k, v in style.items() if k in keys["font"]}
+        self.fill = {
+            k: v for k, v in style.items() if k in keys["pattern_fill"]
+        }
+        # the fill color is invisible without the fill type.
+        if self.fill and "fill_type" not in self.fill:
+            self.fill["fill_type"] = "solid"
+        self.cols = None if cols is None else self._col_indexes(cols)
+        if not (
+            rows is None
+            or rows == "header"
+            or isinstance(rows, int)
+            and rows >= 1
+            or isinstance(rows, slice)
+            and (rows.step or 1) >= 1
+        ):
+            raise ValueError(
+                "The rows must be None, 'header', a row number or a slice of "
+                f"the row numbers, but it's {rows}."
+            )
+        self.rows = rows
+        if not (when is None or callable(when) or isinstance(when, str)):
+            raise TypeError("The when must be a callable or a formula str.")
+        self.when = when
 
-        if not isinstance(headers_idx, int):
-            raise TypeError("The headers_idx must be a integer.")
-        if headers_idx < 1:
-            raise ValueError("The headers_idx must lager than 1.")
-        self.headers_idx = headers_idx
+    @staticmethod
+    def _col_indexes(cols: t.Union[str, t.Sequence[str]]) -> t.List[int]:
+        """the col indexes of the col names, like "C", "A:C" or ["A", "C"]."""
+        indexes = []
+        for col in [cols] if isinstance(cols, str) else cols:
+            first, _, last = col.upper().partition(":")
+            try:
+                start, stop = COL_INDEXES[first], COL_INDEXES[last or first]
+            except KeyError:
+                raise ValueError(f"The col: {col} is invalid.") from None
+            indexes.extend(range(start, stop + 1))
+        return indexes
 
-        # the headers is None at first, initialized when read or write.
-        self.headers = None
+    def _range(
+        self, headers_idx: int, max_row: int, max_col: int
+    ) -> t.Tuple[range, t.List[int]]:
+        """the row numbers and the col indexes of the cells to style, the
+        rows are the ones after the headers by default.
+        """
+        rows = self.rows
+        if rows is None:
+            rows = range(headers_idx + 1, max_row + 1)
+        elif rows == "header":
+            rows = range(headers_idx, headers_idx + 1)
+        elif isinstance(rows, int):
+            rows = range(rows, rows + 1)
+        else:
+            rows = range(
+                rows.start or headers_idx + 1,
+                max_row + 1 if rows.stop is None else rows.stop,
+                rows.step or 1,
+            )
+        cols = self.cols or list(range(1, max_col + 1))
+        return rows, cols
 
-        self.before_styled = before_styled or {}
-        self.after_styled = after_styled or {}
-        assert isinstance(self.before_styled, dict)
-        assert isinstance(self.after_styled, dict)
+    def _matched(self, value) -> bool:
+        try:
+            return bool(self.when(value))
+        except (TypeError, ValueError):
+            # such as comparing the header str with a number.
+            return False
 
-        self._parent_factory = _WorkBook
-        parent = self._parent_factory(filename)
+    def _merged(self, wb: WB, array: t.Optional[StyleArray]) -> StyleArray:
+        """the style array merged the rule's font and fill into the one."""
+        array = StyleArray() if array is None else StyleArray(array)
+        if self.font:
+            font = copy.copy(wb._fonts[array.fontId])
+            for k, v in self.font.items():
+                setattr(font, k, v)
+            array.fontId = wb._fonts.add(font)
+        if self.fill:
+            fill = wb._fills[array.fillId]
+            fill = (
+                copy.copy(fill)
+                if isinstance(fill, PatternFill)
+                else PatternFill()
+            )
+            for k, v in self.fill.items():
+                setattr(fill, k, v)
+            array.fillId = wb._fills.add(fill)
+        return array
 
-        if index or title:
-            if index:
+    def apply(self, ws: t.Any, headers_idx: int) -> int:
+        """style the cells of the sheet in the full mode, return the count of
+        the styled cells. the missing cells are created if there isn't a
+        condition, so the stripes are continuous.
+        """
+        rows, cols = self._range(headers_idx, ws.max_row, ws.max_column)
+        cells = ws._cells
+        when = self.when
+        # the merged style arrays of the cells' own ones.
+        arrays = {}
+        styled = 0
+        for row in rows:
+            for col in cols:
+                cell = cells.get((row, col))
+                if when is None:
+                    if cell is None:
+                        cell = ws.cell(row, col)
+                elif cell is None or not self._matched(cell.value):
+                    continue
+                # the style array is None if the cell isn't styled.
+                own = cell._style
+                key = None if own is None else tuple(own)
                 try:
-                    self.ws = parent.worksheets[index - 1]
-                    log.info(f"open a active sheet, its index: {index-1}.")
-                except IndexError as e:
-                    raise ValueError(
-                        "The index: {index} worksheet is not existed."
+                    array = arrays[key]
+                except KeyError:
+                    array = arrays[key] = self._merged(ws.parent, own)
+                cell._style = StyleArray(array)
+                styled += 1
+        return styled
+
+    def conditional(
+        self, ws: t.Any, headers_idx: int, max_row: int, max_col: int
+    ) -> None:
+        """add the rule to the sheet's conditional formatting, the formula
+        of the when is relative to the top-left cell of the range.
+        """
+        rows, cols = self._range(headers_idx, max_row, max_col)
+        if not rows or not cols:
+            return
+        formula = self.when if isinstance(self.when, str) else "TRUE"
+        if rows.step > 1:
+            formula = f"AND(MOD(ROW()-{rows.start},{rows.step})=0,{formula})"
+        # the consecutive cols are in one range.
+        ranges = []
+        for _, group in itertools.groupby(
+            enumerate(sorted(set(cols))), lambda x: x[1] - x[0]
+        ):
+            group = [col for _, col in group]
+            ranges.append(
+                f"{COL_NAMES[group[0] - 1]}{rows.start}:"
+                f"{COL_NAMES[group[-1] - 1]}{rows[-1]}"
+            )
+        fill = None
+        if self.fill:
+            # the color of the solid fill is the bgColor in the conditional
+            # formatting.
+            fill = PatternFill(
+                **{"bgColor": self.fill.get("fgColor"), **self.fill}
+            )
+        ws.conditional_formatting.add(
+            " ".join(ranges),
+            Rule(
+                type="expression",
+                formula=[formula],
+                dxf=DifferentialStyle(
+                    font=Font(**self.font) if self.font else None,
+                    fill=fill,
+                ),
+            ),
+        )
+
+
+class _ColumnWidths:
+    """
+    The max rendered widths of the cols for `WorkSheet(autofit=True)`, it's
+    updated by each row while appending, and applied to the
+    `column_dimensions` while saving, so there is not a second pass over the
+    rows, and the memory is a int per col.
+
+    the width of a str is its length, the east asian wide char like the CJK
+    is counted as 2, and it's the longest line of a multiline str. the width
+    of a value is at most 2 times its length, so the str which can't be
+    wider than the current width is skipped without counting its chars.
+    """
+
+    # the padding of the width for the filter button, and the max width of
+    # the excel.
+    PADDING = 2
+    MAX_WIDTH = 255
+    # the width of the values in the default number formats.
+    FIXED = {
+        bool: 5,
+        datetime.datetime: 19,
+        datetime.date: 10,
+        datetime.time: 8,
+    }
+    # the excel shows the float in the General format in 11 chars at most.
+    MAX_NUMBER = 11
+
+    def __init__(self):
+        self.widths = []
+        # the cols whose width is set by the set_col_style, never autofit.
+        self.fixed = set()
+
+    @classmethod
+    def _str_width(cls, value: str) -> int:
+        if "\n" in value:
+            return max(map(cls._str_width, value.splitlines()), default=0)
+        if value.isascii():
+            return len(value)
+        return len(value) + sum(
+            1 for c in value if unicodedata.east_asian_width(c) in "WF"
+        )
+
+    @classmethod
+    def width(cls, value) -> int:
+        if isinstance(value, str):
+            return cls._str_width(value)
+        fixed = cls.FIXED.get(type(value))
+        if fixed:
+            return fixed
+        if isinstance(value, float):
+            return min(len(repr(value)), cls.MAX_NUMBER)
+        return cls._str_width(str(value))
+
+    def update(self, values: t.Sequence) -> None:
+        widths = self.widths
+        if len(values) > len(widths):
+            widths.extend([0] * (len(values) - len(widths)))
+        for i, value in enumerate(values):
+            kind = type(value)
+            if kind is str:
+                if len(value) * 2 <= widths[i]:
+                    continue
+                if value.isascii() and "\n" not in value:
+                    width = len(value)
+                else:
+                    width = self._str_width(value)
+            elif kind is int:
+                width = len(str(value))
+            elif value is None:
+                continue
+            else:
+                width = self.width(value)
+            if width > widths[i]:
+                widths[i] = width
+
+    def apply(self, ws: t.Any) -> None:
+        """set the widths of the cols with the values to the worksheet."""
+        dimensions = ws.column_dimensions
+        for i, width in enumerate(self.widths):
+            col = COL_NAMES[i]
+            if width and col not in self.fixed:
+                dimensions[col].width = min(
+                    width + self.PADDING, self.MAX_WIDTH
+                )
+
+
+class _ColumnBuffer:
+    """
+    The growable buffer of a column for `WorkSheet.to_columns`.
+    the numeric column is stored in the contiguous typed storage, the numpy
+    array if the numpy is installed or the array.array otherwise, which is
+    allocated once and doubled while it's full. the others are in a list.
+
+    Args:
+        `dtype`: the numpy dtype, the array typecode or int, float, object.
+            the kind is inferred from the first value if it's None: the int
+            column is promoted to float by a float or None value, and the
+            numeric column is demoted to object by the other types.
+    """
+
+    INITIAL_SIZE = 1024
+    NUMERIC = {"int": ("q", "int64"), "float": ("d", "float64")}
+    TYPECODES = "bBhHiIlLqQfd"
+
+    def __init__(self, dtype=None):
+        self.fixed = dtype is not None
+        self.kind = self._kind(dtype) if self.fixed else None
+        self.dtype = dtype
+        self.size = 0
+        self._data = (
+            self._alloc(self.kind, self.INITIAL_SIZE) if self.fixed else None
+        )
+        # the None values before the first value, whose kind is unknown.
+        self._leading = 0
+
+    @classmethod
+    def _kind(cls, dtype) -> str:
+        # the identity check, the numpy dtype is equal to the python type.
+        if isinstance(dtype, type) and dtype in (int, float, object, str):
+            return {int: "int", float: "float"}.get(dtype, "object")
+        if isinstance(dtype, str) and dtype in cls.TYPECODES:
+            return "float" if dtype in "fd" else "int"
+        if np is None:
+            raise TypeError(f"The dtype: {dtype} is not supported.")
+        return {"i": "int", "u": "int", "f": "float"}.get(
+            np.dtype(dtype).kind, "object"
+        )
+
+    def _alloc(self, kind: str, size: int):
+        if kind == "object":
+            return []
+        typecode, np_dtype = self.NUMERIC[kind]
+        if self.fixed and self.dtype is not int and self.dtype is not float:
+            typecode = np_dtype = self.dtype
+        if np is not None:
+            return np.empty(size, dtype=np_dtype)
+        return array.array(
+            typecode, bytes(size * array.array(typecode).itemsize)
+        )
+
+    def _convert(self, kind: str) -> None:
+        """convert the stored values to the kind."""
+        values = self.values()
+        values = values.tolist() if hasattr(values, "tolist") else values
+        if self.kind == "float" and kind == "object":
+            # the NaN is the placeholder of the None in the float column.
+            values = [None if v != v else v for v in values]
+        self.kind = kind
+        self._data = self._alloc(kind, max(self.INITIAL_SIZE, self.size * 2))
+        size, self.size = self.size, 0
+        for value in values:
+            self._append(value)
+        assert self.size == size
+
+    def _infer(self, value) -> None:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            kind = "object"
+        elif isinstance(value, int) and not self._leading:
+            kind = "int"
+        else:
+            kind = "float"
+        self.kind = kind
+        self._data = self._alloc(kind, self.INITIAL_SIZE)
+        leading, self._leading = self._leading, 0
+        for _ in range(leading):
+            self._append(None)
+
+    def append(self, value) -> None:
+        if self.kind is None:
+            if value is None:
+                self._leading += 1
+                return
+            self._infer(value)
+        elif not self.fixed and self.kind != "object":
+            if isinstance(value, bool) or not isinstance(
+                value, (int, float, type(None))
+            ):
+                self._convert("object")
+            elif self.kind == "int" and not isinstance(value, int):
+                self._convert("float")
+        self._append(value)
+
+    def _append(self, value) -> None:
+        if self.kind == "object":
+            self._data.append(value)
+        else:
+            if self.size == len(self._data):
+                if np is not None:
+                    data = self._alloc(self.kind, self.size * 2)
+                    data[: self.size] = self._data
+                    self._data = data
+                else:
+                    self._data.extend(self._data)
+            if value is None:
+                if self.kind == "int":
+                    raise ValueError("The None can't be in the int column.")
+                value = float("nan")
+            self._data[self.size] = value
+        self.size += 1
+
+    def values(self):
+        """return the column array trimmed to its size."""
+        if self.kind is None:
+            self._infer(None)
+        if self.kind == "object":
+            if np is not None:
+                data = np.empty(self.size, dtype=object)
+                data[:] = self._data
+                return data
+            return self._data
+        if np is not None:
+            return self._data[: self.size].copy()
+        del self._data[self.size :]
+        return self._data
+
+
+class _Record:
+    """
+    The base of the row records yielded by `WorkSheet.to_records`, the
+    subclass of each sheet is generated by `_record_class` with the
+    `__slots__`, so there is not a `__dict__` for each row.
+    the value can be got by the attribute, the index or the header.
+    """
+
+    __slots__ = ()
+    # the headers in the same order of the __slots__.
+    _headers = ()
+
+    def __init__(self, *values):
+        for name, value in itertools.zip_longest(self.__slots__, values):
+            if name is None:
+                break
+            setattr(self, name, value)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return tuple(self)[key]
+        if not isinstance(key, int):
+            try:
+                key = self._headers.index(key)
+            except ValueError:
+                raise KeyError(key) from None
+        return getattr(self, self.__slots__[key])
+
+    def __iter__(self) -> t.Iterator:
+        for name in self.__slots__:
+            yield getattr(self, name)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, _Record):
+            return self._headers == other._headers and tuple(self) == tuple(
+                other
+            )
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        values = ", ".join(
+            f"{name}={value!r}" for name, value in zip(self.__slots__, self)
+        )
+        return f"{type(self).__name__}({values})"
+
+    def _asdict(self) -> dict:
+        return dict(zip(self._headers, self))
+
+
+def _record_class(headers: t.Sequence, name: str = "Record") -> type:
+    """generate the record class whose fields are the headers. the header
+    which isn't a valid identifier, such as the None, the keyword, the one
+    starts with a underscore or the duplicated one, is named `col_{idx}`
+    as the attribute, but it's still accessible by the header.
+    """
+    fields = []
+    for i, header in enumerate(headers):
+        field = header
+        if (
+            not isinstance(field, str)
+            or not field.isidentifier()
+            or keyword.iskeyword(field)
+            or field.startswith("_")
+            or field in fields
+        ):
+            field = f"col_{i}"
+        while field in fields:
+            field = f"{field}_"
+        fields.append(field)
+    name = name if name.isidentifier() else "Record"
+    return type(
+        name,
+        (_Record,),
+        {"__slots__": tuple(fields), "_headers": tuple(headers)},
+    )
+
+
+class _ChainedReader:
+    """the file-like reader of the head and then the rest of the src."""
+
+    def __init__(self, head: bytes, src: t.BinaryIO):
+        self._head = head
+        self._src = src
+
+    def read(self, size: int = -1) -> bytes:
+        if self._head:
+            head, self._head = self._head, b""
+            return head
+        return self._src.read(size)
+
+
+class _RowIndex:
+    """
+    The row offsets of a sheet in the read_only workbook for the random access.
+    the sheet xml is scanned once and the uncompressed offset of every
+    `STRIDE` `<row>` tag is kept, so the reading of a range seeks to the
+    nearest offset before it and parses at most `STRIDE` rows to get there,
+    instead of parsing all the rows before it.
+
+    the index is stored in the sidecar file `<filename>.rowidx` keyed by the
+    fingerprint, the mtime and the size, of the file while it's loaded, and
+    it's rebuilt while the file is changed.
+
+    Args:
+        `ws`: the read_only worksheet.
+    """
+
+    STRIDE = 256
+    CHUNK = 1 << 20
+    SUFFIX = ".rowidx"
+
+    ROW_RE = re.compile(rb"<(?:[\w.-]+:)?row\b([^>]*)>")
+    R_RE = re.compile(rb'\br="([\d.]+)"')
+    HEAD_RE = re.compile(rb"<(?:[\w.-]+:)?worksheet\b[^>]*>")
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.path = ws.parent.filename + self.SUFFIX
+        self.fingerprint = ws.parent.fingerprint
+        self.key = ws._worksheet_path
+        index = self._load()
+        if index is None:
+            index = self._build()
+            self._save(index)
+        self.head = index["head"].encode("utf-8")
+        self.rows = index["rows"]
+        self.offsets = index["offsets"]
+
+    def _read_sidecar(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                sidecar = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(sidecar, dict) or sidecar.get("fingerprint") != list(
+            self.fingerprint or ()
+        ):
+            return {}
+        return sidecar
+
+    def _load(self) -> t.Optional[dict]:
+        index = self._read_sidecar().get("sheets", {}).get(self.key)
+        if index and index.get("stride") == self.STRIDE:
+            return index
+        return None
+
+    def _save(self, index: dict) -> None:
+        """save the index with the ones of the other sheets, the failure is
+        only logged because the index can be rebuilt.
+        """
+        if self.fingerprint is None:
+            return
+        sidecar = self._read_sidecar()
+        sidecar["fingerprint"] = list(self.fingerprint)
+        sidecar.setdefault("sheets", {})[self.key] = index
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(sidecar, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except OSError:
+            log.warning(f"failed to save the row index: {self.path}.")
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+
+    def _build(self) -> dict:
+        """scan the sheet xml for the `<row>` tags in a single pass."""
+        head, rows, offsets = None, [], []
+        buf, offset, row, count = b"", 0, 0, 0
+        with self.ws._get_source() as src:
+            while True:
+                chunk = src.read(self.CHUNK)
+                buf += chunk
+                pos = 0
+                if head is None:
+                    match = self.HEAD_RE.search(buf)
+                    if match is None:
+                        if not chunk:
+                            break
+                        continue
+                    head, pos = match.group(), match.end()
+                end = len(buf)
+                if chunk:
+                    # keep the incomplete tag to the next chunk.
+                    cut = buf.rfind(b"<", pos)
+                    if cut != -1 and buf.find(b">", cut) == -1:
+                        end = cut
+                for match in self.ROW_RE.finditer(buf, pos, end):
+                    r = self.R_RE.search(match.group(1))
+                    row = int(float(r.group(1))) if r else row + 1
+                    if count % self.STRIDE == 0:
+                        rows.append(row)
+                        offsets.append(offset + match.start())
+                    count += 1
+                if not chunk:
+                    break
+                offset += end
+                buf = buf[end:]
+        log.info(f"build the row index of {self.key}: {count} rows.")
+        return {
+            "stride": self.STRIDE,
+            "head": (head or b"").decode("utf-8"),
+            "rows": rows,
+            "offsets": offsets,
+        }
+
+    def iter_rows(
+        self, start: int, stop: t.Optional[int] = None, max_col=None
+    ) -> t.Generator:
+        """yield the rows in values whose row numbers in [start, stop), the
+        rows are the same as the ones of the `ws.iter_rows` except that the
+        missing rows are not filled.
+        """
+        if not self.rows:
+            return
+        i = max(bisect.bisect_right(self.rows, start) - 1, 0)
+        wb = self.ws.parent
+        with self.ws._get_source() as src:
+            src.seek(self.offsets[i])
+            parser = WorkSheetParser(
+                _ChainedReader(self.head + b"<sheetData>", src),
+                self.ws._shared_strings,
+                data_only=wb.data_only,
+                epoch=wb.epoch,
+                date_formats=wb._date_formats,
+                timedelta_formats=wb._timedelta_formats,
+            )
+            # the row number of the row without the `r` is counted from it.
+            parser.row_counter = self.rows[i] - 1
+            for idx, cells in parser.parse():
+                if stop is not None and idx >= stop:
+                    return
+                if idx >= start:
+                    yield self.ws._get_row(
+                        cells, 1, max_col or self.ws.max_column, True
+                    )
+
+
+class _Snapshot:
+    """
+    The compact binary columnar snapshot of the values of a sheet, which is
+    read from the buffer, the mmap of the cache file or the bytes, without
+    parsing or loading it all. the layout:
+
+        header:     magic, version, nrows, ncols, nstrings
+        lengths:    uint32[nrows], the length of each row
+        tags:       uint8[ncols][nrows], the type of each cell, see `TAGS`
+        payloads:   int64[ncols][nrows], the value or the string index
+        offsets:    int64[nstrings + 1], the offsets of the strings
+        strings:    the utf-8 strings and the pickled values of other types
+
+    Args:
+        `buffer`: the bytes-like snapshot, see the `dump`.
+    """
+
+    MAGIC = b"XLSC"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHxxIIQ")
+    TAGS = (
+        NONE,
+        BOOL,
+        INT,
+        FLOAT,
+        STR,
+        DATETIME,
+        DATE,
+        TIME,
+        TIMEDELTA,
+        PICKLE,
+    ) = range(10)
+    EPOCH = datetime.datetime(1, 1, 1)
+    MICROSECOND = datetime.timedelta(microseconds=1)
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, version, nrows, ncols, nstrings = self.HEADER.unpack_from(view)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError("The snapshot is invalid.")
+        self.nrows, self.ncols = nrows, ncols
+        offset = self.HEADER.size
+        cells = nrows * ncols
+        sections = []
+        for size in (nrows * 4, cells, cells * 8, (nstrings + 1) * 8):
+            sections.append(view[offset : offset + size])
+            offset += self._pad(size)
+        self._views = [view] + sections
+        self._views.append(view[offset:])
+        lengths, tags, payloads, offsets, self._strings = self._views[1:]
+        self._lengths = lengths.cast("I")
+        self._tags = tags
+        self._ints = payloads.cast("q")
+        self._floats = payloads.cast("d")
+        self._offsets = offsets.cast("q")
+        self._views += [self._lengths, self._ints, self._floats, self._offsets]
+
+    @staticmethod
+    def _pad(size: int) -> int:
+        return (size + 7) & ~7
+
+    @classmethod
+    def _encode(cls, value, strings: dict) -> t.Tuple[int, t.Any]:
+        if value is None:
+            return cls.NONE, 0
+        if isinstance(value, bool):
+            return cls.BOOL, int(value)
+        if isinstance(value, int) and -(1 << 63) <= value < 1 << 63:
+            return cls.INT, value
+        if isinstance(value, float):
+            return cls.FLOAT, value
+        if isinstance(value, str):
+            return cls.STR, strings.setdefault(value, len(strings))
+        if isinstance(value, datetime.datetime) and value.tzinfo is None:
+            return cls.DATETIME, (value - cls.EPOCH) // cls.MICROSECOND
+        if isinstance(value, datetime.date) and not isinstance(
+            value, datetime.datetime
+        ):
+            return cls.DATE, value.toordinal()
+        if isinstance(value, datetime.time) and value.tzinfo is None:
+            return (
+                cls.TIME,
+                (datetime.datetime.combine(cls.EPOCH, value) - cls.EPOCH)
+                // cls.MICROSECOND,
+            )
+        if isinstance(value, datetime.timedelta):
+            return cls.TIMEDELTA, value // cls.MICROSECOND
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        return cls.PICKLE, strings.setdefault(data, len(strings))
+
+    @classmethod
+    def dump(cls, rows: t.Iterable[t.Sequence]) -> bytes:
+        """dump the rows in values to the snapshot."""
+        lengths = array.array("I")
+        tags, ints, floats = [], [], []
+        strings = {}
+        for i, row in enumerate(rows):
+            lengths.append(len(row))
+            while len(tags) < len(row):
+                # the new column is filled with None for the previous rows.
+                tags.append(bytearray(i))
+                ints.append(array.array("q", bytes(i * 8)))
+                floats.append({})
+            for j in range(len(tags)):
+                tag, payload = cls._encode(
+                    row[j] if j < len(row) else None, strings
+                )
+                tags[j].append(tag)
+                if tag == cls.FLOAT:
+                    floats[j][i] = payload
+                    payload = 0
+                ints[j].append(payload)
+        nrows, ncols = len(lengths), len(tags)
+        for column, column_floats in zip(ints, floats):
+            if column_floats:
+                # reinterpret the int64 payloads as the float64 in place.
+                view = memoryview(column).cast("B").cast("d")
+                for i, value in column_floats.items():
+                    view[i] = value
+                view.release()
+        blobs = [
+            value.encode("utf-8") if isinstance(value, str) else value
+            for value in strings
+        ]
+        offsets = array.array("q", [0])
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+
+        def padded(data: bytes) -> bytes:
+            return data + bytes(cls._pad(len(data)) - len(data))
+
+        parts = [
+            cls.HEADER.pack(
+                cls.MAGIC, cls.VERSION, nrows, ncols, len(strings)
+            ),
+            padded(lengths.tobytes()),
+            padded(b"".join(tags)),
+            padded(b"".join(column.tobytes() for column in ints)),
+            padded(offsets.tobytes()),
+        ]
+        parts.extend(blobs)
+        return b"".join(parts)
+
+    def _decode(self, idx: int):
+        tag = self._tags[idx]
+        if tag == self.NONE:
+            return None
+        if tag == self.FLOAT:
+            return self._floats[idx]
+        payload = self._ints[idx]
+        if tag == self.INT:
+            return payload
+        if tag == self.STR or tag == self.PICKLE:
+            data = self._strings[
+                self._offsets[payload] : self._offsets[payload + 1]
+            ]
+            return (
+                str(data, "utf-8") if tag == self.STR else pickle.loads(data)
+            )
+        if tag == self.BOOL:
+            return bool(payload)
+        if tag == self.DATETIME:
+            return self.EPOCH + payload * self.MICROSECOND
+        if tag == self.DATE:
+            return datetime.date.fromordinal(payload)
+        if tag == self.TIME:
+            return (self.EPOCH + payload * self.MICROSECOND).time()
+        return payload * self.MICROSECOND
+
+    def row(self, i: int, max_col: t.Optional[int] = None) -> tuple:
+        """return the row i which starts from 0, it's padded with None or
+        truncated to the max_col if it's set.
+        """
+        length = self._lengths[i]
+        width = max_col or length
+        return tuple(
+            self._decode(j * self.nrows + i) if j < length else None
+            for j in range(width)
+        )
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+class SheetCache:
+    """
+    The on-disk cache of the values of the sheets in read_only mode, so the
+    unchanged file is not unzipped and parsed again, see `_Snapshot`. the
+    entry is keyed by the path, the mtime, the size and the content hash of
+    the file and the sheet title, and it's read by the mmap.
+
+    the entries are evicted in the LRU order while their total size is more
+    than the max_bytes, the mtime of the entry is the last used time. the
+    hits, the misses and the evictions of current instance are in `stats`.
+
+        cache = SheetCache("/tmp/sheets")
+        with WorkSheet(filename, read_only=True, cache=cache) as ws:
+            rows = list(ws.to_dict())
+
+    Args:
+        `directory`: the cache directory, it's created if it's not existed.
+
+        `max_bytes`: the max total bytes of the entries.
+    """
+
+    SUFFIX = ".sheet"
+    CHUNK = 1 << 20
+
+    def __init__(self, directory: str, max_bytes: int = 1 << 30):
+        if not isinstance(max_bytes, int) or max_bytes < 0:
+            raise ValueError("The max_bytes must be a non-negative integer.")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def digest(self, filename: str) -> str:
+        """the content hash of the file, it's hashed once per workbook opened
+        for all its sheets, see the `_CachedWorkbook.digest`.
+        """
+        content = hashlib.blake2b()
+        with open(filename, "rb") as f:
+            for chunk in iter(lambda: f.read(self.CHUNK), b""):
+                content.update(chunk)
+        return content.hexdigest()
+
+    def key(
+        self,
+        filename: str,
+        title: str,
+        fingerprint: t.Optional[t.Tuple[int, int]] = None,
+        digest: t.Optional[str] = None,
+    ) -> str:
+        """the key of the sheet, the fingerprint and the digest of the file
+        are computed if they're not given.
+        """
+        mtime, size = fingerprint or _fingerprint(filename)
+        key = json.dumps(
+            [
+                _Snapshot.VERSION,
+                os.path.abspath(filename),
+                mtime,
+                size,
+                digest or self.digest(filename),
+                title,
+            ]
+        )
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key: str) -> t.Optional[_Snapshot]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            snapshot = _Snapshot(buffer)
+        except (OSError, ValueError, struct.error):
+            # the missing, empty or broken entry.
+            self.stats["misses"] += 1
+            return None
+        self._touch(path)
+        self.stats["hits"] += 1
+        return snapshot
+
+    @staticmethod
+    def _touch(path: str) -> None:
+        """set the last used time, the ns of the clock is set explicitly
+        because the file system's own timestamp may be coarse.
+        """
+        now = time.time_ns()
+        with contextlib.suppress(OSError):
+            os.utime(path, ns=(now, now))
+
+    def put(self, key: str, rows: t.Iterable[t.Sequence]) -> _Snapshot:
+        """dump the rows to the entry and return its snapshot, the failure of
+        writing is only logged and the snapshot is kept in memory.
+        """
+        data = _Snapshot.dump(rows)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            self._touch(path)
+        except OSError:
+            log.warning(f"failed to write the sheet cache: {path}.")
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+        else:
+            self._evict()
+        return _Snapshot(data)
+
+    def _entries(self) -> t.List[t.Tuple[int, int, str]]:
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            with contextlib.suppress(OSError):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return sorted(entries)
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(OSError):
+                os.remove(path)
+                self.stats["evictions"] += 1
+            total -= size
+
+    def size(self) -> int:
+        """the total bytes of the entries."""
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self) -> None:
+        for _, _, path in self._entries():
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+
+class _CachedSheet:
+    """the read_only sheet whose values are read from the `SheetCache`, the
+    snapshot is loaded, or dumped from the real sheet, in the first reading.
+    """
+
+    def __init__(self, parent: "_CachedWorkbook", title: str):
+        self.parent = parent
+        self.title = title
+        self._snapshot = None
+
+    @property
+    def snapshot(self) -> _Snapshot:
+        if self._snapshot is None:
+            cache = self.parent.cache
+            key = cache.key(
+                self.parent.filename,
+                self.title,
+                self.parent.fingerprint,
+                self.parent.digest,
+            )
+            self._snapshot = cache.get(key)
+            if self._snapshot is None:
+                ws = self.parent.load()[self.title]
+                self._snapshot = cache.put(key, ws.iter_rows(values_only=True))
+        return self._snapshot
+
+    def iter_rows(
+        self, min_row=None, max_row=None, max_col=None, values_only=False
+    ) -> t.Generator:
+        if not values_only:
+            raise ValueError("Only the values are in the sheet cache.")
+        snapshot = self.snapshot
+        stop = (
+            snapshot.nrows if max_row is None else min(max_row, snapshot.nrows)
+        )
+        for i in range((min_row or 1) - 1, stop):
+            yield snapshot.row(i, max_col)
+
+    def close(self) -> None:
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+
+
+class _CachedWorkbook:
+    """the read_only workbook of the `_CachedSheet`s, the sheet names are read
+    from the zip directly and the file is loaded while a sheet is missed only.
+    """
+
+    read_only = True
+    write_only = False
+
+    def __init__(
+        self,
+        filename: str,
+        cache: SheetCache,
+        lock: t.Optional[_FileLock] = None,
+        engine: str = "openpyxl",
+        lazy_strings: bool = False,
+    ):
+        self.filename = filename
+        self.cache = cache
+        self.engine = engine
+        self.lazy_strings = lazy_strings
+        self.fingerprint = _fingerprint(filename)
+        self._lock = lock
+        self._wb = None
+        self._digest = None
+        self.worksheets = [
+            _CachedSheet(self, title) for title in _sheet_names(filename)
+        ]
+
+    @property
+    def digest(self) -> str:
+        """the content hash of the file, it's hashed in the first reading."""
+        if self._digest is None:
+            self._digest = self.cache.digest(self.filename)
+        return self._digest
+
+    @property
+    def sheetnames(self) -> t.List[str]:
+        return [ws.title for ws in self.worksheets]
+
+    def __getitem__(self, title: str) -> _CachedSheet:
+        for ws in self.worksheets:
+            if ws.title == title:
+                return ws
+        raise KeyError(f"Worksheet {title} does not exist.")
+
+    def load(self) -> WB:
+        if self._wb is None:
+            with (
+                self._lock.shared() if self._lock else contextlib.nullcontext()
+            ):
+                self._wb = _load_read_only(
+                    self.filename, self.engine, self.lazy_strings
+                )
+        return self._wb
+
+    def close(self) -> None:
+        for ws in self.worksheets:
+            ws.close()
+        if self._wb is not None:
+            _close_workbook(self._wb)
+            self._wb = None
+
+
+class TemplateCache:
+    """
+    The in-memory cache of the parsed templates for `WorkSheet(template=...)`,
+    so a template rendered again and again is parsed once instead of being
+    copied and loaded for every report. the entry is keyed by the path, the
+    mtime and the size of the template, a modified template is parsed again.
+
+    the parsed workbook is kept pickled, and each report gets its own clone
+    unpickled from it, which is several times faster than the loading and
+    shares nothing with the other reports. the template which can't be
+    pickled is loaded for every report as before.
+
+    the entries are evicted in the LRU order while their total size is more
+    than the max_bytes. the hits, the misses and the evictions of current
+    instance are in `stats`, and it's thread safe.
+
+        cache = TemplateCache()
+        for report in reports:
+            with WorkSheet(
+                report.filename, template=TEMPLATE, template_cache=cache
+            ) as ws:
+                ws.extend(report.rows)
+
+    Args:
+        `max_bytes`: the max total bytes of the pickled templates.
+    """
+
+    def __init__(self, max_bytes: int = 1 << 28):
+        if not isinstance(max_bytes, int) or max_bytes < 0:
+            raise ValueError("The max_bytes must be a non-negative integer.")
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        # {path: (mtime_ns, size, pickled or None)} in the LRU order.
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(template: str) -> t.Tuple[str, t.Tuple[int, int]]:
+        st = os.stat(template)
+        return os.path.abspath(template), (st.st_mtime_ns, st.st_size)
+
+    def _parse(self, template: str) -> t.Tuple[WB, t.Optional[bytes]]:
+        wb = load_workbook(template)
+        try:
+            return wb, pickle.dumps(wb, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            log.warning(
+                f"The template: {template} can't be pickled, it's loaded for "
+                f"every report: {traceback.format_exc()}"
+            )
+            return wb, None
+
+    def load(self, template: str) -> WB:
+        """return a new workbook of the template."""
+        path, stamp = self._key(template)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(path)
+                self.stats["hits"] += 1
+                pickled = entry[1]
+            else:
+                self.stats["misses"] += 1
+                pickled = False
+        if pickled:
+            return pickle.loads(pickled)
+        if pickled is None:
+            return load_workbook(template)
+        wb, pickled = self._parse(template)
+        with self._lock:
+            self._entries[path] = (stamp, pickled)
+            self._entries.move_to_end(path)
+            self._evict()
+        return wb
+
+    def _evict(self) -> None:
+        size = self.size()
+        while size > self.max_bytes and self._entries:
+            _, (_, pickled) = self._entries.popitem(last=False)
+            size -= len(pickled or b"")
+            self.stats["evictions"] += 1
+
+    def size(self) -> int:
+        """the total bytes of the pickled templates."""
+        return sum(len(p or b"") for _, p in self._entries.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class _NativeDimension:
+    """the col dimension of the `_NativeWorksheet`, see the `ColStyler`."""
+
+    __slots__ = ("width",)
+
+    def __init__(self):
+        self.width = None
+
+
+class _NativeRowDimension(StyleableObject):
+    """the row dimension of the `_NativeWorksheet`, see the `RowStyler`, the
+    font, the fill and the alignment are stored in the style array of the
+    openpyxl sheet's workbook.
+    """
+
+    __slots__ = ("height", "hidden", "outline_level")
+
+    def __init__(self, sheet):
+        super().__init__(sheet)
+        self.height = None
+        self.hidden = False
+        self.outline_level = 0
+
+
+class _NativeWorksheet:
+    """
+    The write_only worksheet of the native engine, see `_NativeWorkbook`.
+    the row is serialized to the sheet xml while appending, there is not a
+    cell object for each value, and the value types are inferred as openpyxl
+    does, so the file is read back the same as the openpyxl one.
+
+    the rows xml is spooled to a temp file, and it's zipped after the head,
+    which has the dimension and the col widths, while saving. so the col
+    style can be set after appending too. the row style is written with the
+    row, so it must be set before the row is appended.
+    """
+
+    # the rows are encoded and written to the spool in chunks of it.
+    FLUSH_ROWS = 1000
+    _ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
+    def __init__(self, parent: "_NativeWorkbook", title: t.Optional[str]):
+        self.parent = parent
+        # the openpyxl sheet checks the title and owns the style cells only.
+        self._sheet = parent._wb.create_sheet(title)
+        self.column_dimensions = defaultdict(_NativeDimension)
+        self.row_dimensions = defaultdict(
+            functools.partial(_NativeRowDimension, self._sheet)
+        )
+        self._spool = tempfile.TemporaryFile()
+        self._buffer = []
+        self._max_row = 0
+        self._max_col = 0
+
+    @property
+    def title(self) -> str:
+        return self._sheet.title
+
+    @property
+    def conditional_formatting(self):
+        return self._sheet.conditional_formatting
+
+    def _formatting(self) -> bytes:
+        """the conditional formatting xml, see openpyxl's WorksheetWriter."""
+        empty = DifferentialStyle()
+        formatting = []
+        for cf in self._sheet.conditional_formatting:
+            for rule in cf.rules:
+                if rule.dxf and rule.dxf != empty:
+                    rule.dxfId = self.parent._wb._differential_styles.add(
+                        rule.dxf
+                    )
+            formatting.append(tostring(cf.to_tree()))
+        return b"".join(formatting)
+
+    def _xf(self, style: t.Optional[dict], number_format=None) -> int:
+        """return the index of the style in the cell style table, each
+        distinct style is resolved by the `CellStyler` once.
+        """
+        if not style and number_format is None:
+            return 0
+        xfs = self.parent._xfs
+        try:
+            key = (frozenset(style.items()) if style else None, number_format)
+            return xfs[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # the unhashable style value, such as a list, is not cached.
+            key = None
+        cell = Cell(self._sheet)
+        if style:
+            CellStyler(style)(cell)
+        if number_format is not None:
+            cell.number_format = number_format
+        xf = self.parent._wb._cell_styles.add(cell._style)
+        if key is not None:
+            xfs[key] = xf
+        return xf
+
+    def _string(self, value: str) -> str:
+        """return the attributes and the content of the string cell."""
+        value = value[:32767]
+        if ILLEGAL_CHARACTERS_RE.search(value):
+            raise IllegalCharacterError(
+                f"{value} cannot be used in worksheets."
+            )
+        if len(value) > 1 and value[0] == "=":
+            return f"><f>{value[1:].translate(self._ESCAPE)}</f><v></v></c>"
+        if value in ERROR_CODES:
+            return f' t="e"><v>{value}</v></c>'
+        if not value:
+            return ' t="inlineStr"/>'
+        strings = self.parent._strings
+        if strings is not None:
+            self.parent._string_count += 1
+            try:
+                return f' t="s"><v>{strings[value]}</v></c>'
+            except KeyError:
+                strings[value] = len(strings)
+                return f' t="s"><v>{strings[value]}</v></c>'
+        return f' t="inlineStr"><is>{self._text(value)}</is></c>'
+
+    @classmethod
+    def _text(cls, value: str) -> str:
+        text = value.translate(cls._ESCAPE)
+        stripped = value.strip()
+        if stripped and stripped != value:
+            return f'<t xml:space="preserve">{text}</t>'
+        return f"<t>{text}</t>"
+
+    @staticmethod
+    def _number(value) -> str:
+        if not math.isfinite(value):
+            return ' t="n"><v></v></c>'
+        return f' t="n"><v>{"%.16g" % value}</v></c>'
+
+    def _cell(
+        self, value, style: t.Optional[dict], xf: int
+    ) -> t.Tuple[int, str]:
+        """return the style index and the cell xml after it, the value type
+        is inferred by openpyxl's type table.
+        """
+        kind = type(value)
+        dt = _TYPES.get(kind) or get_type(kind, value)
+        if dt == "n":
+            return xf, self._number(value)
+        if dt == "b":
+            return xf, f' t="b"><v>{1 if value else 0}</v></c>'
+        if dt == "s" and isinstance(value, (str, bytes)):
+            if isinstance(value, bytes):
+                value = value.decode("utf-8")
+            return xf, self._string(value)
+        if dt == "d":
+            if getattr(value, "tzinfo", None) is not None:
+                raise TypeError(
+                    "Excel does not support timezones in datetimes. The "
+                    "tzinfo in the datetime/time object must be set to None."
+                )
+            # the date is the number in the date format style.
+            if style or not xf:
+                xf = self._xf(style, get_time_format(kind))
+            else:
+                xf = self._formatted(xf, get_time_format(kind))
+            return xf, self._number(to_excel(value, self.parent._wb.epoch))
+        raise ValueError(f"Cannot convert {value!r} to Excel")
+
+    def _formatted(self, xf: int, number_format: str) -> int:
+        """return the index of the style of the xf in the number format, for
+        the date in the styled row.
+        """
+        xfs = self.parent._xfs
+        # the key of the style dict is (frozenset or None, number_format).
+        key = (xf, number_format)
+        if key not in xfs:
+            cell = Cell(self._sheet)
+            cell._style = StyleArray(self.parent._wb._cell_styles[xf])
+            cell.number_format = number_format
+            xfs[key] = self.parent._wb._cell_styles.add(cell._style)
+        return xfs[key]
+
+    def _row(self, r: int) -> t.Tuple[int, str]:
+        """return the style index and the attributes of the row."""
+        dim = self.row_dimensions.get(r)
+        if dim is None:
+            return 0, ""
+        xf = 0
+        attrs = []
+        if dim.has_style:
+            xf = self.parent._wb._cell_styles.add(dim._style)
+            attrs.append(f' s="{xf}" customFormat="1"')
+        if dim.height is not None:
+            attrs.append(f' ht="{dim.height}" customHeight="1"')
+        if dim.hidden:
+            attrs.append(' hidden="1"')
+        if dim.outline_level:
+            attrs.append(f' outlineLevel="{dim.outline_level}"')
+        return xf, "".join(attrs)
+
+    def _styles(self, style, size: int) -> t.List[t.Optional[dict]]:
+        if not style:
+            return [None] * size
+        if isinstance(style, dict):
+            return [style] * size
+        return [*style[:size], *[None] * (size - len(style))]
+
+    def append(self, values: t.Sequence, style=None) -> None:
+        """append a row of the values, the style is the same as the
+        `WorkSheet.append`.
+        """
+        if len(values) > MAX_COL:
+            raise ValueError(
+                "The col nums is too big, which supported only A-XFD!"
+            )
+        self._max_row += 1
+        r = self._max_row
+        # the cell without a style shares the row's style.
+        row_xf, attrs = self._row(r) if self.row_dimensions else (0, "")
+        cells = [f'<row r="{r}"{attrs}>']
+        last = 0
+        styles = self._styles(style, len(values))
+        for i, (value, col_style) in enumerate(zip(values, styles)):
+            xf = self._xf(col_style) if col_style else row_xf
+            if value is None:
+                if not col_style:
+                    continue
+                cell = "/>"
+            else:
+                kind = type(value)
+                if kind is str:
+                    cell = self._string(value)
+                elif kind is int or kind is float:
+                    cell = self._number(value)
+                else:
+                    xf, cell = self._cell(value, col_style, xf)
+            s = f' s="{xf}"' if xf else ""
+            cells.append(f'<c r="{COL_NAMES[i]}{r}"{s}{cell}')
+            last = i + 1
+        cells.append("</row>")
+        self._max_col = max(self._max_col, last)
+        self._buffer.append("".join(cells))
+        if len(self._buffer) >= self.FLUSH_ROWS:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._buffer:
+            self._spool.write("".join(self._buffer).encode("utf-8"))
+            self._buffer.clear()
+
+    def _head(self) -> bytes:
+        if self._max_col:
+            ref = f"A1:{COL_NAMES[self._max_col - 1]}{self._max_row}"
+        else:
+            ref = "A1"
+        cols = "".join(
+            f'<col min="{i}" max="{i}" width="{dim.width}" customWidth="1"/>'
+            for i, dim in sorted(
+                (COL_INDEXES[col], dim)
+                for col, dim in self.column_dimensions.items()
+                if dim.width is not None
+            )
+        )
+        selected = (
+            ' tabSelected="1"' if self is self.parent.worksheets[0] else ""
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<worksheet xmlns="{SHEET_MAIN_NS}" xmlns:r="{REL_NS}">'
+            f'<dimension ref="{ref}"/>'
+            f'<sheetViews><sheetView{selected} workbookViewId="0"/>'
+            '</sheetViews><sheetFormatPr defaultRowHeight="15"/>'
+            f"{f'<cols>{cols}</cols>' if cols else ''}<sheetData>"
+        ).encode("utf-8")
+
+    def write(self, archive: zipfile.ZipFile, arcname: str) -> None:
+        """write the sheet xml to the archive, the rows are copied from the
+        spool in chunks.
+        """
+        self._flush()
+        head = self._head()
+        tail = (
+            b"</sheetData>"
+            + self._formatting()
+            + b'<pageMargins left="0.75" right="0.75" top="1" '
+            b'bottom="1" header="0.5" footer="0.5"/></worksheet>'
+        )
+        size = len(head) + self._spool.tell() + len(tail)
+        self._spool.seek(0)
+        if isinstance(archive, _ParallelZipFile):
+            archive.writestream(
+                arcname,
+                itertools.chain(
+                    [head],
+                    iter(functools.partial(self._spool.read, 1 << 20), b""),
+                    [tail],
+                ),
+            )
+            return
+        with archive.open(
+            arcname, "w", force_zip64=size >= zipfile.ZIP64_LIMIT
+        ) as dst:
+            dst.write(head)
+            shutil.copyfileobj(self._spool, dst, 1 << 20)
+            dst.write(tail)
+
+    def close(self) -> None:
+        self._spool.close()
+
+
+class _NativeWorkbook:
+    """
+    The write_only workbook of the native engine, which is used instead of
+    the openpyxl one by `WorkSheet(engine="native")`. the sheets are
+    serialized to the xml directly, see the `_NativeWorksheet`, and the
+    other parts are written while saving.
+
+    the openpyxl workbook inside is the registry of the sheet titles and the
+    styles only, the styles are written by the openpyxl's stylesheet writer,
+    so the style indexes are the same as openpyxl's.
+
+    Args:
+        `compresslevel`: the deflate level of the zip members in 0-9, the
+            smaller the faster, default is the zlib's default.
+
+        `shared_strings`: write the strings to the shared strings table,
+            which is smaller if there are many repeated strings, or write
+            them inline in the sheet otherwise.
+    """
+
+    read_only = False
+    write_only = True
+
+    def __init__(
+        self, compresslevel: t.Optional[int] = None, shared_strings=False
+    ):
+        if compresslevel is not None and compresslevel not in range(10):
+            raise ValueError("The compresslevel must be in 0-9.")
+        self.compresslevel = compresslevel
+        self._wb = WB(write_only=True)
+        self.worksheets = []
+        # the cell style indexes of the frozen style dicts.
+        self._xfs = {}
+        # the shared strings and their indexes, None if they're inline.
+        self._strings = {} if shared_strings else None
+        self._string_count = 0
+
+    @property
+    def sheetnames(self) -> t.List[str]:
+        return [ws.title for ws in self.worksheets]
+
+    def __getitem__(self, title: str) -> _NativeWorksheet:
+        for ws in self.worksheets:
+            if ws.title == title:
+                return ws
+        raise KeyError(f"Worksheet {title} does not exist.")
+
+    def create_sheet(self, title: t.Optional[str] = None) -> _NativeWorksheet:
+        ws = _NativeWorksheet(self, title)
+        self.worksheets.append(ws)
+        return ws
+
+    def _shared_strings(self) -> bytes:
+        items = "".join(
+            f"<si>{_NativeWorksheet._text(s)}</si>" for s in self._strings
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<sst xmlns="{SHEET_MAIN_NS}" count="{self._string_count}" '
+            f'uniqueCount="{len(self._strings)}">{items}</sst>'
+        ).encode("utf-8")
+
+    def _parts(self) -> t.Dict[str, t.Union[str, bytes]]:
+        """return the parts except the sheets in {arcname: content}."""
+        n = len(self.worksheets)
+        sheets, sheet_rels, overrides = [], [], []
+        for i, ws in enumerate(self.worksheets, 1):
+            name = escape(ws.title, {'"': "&quot;"})
+            sheets.append(
+                f'<sheet name="{name}" sheetId="{i}" r:id="rId{i}"/>'
+            )
+            sheet_rels.append(
+                f'<Relationship Id="rId{i}" Type="{REL_NS}/worksheet" '
+                f'Target="worksheets/sheet{i}.xml"/>'
+            )
+            overrides.append((f"xl/worksheets/sheet{i}.xml", WORKSHEET_TYPE))
+        rels = [("styles", "styles.xml"), ("theme", "theme/theme1.xml")]
+        overrides += [
+            (ARC_WORKBOOK, XLSX),
+            (ARC_STYLE, STYLES_TYPE),
+            (ARC_THEME, THEME_TYPE),
+            (
+                ARC_CORE,
+                "application/vnd.openxmlformats-package.core-properties+xml",
+            ),
+            (
+                ARC_APP,
+                "application/vnd.openxmlformats-officedocument.extended-properties+xml",
+            ),
+        ]
+        parts = {}
+        if self._strings is not None:
+            rels.append(("sharedStrings", "sharedStrings.xml"))
+            overrides.append((ARC_SHARED_STRINGS, SHARED_STRINGS))
+            parts[ARC_SHARED_STRINGS] = self._shared_strings()
+        sheet_rels += [
+            f'<Relationship Id="rId{n + i}" Type="{REL_NS}/{kind}" '
+            f'Target="{target}"/>'
+            for i, (kind, target) in enumerate(rels, 1)
+        ]
+        declaration = (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        )
+        parts[ARC_CONTENT_TYPES] = (
+            f'{declaration}<Types xmlns="{CONTYPES_NS}">'
+            f'<Default Extension="rels" ContentType="application/'
+            'vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            + "".join(
+                f'<Override PartName="/{name}" ContentType="{content_type}"/>'
+                for name, content_type in overrides
+            )
+            + "</Types>"
+        )
+        parts[ARC_ROOT_RELS] = (
+            f'{declaration}<Relationships xmlns="{PKG_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" '
+            f'Target="{ARC_WORKBOOK}"/>'
+            f'<Relationship Id="rId2" Type="{PKG_REL_NS}/metadata/'
+            f'core-properties" Target="{ARC_CORE}"/>'
+            f'<Relationship Id="rId3" Type="{REL_NS}/extended-properties" '
+            f'Target="{ARC_APP}"/></Relationships>'
+        )
+        parts[ARC_WORKBOOK] = (
+            f'{declaration}<workbook xmlns="{SHEET_MAIN_NS}" '
+            f'xmlns:r="{REL_NS}"><workbookPr/><bookViews>'
+            '<workbookView activeTab="0"/></bookViews>'
+            f'<sheets>{"".join(sheets)}</sheets>'
+            '<calcPr calcId="124519" fullCalcOnLoad="1"/></workbook>'
+        )
+        parts[ARC_WORKBOOK_RELS] = (
+            f'{declaration}<Relationships xmlns="{PKG_REL_NS}">'
+            f'{"".join(sheet_rels)}</Relationships>'
+        )
+        parts[ARC_STYLE] = tostring(write_stylesheet(self._wb))
+        parts[ARC_THEME] = theme_xml
+        parts[ARC_CORE] = tostring(DocumentProperties().to_tree())
+        parts[ARC_APP] = tostring(ExtendedProperties().to_tree())
+        return parts
+
+    def save(self, filename: str, compression: t.Optional[str] = None) -> None:
+        """save the workbook in the compression preset, see the `_zip_file`,
+        or deflated in the compresslevel by the zip file if it's None.
+        """
+        if compression is None:
+            archive = zipfile.ZipFile(
+                filename,
+                "w",
+                zipfile.ZIP_DEFLATED,
+                allowZip64=True,
+                compresslevel=self.compresslevel,
+            )
+        else:
+            archive = _zip_file(filename, compression)
+        with archive:
+            for i, ws in enumerate(self.worksheets, 1):
+                ws.write(archive, f"xl/worksheets/sheet{i}.xml")
+            for arcname, content in self._parts().items():
+                archive.writestr(arcname, content)
+
+    def close(self) -> None:
+        for ws in self.worksheets:
+            ws.close()
+
+
+class _SharedStrings:
+    """
+    The shared strings table loaded lazily, it's used instead of the list of
+    openpyxl by `WorkSheet(lazy_strings=True)`. the part is decompressed to
+    a temp file and indexed once by expat into the offsets of the `<si>`s,
+    the temp file is memory-mapped and a string is decoded only when a cell
+    refers to it, the decoded ones are in a LRU cache.
+
+    the strings are the same as the ones of openpyxl's `read_string_table`.
+
+    Args:
+        `src`: the file object of the shared strings part.
+
+        `maxsize`: the max decoded strings cached.
+    """
+
+    CHUNK = 1 << 20
+    MAXSIZE = 4096
+
+    def __init__(self, src: t.BinaryIO, maxsize: t.Optional[int] = None):
+        self._file = tempfile.TemporaryFile()
+        # the offsets of the <si>s, and the end of the last one.
+        self._offsets = array.array("q")
+        self._namespaces = {}
+        self._mmap = None
+        try:
+            self._index(src)
+        except BaseException:
+            self._file.close()
+            raise
+        if self._offsets:
+            self._mmap = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        # the <si> is wrapped in the namespaces declared by the root.
+        self._head = "<sst %s>" % " ".join(
+            (
+                f"xmlns:{prefix}={quoteattr(uri)}"
+                if prefix
+                else f"xmlns={quoteattr(uri)}"
+            )
+            for prefix, uri in self._namespaces.items()
+        )
+        self._head = self._head.encode()
+        # the plain string without the runs and the entities is decoded
+        # without the xml parser, the prefix is the main namespace's.
+        prefix = next(
+            (
+                re.escape(p.encode()) + b":" if p else b""
+                for p, uri in self._namespaces.items()
+                if uri == SHEET_MAIN_NS
+            ),
+            b"",
+        )
+        self._plain_re = re.compile(
+            rb"<%(p)ssi>\s*<%(p)st(?:\s+xml:space=\"preserve\")?\s*>"
+            rb"([^<&\r]*)</%(p)st>\s*</%(p)ssi>\s*\Z" % {b"p": prefix}
+        )
+        self._decode = self._decoder(
+            self.MAXSIZE if maxsize is None else maxsize
+        )
+
+    def _index(self, src: t.BinaryIO) -> None:
+        # the handlers don't refer to self, the parser is in a cycle with them.
+        offsets, namespaces = self._offsets, self._namespaces
+        si, sst = f"{SHEET_MAIN_NS} si", f"{SHEET_MAIN_NS} sst"
+        parser = expat.ParserCreate(namespace_separator=" ")
+
+        def start(name, attrs):
+            if name == si:
+                offsets.append(parser.CurrentByteIndex)
+
+        def end(name):
+            if name == sst and offsets:
+                offsets.append(parser.CurrentByteIndex)
+
+        def declare(prefix, uri):
+            namespaces.setdefault(prefix, uri)
+
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.StartNamespaceDeclHandler = declare
+        while True:
+            chunk = src.read(self.CHUNK)
+            self._file.write(chunk)
+            parser.Parse(chunk, not chunk)
+            if not chunk:
+                break
+        self._file.flush()
+
+    def _decoder(self, maxsize: int) -> t.Callable[[int], str]:
+        """return the LRU cached decoder of a string by its index. it's a
+        closure instead of the bound method, so the cache doesn't refer to
+        self and the strings are freed without the gc.
+        """
+        offsets, mm, head = self._offsets, self._mmap, self._head
+        plain_re = self._plain_re
+
+        @functools.lru_cache(maxsize)
+        def decode(idx: int) -> str:
+            raw = mm[offsets[idx] : offsets[idx + 1]]
+            plain = plain_re.match(raw)
+            if plain:
+                text = plain.group(1).decode()
+            else:
+                node = ElementTree.fromstring(head + raw + b"</sst>")[0]
+                text = Text.from_tree(node).content
+            return text.replace("x005F_", "")
+
+        return decode
+
+    def __len__(self):
+        return max(len(self._offsets) - 1, 0)
+
+    def __getitem__(self, idx: int) -> str:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("The shared string index out of range.")
+        return self._decode(idx)
+
+    def __iter__(self):
+        return (self[idx] for idx in range(len(self)))
+
+    def close(self) -> None:
+        self._decode.cache_clear()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+
+class _LazyStringsReader(ExcelReader):
+    """the openpyxl reader whose shared strings are the `_SharedStrings`."""
+
+    def read_strings(self):
+        ct = self.package.find(SHARED_STRINGS)
+        if ct is not None:
+            with self.archive.open(ct.PartName[1:]) as src:
+                self.shared_strings = _SharedStrings(src)
+
+
+def _load_read_only(
+    filename: str, engine: str = "openpyxl", lazy_strings: bool = False
+) -> t.Any:
+    """load the workbook in read_only mode by the engine, the shared strings
+    are loaded lazily if `lazy_strings`, see the `_SharedStrings`.
+    """
+    if engine == "fast":
+        return _FastWorkbook(filename, lazy_strings)
+    if lazy_strings:
+        reader = _LazyStringsReader(filename, read_only=True)
+        try:
+            reader.read()
+        except BaseException:
+            if isinstance(reader.shared_strings, _SharedStrings):
+                reader.shared_strings.close()
+            raise
+        # the read_only workbook doesn't use its shared strings, they're kept
+        # to be closed with the workbook, see the `_close_workbook`.
+        reader.wb.shared_strings = reader.shared_strings
+        return reader.wb
+    return load_workbook(filename, read_only=True)
+
+
+def _close_workbook(wb: t.Any) -> None:
+    """close the workbook and its lazy shared strings if any, the temp
+    files of the write_only worksheets not saved are closed and removed.
+    """
+    try:
+        for ws in getattr(wb, "_sheets", ()):
+            if isinstance(ws, WriteOnlyWorksheet) and not ws.closed:
+                ws.close()
+                ws._writer.cleanup()
+        wb.close()
+    finally:
+        strings = getattr(wb, "shared_strings", None)
+        if isinstance(strings, _SharedStrings):
+            strings.close()
+
+
+class _FastWorksheet:
+    """
+    The read_only worksheet of the fast engine, see `_FastWorkbook`. the
+    sheet xml is parsed by expat in chunks, there is neither an element tree
+    nor a cell object, the values are decoded as openpyxl does, and the rows
+    are the same as the ones of openpyxl's read_only worksheet. it's for
+    reading the values only.
+
+    it has the attributes of openpyxl's read_only worksheet used by the
+    `_RowIndex`, so the read_rows seeks by the row index too.
+    """
+
+    CHUNK = 1 << 20
+    DIMENSION_RE = re.compile(
+        rb'<(?:[\w.-]+:)?dimension\b[^>]*\bref="([^"]+)"'
+    )
+    SHEET_DATA_RE = re.compile(rb"<(?:[\w.-]+:)?sheetData\b")
+
+    _get_row = ReadOnlyWorksheet._get_row
+
+    def __init__(self, parent: "_FastWorkbook", title: str, path: str):
+        self.parent = parent
+        self.title = title
+        self._worksheet_path = path
+        self._shared_strings = parent.shared_strings
+        self.min_column = self.min_row = 1
+        self.max_column = self.max_row = None
+        self._read_dimension()
+
+    def _get_source(self) -> t.BinaryIO:
+        return self.parent._archive.open(self._worksheet_path)
+
+    def _read_dimension(self) -> None:
+        """read the dimension before the sheet data, the sheet is unsized if
+        there isn't, and the whole sheet isn't scanned like openpyxl.
+        """
+        head = b""
+        with self._get_source() as src:
+            while True:
+                chunk = src.read(1 << 16)
+                head += chunk
+                sheet_data = self.SHEET_DATA_RE.search(head)
+                if sheet_data or not chunk:
+                    break
+        match = self.DIMENSION_RE.search(
+            head, 0, sheet_data.start() if sheet_data else len(head)
+        )
+        if match:
+            (
+                self.min_column,
+                self.min_row,
+                self.max_column,
+                self.max_row,
+            ) = range_boundaries(match.group(1).decode("ascii"))
+
+    @staticmethod
+    def _formula(attrs: dict, ref: str, shared: dict) -> t.Any:
+        """the formula of the cell, see openpyxl's WorkSheetParser."""
+        value = "=" + attrs["text"]
+        kind = attrs.get("t")
+        if kind == "array" and ArrayFormula is not None:
+            return ArrayFormula(ref=attrs.get("ref"), text=value)
+        if kind == "shared":
+            idx = attrs.get("si")
+            if idx in shared:
+                return shared[idx].translate_formula(ref)
+            if value != "=":
+                shared[idx] = Translator(value, ref)
+        elif kind == "dataTable" and DataTableFormula is not None:
+            return DataTableFormula(
+                **{k: v for k, v in attrs.items() if k != "text"}
+            )
+        return value
+
+    def _parse(self) -> t.Generator:
+        """yield the (row number, col indexes, values) of the rows, the col
+        indexes is None if they're 1, 2, 3, ... in the order.
+        """
+        wb = self.parent
+        strings = self._shared_strings
+        date_formats = wb._date_formats
+        timedelta_formats = wb._timedelta_formats
+        epoch = wb.epoch
+        shared_formulae = {}
+        rows = []
+        # the tags are resolved to "{namespace} {name}" by the expat.
+        ns = SHEET_MAIN_NS
+        C, V, ROW, T, IS, R, F, RPH = (
+            f"{ns} {tag}"
+            for tag in ("c", "v", "row", "t", "is", "r", "f", "rPh")
+        )
+        parser = expat.ParserCreate(namespace_separator=" ")
+        parser.buffer_text = True
+        row_idx = col_idx = 0
+        cols = values = None
+        # the state of the current cell, the text is collected in the list.
+        ref = kind = style = formula = value = text = None
+        # the plain text and the rich text runs of the inline string.
+        plain = runs = None
+        in_run = in_phonetic = False
+
+        def collect() -> None:
+            nonlocal text
+            text = []
+            parser.CharacterDataHandler = text.append
+
+        def collected() -> str:
+            parser.CharacterDataHandler = None
+            return "".join(text)
+
+        def start(name, attrs):
+            nonlocal row_idx, col_idx, cols, values, ref, kind, style
+            nonlocal formula, plain, runs, in_run, in_phonetic, value
+            if name == C:
+                ref = attrs.get("r")
+                kind = attrs.get("t", "n")
+                style = attrs.get("s")
+                formula = value = plain = runs = None
+            elif name == V:
+                collect()
+            elif name == ROW:
+                r = attrs.get("r")
+                if r is None:
+                    row_idx += 1
+                elif r.isdigit():
+                    row_idx = int(r)
+                elif float(r).is_integer():
+                    row_idx = int(float(r))
+                else:
+                    raise ValueError(f"{r} is not a valid row number")
+                col_idx = 0
+                cols, values = None, []
+            elif name == T:
+                if runs is not None and not in_phonetic:
+                    collect()
+            elif name == IS:
+                plain, runs = "", []
+            elif name == R:
+                in_run = True
+            elif name == F:
+                formula = attrs
+                collect()
+            elif name == RPH:
+                in_phonetic = True
+
+        def end(name):
+            nonlocal col_idx, cols, formula, value, plain, in_run, in_phonetic
+            if name == V:
+                value = collected() or None
+            elif name == C:
+                if ref:
+                    letters = ref.rstrip("0123456789")
+                    col_idx = COL_INDEXES.get(
+                        letters
+                    ) or column_index_from_string(letters.strip("$").upper())
+                else:
+                    col_idx += 1
+                if formula is not None:
+                    value = _FastWorksheet._formula(
+                        formula, ref, shared_formulae
+                    )
+                elif kind == "inlineStr":
+                    value = None if runs is None else plain + "".join(runs)
+                elif value is not None:
+                    if kind == "n":
+                        value = _cast_number(value)
+                        if style and int(style) in date_formats:
+                            try:
+                                value = from_excel(
+                                    value,
+                                    epoch,
+                                    timedelta=int(style) in timedelta_formats,
+                                )
+                            except (OverflowError, ValueError):
+                                warnings.warn(
+                                    f"Cell {ref} is marked as a date but the "
+                                    f"serial value {value} is outside the "
+                                    "limits for dates. The cell will be "
+                                    "treated as an error."
+                                )
+                                value = "#VALUE!"
+                    elif kind == "s":
+                        value = strings[int(value)]
+                    elif kind == "b":
+                        value = bool(int(value))
+                    elif kind == "d":
+                        value = from_ISO8601(value)
+                if cols is None and col_idx != len(values) + 1:
+                    cols = list(range(1, len(values) + 1))
+                if cols is not None:
+                    cols.append(col_idx)
+                values.append(value)
+            elif name == ROW:
+                rows.append((row_idx, cols, values))
+            elif name == T:
+                if parser.CharacterDataHandler is not None:
+                    if in_run:
+                        runs.append(collected())
+                    else:
+                        plain = collected()
+            elif name == R:
+                in_run = False
+            elif name == F:
+                formula = dict(formula, text=collected())
+            elif name == RPH:
+                in_phonetic = False
+
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        with self._get_source() as src:
+            while True:
+                chunk = src.read(self.CHUNK)
+                parser.Parse(chunk, not chunk)
+                yield from rows
+                rows.clear()
+                if not chunk:
+                    return
+
+    @staticmethod
+    def _values(
+        cols: t.Optional[t.List[int]],
+        values: list,
+        min_col: int,
+        max_col: t.Optional[int] = None,
+    ) -> tuple:
+        """the row in values from the min_col to the max_col, the missing
+        cells are filled with None, see openpyxl's `_get_row`.
+        """
+        if not values and not max_col:
+            return ()
+        if cols is None and min_col == 1:
+            n = len(values)
+            if max_col is None or max_col == n:
+                return tuple(values)
+            if max_col < n:
+                return tuple(values[:max_col])
+            return (*values, *(None,) * (max_col - n))
+        if cols is None:
+            cols = range(1, len(values) + 1)
+        max_col = max_col or cols[-1]
+        row = [None] * (max_col + 1 - min_col)
+        for col_idx, value in zip(cols, values):
+            if min_col <= col_idx <= max_col:
+                row[col_idx - min_col] = value
+        return tuple(row)
+
+    def iter_rows(
+        self,
+        min_row=None,
+        max_row=None,
+        min_col=None,
+        max_col=None,
+        values_only=False,
+    ) -> t.Generator:
+        """the same as openpyxl's read_only worksheet, the missing rows and
+        cells are filled if the sheet is sized.
+        """
+        if not values_only:
+            raise ValueError("Only the values are read by the fast engine.")
+        min_col = min_col or 1
+        min_row = min_row or 1
+        max_col = max_col or self.max_column
+        max_row = max_row or self.max_row
+        empty_row = (
+            [] if max_col is None else (None,) * (max_col + 1 - min_col)
+        )
+        counter, idx = min_row, 1
+        for idx, cols, values in self._parse():
+            if max_row is not None and idx > max_row:
+                break
+            # some rows are missing.
+            for _ in range(counter, idx):
+                counter += 1
+                yield empty_row
+            if counter <= idx:
+                counter += 1
+                yield self._values(cols, values, min_col, max_col)
+        if max_row is not None and max_row < idx:
+            for _ in range(counter, max_row + 1):
+                yield empty_row
+
+
+class _FastWorkbook:
+    """
+    The read_only workbook of the fast engine, which is used instead of the
+    openpyxl one by `WorkSheet(engine="fast")`. only the parts to decode the
+    values are read: the workbook, the shared strings and the date formats
+    of the styles, the sheets are parsed lazily while reading, see the
+    `_FastWorksheet`.
+    """
+
+    read_only = True
+    write_only = False
+    data_only = False
+
+    def __init__(self, filename: str, lazy_strings: bool = False):
+        self.filename = filename
+        self.lazy_strings = lazy_strings
+        self.shared_strings = []
+        self._archive = zipfile.ZipFile(filename)
+        try:
+            self._load()
+        except BaseException:
+            self.close()
+            raise
+
+    def _rels(self, part: str) -> t.Dict[str, t.Tuple[str, str]]:
+        """return the {id: (type, path)} of the part's relationships."""
+        folder, name = posixpath.split(part)
+        try:
+            rels = ElementTree.fromstring(
+                self._archive.read(
+                    posixpath.join(folder, "_rels", name + ".rels")
+                )
+            )
+        except KeyError:
+            return {}
+        res = {}
+        for rel in rels.iter(f"{_REL_NS}Relationship"):
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                path = target.lstrip("/")
+            else:
+                path = posixpath.normpath(posixpath.join(folder, target))
+            res[rel.get("Id")] = (rel.get("Type", ""), path)
+        return res
+
+    def _load(self) -> None:
+        part = _workbook_part(self._archive, self.filename)
+        rels = self._rels(part)
+        workbook = ElementTree.fromstring(self._archive.read(part))
+        pr = workbook.find(f"{_SHEET_NS}workbookPr")
+        date1904 = pr is not None and pr.get("date1904") in ("1", "true")
+        self.epoch = MAC_EPOCH if date1904 else WINDOWS_EPOCH
+
+        paths = {kind.rpartition("/")[2]: path for kind, path in rels.values()}
+        if paths.get("sharedStrings") in self._archive.NameToInfo:
+            with self._archive.open(paths["sharedStrings"]) as src:
+                self.shared_strings = (
+                    _SharedStrings(src)
+                    if self.lazy_strings
+                    else read_string_table(src)
+                )
+        self._date_formats = self._timedelta_formats = set()
+        if paths.get("styles") in self._archive.NameToInfo:
+            stylesheet = Stylesheet.from_tree(
+                ElementTree.fromstring(self._archive.read(paths["styles"]))
+            )
+            self._date_formats = stylesheet.date_formats
+            self._timedelta_formats = stylesheet.timedelta_formats
+
+        self.worksheets = []
+        for sheet in workbook.iter(f"{_SHEET_NS}sheet"):
+            kind, path = rels.get(sheet.get(f"{{{REL_NS}}}id"), ("", ""))
+            # the chartsheets are not the worksheets.
+            if kind.endswith("/worksheet"):
+                self.worksheets.append(
+                    _FastWorksheet(self, sheet.get("name"), path)
+                )
+
+    @property
+    def sheetnames(self) -> t.List[str]:
+        return [ws.title for ws in self.worksheets]
+
+    def __getitem__(self, title: str) -> _FastWorksheet:
+        for ws in self.worksheets:
+            if ws.title == title:
+                return ws
+        raise KeyError(f"Worksheet {title} does not exist.")
+
+    def close(self) -> None:
+        if isinstance(self.shared_strings, _SharedStrings):
+            self.shared_strings.close()
+        self._archive.close()
+
+
+def log_sink(event: str, stats: dict, ws: "WorkSheet") -> None:
+    """the sink to log the stats of the WorkSheet, see the `sinks`."""
+    log.info(
+        f"{event} the sheet: {ws.ws.title} of {ws.ws.parent.filename}, "
+        + ", ".join(f"{k}: {v}" for k, v in stats.items())
+    )
+
+
+class WorkSheet(_WorkSheetMixin):
+    """if there is the worksheet in the workbook, return it.
+       if there is not the worksheet, return a new worksheet.
+
+       the headers is a row that return dict with it as the keys and write to
+       excel in dict format with it as the keys.
+
+    Properties:
+        `parent`: the workbook instance.
+
+        `ws`: the worksheet instance.
+
+        `headers`: the headers and col_names correspondency in current worksheet.
+            {"name": "A", "sex": "B", "age": "C"}
+
+    Args:
+        `filename`: the destination file.
+
+        `title`: the sheet title, default is Sheet1.
+
+        `index`: the sheet index, default is 1. if the index is set, the title in invalid.
+
+        `headers_idx`: the headers index in all rows. if there is a headers_idx, the to_dict
+                read would start from the headers_idx row.
+
+        `template`: if there is a template, copy it to filename and write to the copy.
+
+        `before_styled`: the style before reading or writing the worksheet.
+                        {"A": {"color" :"#0FF00"}}
+
+        `after_styled`: the style after reading or writing but before saving the worksheet.
+            in write_only mode the rows are flushed already, so it can't have
+            the rows appended, and the cols if it's not the native engine.
+
+        `read_only`: open the existed file lazily and stream the rows while reading,
+            the memory keeps flat however many rows there are. The worksheet
+            can't be written or styled and it's never saved in this mode.
+
+        `write_only`: create a new file and flush the appended rows to disk while
+            appending, the memory keeps flat however many rows there are. The
+            worksheet can't be read, the cells can't be set randomly, and the
+            col and row styles must be set before the first row is appended.
+
+        `process_safe`: the file is shared by processes, load it under the shared
+            lock and save it under the exclusive lock, see `_FileLock`. If the file
+            is modified by another process since it's opened, it's a conflict.
+
+        `lock_timeout`: the seconds to wait for the lock, wait forever if it's None.
+            raise TimeoutError if it's timeout.
+
+        `on_conflict`: how to save the conflict file if process_safe:
+            `raise`: raise the WorkBookConflictError and keep the file unchanged.
+            `merge`: reload the latest file, retry the writes of this worksheet
+                on it and save it. The writes are recorded until closing.
+            `overwrite`: overwrite the file with this workbook.
+
+        `cache`: the `SheetCache` or its directory, read the values from the
+            cache instead of parsing the file again if the file is unchanged.
+            it's in read_only mode only.
+
+        `instrument`: record the stats of this worksheet in `stats`, see the
+            `STATS`. it's None and costs nothing if it's disabled.
+
+        `sinks`: the callbacks of the stats, `sink(event, stats, ws)`, which
+            are called after the event "load", "save" and "close". the
+            instrument is enabled if there is a sink, the `SINKS` are the
+            sinks of all the worksheets. see the `log_sink`.
+
+        `engine`: the engine to read or write the file:
+            `openpyxl`: the openpyxl workbook.
+            `native`: serialize the rows to the sheet xml directly without the
+                openpyxl cells, it's in write_only mode only and much faster.
+                see the `_NativeWorkbook`.
+            `fast`: parse the sheet xml for the values directly without the
+                openpyxl cells, it's in read_only mode only and much faster.
+                see the `_FastWorkbook`.
+
+        `compresslevel`, `shared_strings`: the options of the native engine,
+            see the `_NativeWorkbook`.
+
+        `skip_unmodified`: don't save the loaded workbook while closing if
+            it's not modified by the writing methods, so reading it in the
+            default mode doesn't rewrite it. call the `mark_dirty` after
+            modifying the `ws` directly, or the edits are not saved.
+
+        `compression`: the zip compression of the saved file, it's the
+            engine's default if None:
+            `stored`: not compressed, the fastest to save and the biggest.
+            `fast`: the deflate in level 1, for the intermediate files.
+            `max`: the deflate in level 9, for the archived files.
+            the sheets, the styles and the shared strings are compressed in
+            parallel if there are more than one cpu. see the `COMPRESSIONS`.
+
+        `lazy_strings`: index the shared strings once and decode a string
+            only when a cell refers to it, instead of loading all of them
+            before the first row. it's in read_only mode only and for the
+            file with a huge shared strings part, see the `_SharedStrings`.
+
+        `template_cache`: the `TemplateCache` of the parsed templates, the
+            workbook is cloned from the cached template instead of copying
+            and loading the template, and the file is created while saving.
+
+        `autofit`: fit the col widths to the values appended, the max width of
+            each col is tracked while appending and the widths are set while
+            saving, the CJK char is counted as 2. the col whose width is set
+            by the set_col_style is kept. it's not in read_only mode, and in
+            write_only mode it's with the native engine only, see the
+            `_ColumnWidths`.
+
+    """
+
+    ON_CONFLICT = ("raise", "merge", "overwrite")
+    ENGINES = ("openpyxl", "native", "fast")
+
+    STATS = (
+        "load_seconds",
+        "rows_read",
+        "rows_written",
+        "cells_styled",
+        "style_cache_hits",
+        "style_cache_misses",
+        "save_seconds",
+        "save_bytes",
+    )
+    SINKS = []
+
+    CLOSE = True
+    SUFFIX = SUPPORTED_FILE_TYPE
+
+    def __init__(
+        self,
+        filename: str,
+        title: t.Optional[str] = "Sheet1",
+        index: t.Optional[int] = None,
+        headers_idx: t.Optional[int] = 1,
+        template: t.Optional[str] = None,
+        before_styled: t.Optional[dict] = None,
+        after_styled: t.Optional[dict] = None,
+        read_only: bool = False,
+        write_only: bool = False,
+        process_safe: bool = False,
+        lock_timeout: t.Optional[float] = None,
+        on_conflict: str = "raise",
+        skip_unmodified: bool = False,
+        cache: t.Optional[t.Union[str, SheetCache]] = None,
+        instrument: bool = False,
+        sinks: t.Sequence[t.Callable] = (),
+        engine: str = "openpyxl",
+        compresslevel: t.Optional[int] = None,
+        shared_strings: bool = False,
+        lazy_strings: bool = False,
+        compression: t.Optional[str] = None,
+        autofit: bool = False,
+        template_cache: t.Optional[TemplateCache] = None,
+    ):
+        if engine not in self.ENGINES:
+            raise ValueError(f"The engine must be in {self.ENGINES}.")
+        if engine == "native" and not write_only:
+            raise ValueError(
+                "The native engine can be used in write_only mode only."
+            )
+        if engine == "fast" and not read_only:
+            raise ValueError(
+                "The fast engine can be used in read_only mode only."
+            )
+        if cache is not None and not read_only:
+            raise ValueError("The cache can be used in read_only mode only.")
+        if lazy_strings and not read_only:
+            raise ValueError(
+                "The lazy_strings can be used in read_only mode only."
+            )
+        if compression is not None:
+            if compression not in COMPRESSIONS:
+                raise ValueError(
+                    f"The compression must be in {tuple(COMPRESSIONS)}."
+                )
+            if read_only:
+                raise ValueError(
+                    "The compression can't be used in read_only mode."
+                )
+            if compresslevel is not None:
+                raise ValueError(
+                    "The compression and compresslevel are exclusive."
+                )
+        if autofit and read_only:
+            raise ValueError("The autofit can't be used in read_only mode.")
+        if autofit and write_only and engine == "openpyxl":
+            raise ValueError(
+                "The col widths are written before the rows by the openpyxl "
+                "engine in write_only mode, use the native engine to autofit."
+            )
+        if template_cache is not None and not template:
+            raise ValueError(
+                "The template_cache can be used with the template only."
+            )
+        if isinstance(cache, str):
+            cache = SheetCache(cache)
+        if on_conflict not in self.ON_CONFLICT:
+            raise ValueError(f"The on_conflict must be in {self.ON_CONFLICT}.")
+        if on_conflict == "merge" and write_only:
+            raise ValueError("The merge can't be used in write_only mode.")
+        if template and (read_only or write_only):
+            raise ValueError(
+                "The template can't be used in read_only or write_only mode."
+            )
+        if template:
+            if not os.path.exists(template):
+                raise FileNotFoundError(
+                    f"The template file: {template} not found!"
+                )
+            if not template.endswith(self.SUFFIX):
+                raise InvalidFileException(
+                    f"The file suffix must be {self.SUFFIX}!"
+                )
+            if template == filename:
+                raise InvalidFileException(
+                    f"The template file: {template} is the same"
+                    f"file as destination file {filename}"
+                )
+            if os.path.exists(filename):
+                raise FileExistsError(
+                    f"The destination {filename} is existed, can't override it by tempate file."
+                )
+            if template_cache is None:
+                shutil.copyfile(template, filename)
+
+        if not isinstance(headers_idx, int):
+            raise TypeError("The headers_idx must be a integer.")
+        if headers_idx < 1:
+            raise ValueError("The headers_idx must lager than 1.")
+        self.headers_idx = headers_idx
+
+        # the headers is None at first, initialized when read or write.
+        self.headers = None
+
+        self.before_styled = before_styled or {}
+        self.after_styled = after_styled or {}
+        assert isinstance(self.before_styled, dict)
+        assert isinstance(self.after_styled, dict)
+
+        self.read_only = read_only
+        self.write_only = write_only
+        self.engine = engine
+        self.compression = compression
+        self.skip_unmodified = skip_unmodified
+
+        self.cache = cache
+        self.process_safe = process_safe
+        self.on_conflict = on_conflict
+        self._lock = (
+            _FileLock(filename, lock_timeout) if process_safe else None
+        )
+        # the writes to retry on the latest file while merging.
+        self._journal = [] if process_safe and on_conflict == "merge" else None
+        # the row index for read_rows in read_only mode, built lazily.
+        self._row_index = None
+        # the style rules applied while saving, see the add_style_rule.
+        self._style_rules = []
+        # the rows and the cols written in write_only mode, the openpyxl's
+        # write_only worksheet doesn't count them.
+        self._max_row = self._max_col = 0
+        # the rows styled by the set_row_style, whose cells without a style
+        # share the row's style.
+        self._row_styles = set()
+        # the max widths of the cols appended if autofit.
+        self._widths = _ColumnWidths() if autofit else None
+
+        self.sinks = [*self.SINKS, *sinks]
+        self.stats = (
+            dict.fromkeys(self.STATS, 0) if instrument or self.sinks else None
+        )
+
+        self._parent_factory = _WorkBook
+        start = time.perf_counter()
+        parent = self._parent_factory(
+            filename,
+            read_only=read_only,
+            write_only=write_only,
+            lock=self._lock,
+            cache=cache,
+            engine=engine,
+            compresslevel=compresslevel,
+            shared_strings=shared_strings,
+            lazy_strings=lazy_strings,
+            template=template,
+            template_cache=template_cache,
+        )
+        if self.stats is not None:
+            self.stats["load_seconds"] = time.perf_counter() - start
+
+        if index or title:
+            if index:
+                try:
+                    self.ws = parent.worksheets[index - 1]
+                    log.info(f"open a active sheet, its index: {index-1}.")
+                except IndexError as e:
+                    raise ValueError(
+                        "The index: {index} worksheet is not existed."
                     ) from e
             else:
                 for sheet in parent.worksheets:
@@ -520,25 +3662,100 @@ class WorkSheet(_WorkSheetMixin):
                         log.info(f"open the active the sheet: {title}.")
                 else:
                     if not hasattr(self, "ws"):
+                        if self.read_only:
+                            _close_workbook(parent)
+                            self._parent_factory.singleton.pop(filename)
+                            raise ValueError(
+                                f"The sheet: {title} is not existed, can't "
+                                "create it in read_only mode."
+                            )
                         self.ws = parent.create_sheet(title)
+                        parent.dirty = True
                         log.info(f"create and open a new sheet: {title}.")
             self._gen_headers()
+        if self.stats is not None:
+            self._emit("load")
+
+    def _emit(self, event: str) -> None:
+        """call the sinks with the stats, the failure of a sink is logged
+        only, the worksheet isn't broken by the instrument.
+        """
+        for sink in self.sinks:
+            try:
+                sink(event, dict(self.stats), self)
+            except Exception:
+                log.warning(
+                    f"The sink: {sink} is failed: {traceback.format_exc()}"
+                )
+
+    def _iter_rows(self, **kwargs) -> t.Iterator:
+        """the values of `ws.iter_rows`, which are counted if instrumented."""
+        rows = self.ws.iter_rows(values_only=True, **kwargs)
+        if self.stats is None:
+            return rows
+        return self._count_read(rows)
+
+    def _count_read(self, rows: t.Iterable) -> t.Generator:
+        stats = self.stats
+        for row in rows:
+            stats["rows_read"] += 1
+            yield row
+
+    def _count_written(self, values: t.Sized, style) -> None:
+        stats = self.stats
+        stats["rows_written"] += 1
+        if isinstance(style, dict):
+            stats["cells_styled"] += len(values)
+        elif style:
+            stats["cells_styled"] += sum(1 for s in style[: len(values)] if s)
+
+    @contextlib.contextmanager
+    def _count_style_cache(self, style) -> t.Generator:
+        """count the style cache hits and misses while writing the style."""
+        if self.stats is None or not style:
+            yield
+            return
+        cache = CellStyler.CACHE
+        hits, misses = cache.hits, cache.misses
+        try:
+            yield
+        finally:
+            self.stats["style_cache_hits"] += cache.hits - hits
+            self.stats["style_cache_misses"] += cache.misses - misses
+
+    def mark_dirty(self) -> None:
+        """mark the workbook modified to be saved while closing, it's marked
+        by the writing methods, call it after modifying the `ws` directly if
+        the `skip_unmodified` is enabled.
+        """
+        self._check_writable()
+        self.ws.parent.dirty = True
+
+    def _check_writable(self):
+        if self.read_only:
+            raise ReadOnlyWorkbookException(
+                f"The sheet: {self.ws.title} is opened in read_only mode."
+            )
+
+    def _check_readable(self):
+        if self.write_only:
+            raise ValueError(
+                f"The sheet: {self.ws.title} is opened in write_only mode, "
+                "it can't be read."
+            )
 
     def _styled_hook(self, style):
+        if style:
+            self._check_writable()
         for k, v in style.items():
             if isinstance(k, int) and k < 65535:
                 self.set_row_style(k, v)
-            elif (
-                isinstance(k, str)
-                and len(k) == 1
-                and ord(k) > 64
-                and ord(k) < 91
-            ):
+            elif isinstance(k, str) and k in COL_INDEXES:
                 self.set_col_style(k, v)
             else:
                 raise TypeError(
                     "To set a row style in int type keys small than 65535 like: 1, 2, "
-                    "the col is in str type keys in range A-Z like :A, B"
+                    "the col is in str type keys in range A-XFD like :A, B, AA"
                 )
 
     def __enter__(self) -> "WorkSheet":
@@ -552,7 +3769,11 @@ class WorkSheet(_WorkSheetMixin):
                 f"Error: {exc_type}, msg: {exc_value}, traceback: {traceback}"
             )
         else:
-            self._styled_hook(self.after_styled)
+            try:
+                self._styled_hook(self.after_styled)
+            except BaseException:
+                self.close(save=False)
+                raise
             self.close()
 
     def _gen_headers(self, max_col: t.Optional[int] = None):
@@ -560,10 +3781,13 @@ class WorkSheet(_WorkSheetMixin):
         like this:
             {"name": "A", "sex": "B", "age": "C", ...}
         """
+        if self.write_only:
+            # nothing to read, the headers is initialized while appending.
+            return
         col_names = self._gen_col_name()
-        for i, row in enumerate(
-            self.ws.iter_rows(max_col=max_col, values_only=True), start=1
-        ):
+        # the rows are counted by the reading which yields them only.
+        rows = self.ws.iter_rows(values_only=True, max_col=max_col)
+        for i, row in enumerate(rows, start=1):
             if i == self.headers_idx:
                 self.headers = {col: next(col_names) for col in row}
                 col_names.close()
@@ -572,15 +3796,99 @@ class WorkSheet(_WorkSheetMixin):
     def close(self, save=True):
         """
         save and close the workbook, and drop the singleton.
+        the workbook is saved only if it's dirty if the `skip_unmodified` is
+        enabled, see the `mark_dirty`, and it's saved to a temp file and
+        renamed to the file, see `_save_atomic`.
         """
         try:
-            if save:
-                self.ws.parent.save(self.ws.parent.filename)
-            self.ws.parent.close()
+            if (
+                save
+                and not self.read_only
+                and (self.ws.parent.dirty or not self.skip_unmodified)
+            ):
+                start = time.perf_counter()
+                if self.process_safe:
+                    self._save_process_safe()
+                else:
+                    self._before_save()
+                    _save_atomic(
+                        self.ws.parent,
+                        self.ws.parent.filename,
+                        self.compression,
+                    )
+                if self.stats is not None:
+                    self.stats["save_seconds"] = time.perf_counter() - start
+                    self.stats["save_bytes"] = os.path.getsize(
+                        self.ws.parent.filename
+                    )
+                    self._emit("save")
+            _close_workbook(self.ws.parent)
+        except (WorkBookConflictError, TimeoutError):
+            raise
         except:
             log.error(traceback.format_exc())
         finally:
             self._parent_factory.singleton.pop(self.ws.parent.filename)
+            if self.stats is not None:
+                self._emit("close")
+
+    def _save_process_safe(self):
+        filename = self.ws.parent.filename
+        with self._lock.exclusive():
+            fingerprint = _fingerprint(filename)
+            if fingerprint and fingerprint != self.ws.parent.fingerprint:
+                _FileLock.stats["conflicts"] += 1
+                if self.on_conflict == "raise":
+                    raise WorkBookConflictError(
+                        f"The file: {filename} is modified by another process "
+                        "since it's opened."
+                    )
+                if self.on_conflict == "merge":
+                    self._merge()
+                    _FileLock.stats["merged"] += 1
+                else:
+                    log.warning(f"Overwrite the modified file: {filename}")
+            self._before_save()
+            _save_atomic(self.ws.parent, filename, self.compression)
+            self.ws.parent.fingerprint = _fingerprint(filename)
+
+    def _merge(self):
+        """reload the latest file and retry the writes of this worksheet on
+        it, the lock is held already.
+        """
+        filename = self.ws.parent.filename
+        title = self.ws.title
+        log.info(f"Merge the writes to the latest file: {filename}")
+        wb = load_workbook(filename)
+        wb.fingerprint = _fingerprint(filename)
+        wb.filename = filename
+        wb.dirty = True
+        wb.engine = "openpyxl"
+        self.ws.parent.close()
+        self._parent_factory.singleton[filename] = wb
+        if title in wb.sheetnames:
+            self.ws = wb[title]
+        else:
+            self.ws = wb.create_sheet(title)
+        self.headers = None
+        self._gen_headers()
+        journal, self._journal = self._journal, None
+        try:
+            for name, args in journal:
+                getattr(self, name)(*args)
+        finally:
+            self._journal = journal
+
+    def _record(self, name: str, *args) -> None:
+        if self._journal is not None:
+            self._journal.append((name, args))
+
+    @staticmethod
+    def lock_stats() -> dict:
+        """the lock waits, contention and conflicts in current process, see
+        process_safe.
+        """
+        return dict(_FileLock.stats)
 
     def validate(self):
         pass
@@ -626,14 +3934,8 @@ class WorkSheet(_WorkSheetMixin):
         Yields:
             [Dict]: ...
         """
-        if max_col:
-            if not isinstance(max_col, int):
-                raise TypeError("The max_col must be a integer.")
-            if max_col < 1 or max_col > 26:
-                raise ValueError(
-                    "The max_col range must in 1 ~ 26, corresponding to"
-                    "the alpha A ~ Z"
-                )
+        self._check_readable()
+        self._validate_max_col(max_col)
         if not col_mapping:
             col_mapping = {}
         if show_col_names and col_mapping:
@@ -642,9 +3944,7 @@ class WorkSheet(_WorkSheetMixin):
             )
             col_mapping = {}
         for i, row in enumerate(
-            self.ws.iter_rows(
-                min_row=self.headers_idx, max_col=max_col, values_only=True
-            )
+            self._iter_rows(min_row=self.headers_idx, max_col=max_col)
         ):
             if not any(row):
                 # jump the blank line
@@ -671,6 +3971,240 @@ class WorkSheet(_WorkSheetMixin):
                     for k, v in list(zip(self.headers, row))[:max_col]
                 }
 
+    def read_rows(
+        self,
+        start: int,
+        stop: t.Optional[int] = None,
+        max_col: t.Optional[int] = None,
+        col_mapping: t.Optional[t.Mapping] = None,
+    ) -> t.Generator:
+        """yield the rows whose row numbers in [start, stop) as the dict, they
+        are the same as the ones of the to_dict. the rows before the headers
+        and the blank rows are jumped over.
+
+        in read_only mode, it seeks to the rows by the row index instead of
+        reading all the rows before them, see `_RowIndex`. the index is built
+        in the first calling and kept in the sidecar file for the next time.
+        the rows are got from the snapshot directly if there is the cache.
+
+           for the page 10 of the 500 rows per page, the headers_idx is 1:
+
+                ws.read_rows(2 + 10 * 500, 2 + 11 * 500)
+
+        Args:
+            `start`: the row number to start from, which starts from 1.
+
+            `stop`: the row number to stop before, read to the end if None.
+
+            `max_col`, `col_mapping`: see the to_dict.
+
+        Yields:
+            [Dict]: ...
+        """
+        self._check_readable()
+        self._validate_max_col(max_col)
+        if not isinstance(start, int) or start < 1:
+            raise ValueError("The start must be a positive integer.")
+        if stop is not None and (not isinstance(stop, int) or stop < start):
+            raise ValueError("The stop must be a integer not less than start.")
+        col_mapping = col_mapping or {}
+        if not self.headers:
+            self._gen_headers(max_col=max_col)
+        if not self.headers:
+            return
+        start = max(start, self.headers_idx + 1)
+        if stop is not None and stop <= start:
+            return
+        if self.read_only and not self.cache:
+            if self._row_index is None:
+                self._row_index = _RowIndex(self.ws)
+            rows = self._row_index.iter_rows(start, stop, max_col=max_col)
+            if self.stats is not None:
+                rows = self._count_read(rows)
+        else:
+            rows = self._iter_rows(
+                min_row=start,
+                max_row=None if stop is None else stop - 1,
+                max_col=max_col,
+            )
+        for row in rows:
+            if not any(row):
+                continue
+            yield {
+                col_mapping.get(k, k): v
+                for k, v in list(zip(self.headers, row))[:max_col]
+            }
+
+    @staticmethod
+    def _validate_max_col(max_col: t.Optional[int]) -> None:
+        if max_col:
+            if not isinstance(max_col, int):
+                raise TypeError("The max_col must be a integer.")
+            if max_col < 1 or max_col > MAX_COL:
+                raise ValueError(
+                    f"The max_col range must in 1 ~ {MAX_COL}, corresponding "
+                    "to the col_name A ~ XFD"
+                )
+
+    def _iter_data_rows(self, max_col: t.Optional[int] = None) -> t.Generator:
+        """yield the headers row at the headers_idx, and then the rows below
+        it in values, the blank rows are jumped over like to_dict.
+        """
+        self._check_readable()
+        self._validate_max_col(max_col)
+        rows = self._iter_rows(min_row=self.headers_idx, max_col=max_col)
+        headers = next(rows, None)
+        if headers is None:
+            return
+        yield headers
+        for row in rows:
+            if any(row):
+                yield row
+
+    def to_batches(
+        self,
+        size: int = 5000,
+        max_col: t.Optional[int] = None,
+        col_mapping: t.Optional[t.Mapping] = None,
+    ) -> t.Generator:
+        """yield the headers at first, and then the rows in batches, there is
+        not a dict for each row, the batch can be passed to the executemany.
+           if the excel like this:
+
+                A       B       C       ...
+                name     sex     age     ...
+                xiaomi   female  1       ...
+                lulu     male    2       ...
+                wenbao   female  3       ...
+
+           if the size is 2:
+
+                yield:
+                    ("name", "sex", "age"),
+                    [("xiaomi", "female", 1), ("lulu", "male", 2)],
+                    [("wenbao", "female", 3)],
+
+        Args:
+            `size`: the max rows in a batch.
+
+            `max_col`, `col_mapping`: see the to_dict, the col_mapping is
+                applied to the headers only.
+
+        Yields:
+            [Tuple]: the headers at first.
+            [List[Tuple]]: the rows then.
+        """
+        if not isinstance(size, int) or size < 1:
+            raise ValueError("The size must be a positive integer.")
+        col_mapping = col_mapping or {}
+        rows = self._iter_data_rows(max_col=max_col)
+        headers = next(rows, None)
+        if headers is None:
+            return
+        yield tuple(col_mapping.get(k, k) for k in headers)
+        while True:
+            batch = list(itertools.islice(rows, size))
+            if not batch:
+                return
+            yield batch
+
+    def to_columns(
+        self,
+        columns: t.Optional[t.Sequence] = None,
+        dtypes: t.Optional[t.Mapping] = None,
+        max_col: t.Optional[int] = None,
+        col_mapping: t.Optional[t.Mapping] = None,
+    ) -> t.Dict[t.Any, t.Any]:
+        """return the content as columns, it's the transpose of to_dict but
+        there is not a dict for each row.
+           if the excel like this:
+
+                A       B       C       ...
+                name     sex     age     ...
+                xiaomi   female  1       ...
+                lulu     male    2       ...
+
+           return:
+                {
+                    "name": array(["xiaomi", "lulu"], dtype=object),
+                    "sex": array(["female", "male"], dtype=object),
+                    "age": array([1, 2]),
+                }
+
+        the numeric column is in the contiguous typed storage, the numpy array
+        if the numpy is installed, or the array.array otherwise. the others are
+        the numpy array in object dtype or the list. see the `_ColumnBuffer`.
+
+        Args:
+            `columns`: the headers of the columns to return, return all if None.
+
+            `dtypes`: the dtype of the columns, like: {"age": "int32"}, the
+                dtype is inferred from the values if it's not set.
+
+            `max_col`, `col_mapping`: see the to_dict, the columns and the
+                dtypes are in the mapped headers.
+
+        Raises:
+            `KeyError`: if a column in the columns is not in the headers.
+        """
+        col_mapping = col_mapping or {}
+        dtypes = dtypes or {}
+        rows = self._iter_data_rows(max_col=max_col)
+        headers = [col_mapping.get(k, k) for k in next(rows, ())]
+        if columns is None:
+            columns = headers
+        for column in columns:
+            if column not in headers:
+                raise KeyError(f"The column: {column} is not in the headers.")
+        indexes = [headers.index(column) for column in columns]
+        buffers = [_ColumnBuffer(dtypes.get(column)) for column in columns]
+        appends = [(i, buffer.append) for i, buffer in zip(indexes, buffers)]
+        for row in rows:
+            for i, append in appends:
+                append(row[i] if i < len(row) else None)
+        return {
+            column: buffer.values() for column, buffer in zip(columns, buffers)
+        }
+
+    def to_records(
+        self,
+        max_col: t.Optional[int] = None,
+        col_mapping: t.Optional[t.Mapping] = None,
+    ) -> t.Generator:
+        """yield the rows as the records, which is much smaller than the dict
+        of to_dict while the rows are kept in memory, for sorting or joining.
+        the record class is generated from the headers with the `__slots__`.
+           if the excel like this:
+
+                A       B       C       ...
+                name     sex     age     ...
+                xiaomi   female  1       ...
+                lulu     male    2       ...
+
+           yield:
+                Record(name="xiaomi", sex="female", age=1),
+                Record(name="lulu", sex="male", age=2),
+
+           the value can be got by: record.name, record[0] or record["name"].
+
+        Args:
+            `max_col`, `col_mapping`: see the to_dict, the record fields are
+                the mapped headers.
+
+        Yields:
+            [Record]: see the `_Record`.
+        """
+        col_mapping = col_mapping or {}
+        rows = self._iter_data_rows(max_col=max_col)
+        headers = next(rows, None)
+        if headers is None:
+            return
+        record = _record_class(
+            [col_mapping.get(k, k) for k in headers], name=self.ws.title
+        )
+        for row in rows:
+            yield record(*row)
+
     def append(
         self,
         iterable: t.Union[
@@ -717,7 +4251,15 @@ class WorkSheet(_WorkSheetMixin):
         Raises:
             `ValueError`: ...
             `TypeError`: if the iterable's type is not in list, tuple and dict.
+            `ReadOnlyWorkbookException`: if the sheet is opened in read_only mode.
         """
+        self._check_writable()
+        self.ws.parent.dirty = True
+        self._record("append", iterable, style)
+        with self._count_style_cache(style):
+            self._append(iterable, style)
+
+    def _append(self, iterable: t.Union[dict, list, tuple], style=None):
         if isinstance(
             iterable,
             (
@@ -727,42 +4269,975 @@ class WorkSheet(_WorkSheetMixin):
         ):
             if not self.headers:
                 self._gen_headers()
-            self.ws.append(IterStyledCell(iterable, style, self))
+            if not self.headers and self.write_only:
+                # the first row appended in write_only mode is the headers.
+                self.headers = self._new_headers(iterable)
+            if self.stats is not None:
+                self._count_written(iterable, style)
+            self._write_row(iterable, style)
         elif isinstance(iterable, dict):
             if not self.headers:
-                col_names = self._gen_col_name()
-                self.headers = {k: next(col_names) for k in iterable}
-                self.ws.append(
-                    IterStyledCell(
-                        [header for header in self.headers], style, self
-                    )
-                )
-            self.ws.append(
-                IterStyledCell(
-                    {v: iterable.get(k) for k, v in self.headers.items()},
-                    style,
-                    self,
-                )
-            )
+                self.headers = self._new_headers(iterable)
+                if self.stats is not None:
+                    self._count_written(self.headers, style)
+                self._write_row([header for header in self.headers], style)
+            row = {v: iterable.get(k) for k, v in self.headers.items()}
+            if self.write_only:
+                # the write_only worksheet accepts the sequence only, the
+                # headers is in sequence from A, so the values is in order.
+                row = list(row.values())
+            if self.stats is not None:
+                self._count_written(row, style)
+            self._write_row(row, style)
         else:
             raise TypeError(
                 f"There is a unsupported type: {type(iterable)} for data: {iterable}."
                 f"The data must in tuple, list or dict."
             )
 
+    def _write_row(
+        self, values: t.Union[list, tuple, dict], style=None
+    ) -> None:
+        if self._widths is not None:
+            self._widths.update(self._col_values(values))
+        if self.write_only:
+            self._max_row += 1
+            self._max_col = max(self._max_col, len(values))
+        if self.engine == "native":
+            # the native worksheet resolves the style to the index itself.
+            self.ws.append(values, style)
+        elif self.write_only and self._max_row in self._row_styles:
+            self.ws.append(
+                self._row_styled(IterStyledCell(values, style, self))
+            )
+        else:
+            self.ws.append(IterStyledCell(values, style, self))
+
+    @staticmethod
+    def _col_values(values: t.Union[list, tuple, dict]) -> list:
+        """return the values in the col order from A, the row in the full
+        mode is the {col_name: value} of the headers.
+        """
+        if not isinstance(values, dict):
+            return values
+        res = [None] * max(map(COL_INDEXES.__getitem__, values), default=0)
+        for col_name, value in values.items():
+            res[COL_INDEXES[col_name] - 1] = value
+        return res
+
+    def _row_styled(self, row: t.Iterable) -> list:
+        """return the cells of the row appended in write_only mode, the cell
+        without a style shares the row's style.
+        """
+        array = self.ws.row_dimensions[self._max_row]._style
+        if array is None:
+            return list(row)
+        cells = []
+        for cell in row:
+            if cell is None or isinstance(cell, Cell) and cell.value is None:
+                cells.append(cell)
+                continue
+            if not isinstance(cell, Cell):
+                cell = WriteOnlyCell(self.ws, cell)
+            styled = _row_style_array(cell._style, array)
+            if styled is not None:
+                cell._style = styled
+            cells.append(cell)
+        return cells
+
+    def extend(
+        self,
+        rows: t.Iterable[
+            t.Union[
+                dict,
+                list,
+                tuple,
+            ]
+        ],
+        style=None,
+    ):
+        """append the rows in bulk.
+            it's the same as calling append for each row, but the headers to
+            col mapping and the style are resolved once for the whole batch,
+            and the cells are written without the styled cell wrappers.
+
+        Args:
+            `rows` (Iterable[Union[List, Dict, Tuple]]): any iterable of rows,
+                such as a list or a generator. see the append for each row.
+
+            `style` (Optional[Union[Dict, List]]): see the append, it's applied
+                to every row.
+
+        Raises:
+            `TypeError`: if a row's type is not in list, tuple and dict.
+            `ReadOnlyWorkbookException`: if the sheet is opened in read_only mode.
+        """
+        self._check_writable()
+        self.ws.parent.dirty = True
+        if self._journal is not None:
+            rows = list(rows)
+            self._record("extend", rows, style)
+        with self._count_style_cache(style):
+            self._extend(rows, style)
+
+    def _batch_writer(self, style=None) -> t.Callable:
+        """return the function to append a row of the values in the style,
+        the style is resolved once for the batch.
+        """
+        if self.engine == "native":
+            append = functools.partial(self.ws.append, style=style)
+        elif self.write_only and self._row_styles:
+            styler = _BatchStyler(style, self) if style else None
+
+            def append(values):
+                row = styler(values) if styler else values
+                if self._max_row in self._row_styles:
+                    row = self._row_styled(row)
+                self.ws.append(row)
+
+        elif not style:
+            append = self.ws.append
+        else:
+            styler = _BatchStyler(style, self)
+
+            def append(values):
+                self.ws.append(styler(values))
+
+        widths = self._widths
+        if not self.write_only and widths is None:
+            return append
+
+        def write(values):
+            if widths is not None:
+                widths.update(values)
+            if self.write_only:
+                self._max_row += 1
+                self._max_col = max(self._max_col, len(values))
+            append(values)
+
+        return write
+
+    def _extend(self, rows: t.Iterable, style=None):
+        write = self._batch_writer(style)
+        stats = self.stats
+        # the (index, key) of the headers, resolved at the first dict row.
+        positions = None
+        in_sequence = False
+        for row in rows:
+            if isinstance(row, (list, tuple)):
+                if not self.headers and self.write_only:
+                    self.headers = self._new_headers(row)
+                values = row
+            elif isinstance(row, dict):
+                if positions is None:
+                    positions = self._header_positions(row, write, style)
+                    in_sequence = [i for i, _ in positions] == list(
+                        range(len(positions))
+                    )
+                if in_sequence:
+                    values = [row.get(k) for _, k in positions]
+                else:
+                    values = [None] * (positions[-1][0] + 1)
+                    for i, k in positions:
+                        values[i] = row.get(k)
+            else:
+                raise TypeError(
+                    f"There is a unsupported type: {type(row)} for data: {row}."
+                    f"The data must in tuple, list or dict."
+                )
+            if stats is not None:
+                self._count_written(values, style)
+            write(values)
+
+    def _new_headers(self, keys: t.Iterable) -> dict:
+        col_names = self._gen_col_name()
+        headers = {k: next(col_names) for k in keys}
+        col_names.close()
+        return headers
+
+    def _header_positions(
+        self, row: dict, write: t.Callable, style=None
+    ) -> t.List[t.Tuple[int, t.Any]]:
+        """return the (index, key) of the headers in the col order, the
+        headers is written at first if there is not a header in self.
+        """
+        if not self.headers:
+            self._gen_headers()
+        if not self.headers:
+            self.headers = self._new_headers(row)
+            values = list(self.headers)
+            if self.stats is not None:
+                self._count_written(values, style)
+            write(values)
+        return sorted(
+            (COL_INDEXES[col] - 1, k) for k, col in self.headers.items()
+        )
+
     def set_row_style(self, row_idx: int, style: dict) -> None:
+        self._check_writable()
+        if self.write_only and row_idx <= self._max_row:
+            raise ValueError(
+                f"The row: {row_idx} is flushed already in write_only mode, "
+                "set its style before appending it."
+            )
+        self.ws.parent.dirty = True
+        self._record("set_row_style", row_idx, style)
         row = Row(row_idx, style, self)
         row.set()
+        self._row_styles.add(row_idx)
 
     def set_col_style(self, col_name: str, style: dict) -> None:
+        self._check_writable()
+        if self.write_only and self.engine != "native" and self._max_row:
+            # openpyxl writes the cols before the first row, the native
+            # engine writes them while saving.
+            raise ValueError(
+                f"The col: {col_name} can't be styled after the rows are "
+                "flushed in write_only mode, set its style before appending."
+            )
+        self.ws.parent.dirty = True
+        self._record("set_col_style", col_name, style)
         col = Col(col_name, style, self)
         col.set()
+        if self._widths is not None and "width" in style:
+            self._widths.fixed.add(col_name)
+
+    def add_style_rule(
+        self,
+        style: dict,
+        cols: t.Optional[t.Union[str, t.Sequence[str]]] = None,
+        rows: t.Optional[t.Union[int, str, slice]] = None,
+        when: t.Optional[t.Union[t.Callable, str]] = None,
+    ) -> None:
+        """register the rule to style the cells of a range in bulk while the
+        workbook is saved, instead of styling every cell while appending.
+
+            ws.add_style_rule({"bold": True}, rows="header")
+            ws.add_style_rule({"fgColor": "00EEEEEE"}, rows=slice(3, None, 2))
+            ws.add_style_rule({"color": "00FF0000"}, cols="C", when=lambda v: v < 0)
+
+        the font and the fill of the style are merged into the cells' own
+        ones, so the rules and the style of the append are combined. the
+        fill_type is "solid" if it's omitted.
+
+        in the full mode the cells are styled in one pass and each distinct
+        merged style is resolved once. in write_only mode the rows are
+        flushed already, so the rule is written as the excel conditional
+        formatting, and the when can't be a callable.
+
+        Args:
+            `style`: the font and the fill keywords, see the CellStyler.
+
+            `cols`: the col names, like "C", "A:C" or ["A", "C"], all the
+                cols if None.
+
+            `rows`: the row numbers, a int, a slice like slice(3, None, 2)
+                for the stripes, "header" for the headers row, or the rows
+                after the headers if None.
+
+            `when`: style the cell only if it's true:
+                a callable: called with the cell value, the cell whose value
+                    can't be compared is skipped.
+                a str: the excel formula relative to the top-left cell of the
+                    range, like "C2<0", it's written as the conditional
+                    formatting in any mode.
+        """
+        self._check_writable()
+        if self.write_only and callable(when):
+            raise ValueError(
+                "The rows are flushed in write_only mode, the when must be a "
+                "formula str."
+            )
+        rule = _StyleRule(style, cols, rows, when)
+        self.ws.parent.dirty = True
+        # the rules are kept by the worksheet and applied to the merged sheet
+        # while saving, so they're not in the journal.
+        self._style_rules.append(rule)
+
+    def _before_save(self) -> None:
+        """apply the row styles, the style rules and the autofit widths to
+        the sheet.
+        """
+        self._apply_row_styles()
+        self._apply_style_rules()
+        if self._widths is not None:
+            self._widths.apply(self.ws)
+
+    def _apply_row_styles(self) -> None:
+        """share the row's style with its cells without a style, it's done
+        while appending in write_only mode.
+        """
+        if self.write_only:
+            return
+        ws = self.ws
+        cells = ws._cells
+        max_col = ws.max_column if self._row_styles else 0
+        for row_idx in sorted(self._row_styles):
+            array = ws.row_dimensions[row_idx]._style
+            if array is None:
+                continue
+            for col_idx in range(1, max_col + 1):
+                cell = cells.get((row_idx, col_idx))
+                if cell is None or cell.value is None:
+                    continue
+                styled = _row_style_array(cell._style, array)
+                if styled is not None:
+                    cell._style = styled
+        self._row_styles = set()
+
+    def _apply_style_rules(self) -> None:
+        ws = self.ws
+        for rule in self._style_rules:
+            if self.write_only:
+                rule.conditional(
+                    ws, self.headers_idx, self._max_row, self._max_col
+                )
+            elif isinstance(rule.when, str):
+                rule.conditional(
+                    ws, self.headers_idx, ws.max_row, ws.max_column
+                )
+            else:
+                styled = rule.apply(ws, self.headers_idx)
+                if self.stats is not None:
+                    self.stats["cells_styled"] += styled
+        self._style_rules = []
 
     def set_cell(
         self, row_idx: int, col_idx: int, style: dict, value=None
     ) -> None:
-        cell = Cell_(row_idx, col_idx, style, self, value)
-        cell.set()
+        self._check_writable()
+        if self.write_only:
+            raise ValueError(
+                "The cell can't be set randomly in write_only mode, "
+                "append it in the row."
+            )
+        self.ws.parent.dirty = True
+        self._record("set_cell", row_idx, col_idx, style, value)
+        with self._count_style_cache(style):
+            cell = Cell_(row_idx, col_idx, style, self, value)
+            cell.set()
+        if self.stats is not None and style:
+            self.stats["cells_styled"] += 1
+
+
+_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+class AsyncWorkSheet:
+    """
+    The WorkSheet for the asyncio, the blocking loading, reading and saving
+    are run in the bounded executor, so the event loop isn't blocked. the
+    rows are read in batches in the executor and then yielded one by one,
+    so there is an executor calling per batch instead of per row.
+
+    the calls of a AsyncWorkSheet are serialized by a asyncio.Lock because
+    the WorkSheet isn't thread safe.
+
+        async with AsyncWorkSheet(filename, read_only=True) as ws:
+            async for row in ws.to_dict():
+                ...
+
+        async with AsyncWorkSheet(filename, write_only=True) as ws:
+            await ws.extend(rows)
+
+    Args:
+        `*args`, `**kwargs`: see the WorkSheet.
+
+        `executor`: the executor to run the blocking works, default is the
+            thread pool of `MAX_WORKERS` threads shared by all the instances.
+
+        `batch_size`: the max rows of a batch read in the executor.
+    """
+
+    MAX_WORKERS = min(4, os.cpu_count() or 1)
+    _executor = None
+
+    def __init__(
+        self,
+        *args,
+        executor: t.Optional[t.Any] = None,
+        batch_size: int = 1000,
+        **kwargs,
+    ):
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError("The batch_size must be a positive integer.")
+        self._args = args
+        self._kwargs = kwargs
+        self.executor = executor
+        self.batch_size = batch_size
+        self.ws = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def _default_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=cls.MAX_WORKERS, thread_name_prefix="excel_utils"
+            )
+        return cls._executor
+
+    async def _run(self, func: t.Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            return await loop.run_in_executor(
+                self.executor or self._default_executor(),
+                functools.partial(func, *args, **kwargs),
+            )
+
+    @property
+    def _worksheet(self) -> WorkSheet:
+        if self.ws is None:
+            raise RuntimeError(
+                "The worksheet isn't opened, await the open() at first."
+            )
+        return self.ws
+
+    @property
+    def headers(self) -> t.Optional[dict]:
+        return self._worksheet.headers
+
+    @property
+    def stats(self) -> t.Optional[dict]:
+        return self._worksheet.stats
+
+    async def open(self) -> "AsyncWorkSheet":
+        """load the workbook in the executor."""
+        if self.ws is None:
+            self.ws = await self._run(WorkSheet, *self._args, **self._kwargs)
+        return self
+
+    async def __aenter__(self) -> "AsyncWorkSheet":
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self._run(
+            self._worksheet.__exit__, exc_type, exc_value, traceback
+        )
+
+    async def close(self, save: bool = True) -> None:
+        """save and close the workbook in the executor, see WorkSheet.close."""
+        await self._run(self._worksheet.close, save)
+
+    async def _iterate(self, rows: t.Iterator) -> t.AsyncGenerator:
+        try:
+            while True:
+                batch = await self._run(
+                    list, itertools.islice(rows, self.batch_size)
+                )
+                if not batch:
+                    return
+                for row in batch:
+                    yield row
+        finally:
+            # it's still running in the executor if the task is cancelled.
+            with contextlib.suppress(ValueError):
+                rows.close()
+
+    def to_dict(self, *args, **kwargs) -> t.AsyncGenerator:
+        """see WorkSheet.to_dict."""
+        return self._iterate(self._worksheet.to_dict(*args, **kwargs))
+
+    def to_batches(self, *args, **kwargs) -> t.AsyncGenerator:
+        """see WorkSheet.to_batches."""
+        return self._iterate(self._worksheet.to_batches(*args, **kwargs))
+
+    def to_records(self, *args, **kwargs) -> t.AsyncGenerator:
+        """see WorkSheet.to_records."""
+        return self._iterate(self._worksheet.to_records(*args, **kwargs))
+
+    def read_rows(self, *args, **kwargs) -> t.AsyncGenerator:
+        """see WorkSheet.read_rows."""
+        return self._iterate(self._worksheet.read_rows(*args, **kwargs))
+
+    async def to_columns(self, *args, **kwargs) -> t.Dict[t.Any, t.Any]:
+        """see WorkSheet.to_columns."""
+        return await self._run(self._worksheet.to_columns, *args, **kwargs)
+
+    async def append(self, *args, **kwargs) -> None:
+        """see WorkSheet.append, the extend is preferred for many rows."""
+        await self._run(self._worksheet.append, *args, **kwargs)
+
+    async def extend(self, *args, **kwargs) -> None:
+        """see WorkSheet.extend."""
+        await self._run(self._worksheet.extend, *args, **kwargs)
+
+    async def set_row_style(self, *args, **kwargs) -> None:
+        """see WorkSheet.set_row_style."""
+        await self._run(self._worksheet.set_row_style, *args, **kwargs)
+
+    async def set_col_style(self, *args, **kwargs) -> None:
+        """see WorkSheet.set_col_style."""
+        await self._run(self._worksheet.set_col_style, *args, **kwargs)
+
+    async def add_style_rule(self, *args, **kwargs) -> None:
+        """see WorkSheet.add_style_rule."""
+        await self._run(self._worksheet.add_style_rule, *args, **kwargs)
+
+    async def set_cell(self, *args, **kwargs) -> None:
+        """see WorkSheet.set_cell."""
+        await self._run(self._worksheet.set_cell, *args, **kwargs)
+
+
+def _workbook_part(archive: zipfile.ZipFile, filename: str) -> str:
+    """return the path of the workbook part in the archive."""
+    rels = ElementTree.fromstring(archive.read("_rels/.rels"))
+    for rel in rels.iter(f"{_REL_NS}Relationship"):
+        if rel.get("Type", "").endswith("/officeDocument"):
+            return posixpath.normpath(rel.get("Target").lstrip("/"))
+    raise InvalidFileException(f"The workbook of {filename} not found.")
+
+
+def _sheet_names(filename: str) -> t.List[str]:
+    """read the sheet titles from the workbook part only, it's much cheaper
+    than loading the workbook.
+    """
+    with zipfile.ZipFile(filename) as archive:
+        workbook = ElementTree.fromstring(
+            archive.read(_workbook_part(archive, filename))
+        )
+    return [sheet.get("name") for sheet in workbook.iter(f"{_SHEET_NS}sheet")]
+
+
+def _read_sheet(
+    filename: str,
+    sheet: t.Union[str, int],
+    headers_idx: int,
+    kwargs: dict,
+    engine: str = "openpyxl",
+) -> t.Tuple[str, t.List[dict]]:
+    """the task of read_many in the worker process."""
+    title, index = (None, sheet) if isinstance(sheet, int) else (sheet, None)
+    with WorkSheet(
+        filename,
+        title,
+        index,
+        headers_idx=headers_idx,
+        read_only=True,
+        engine=engine,
+    ) as ws:
+        return ws.ws.title, list(ws.to_dict(**kwargs))
+
+
+# the bounded queue of the rows read by the workers of read_many and the
+# event to stop them, they're inherited by the worker processes, see the
+# `_init_read_queue`.
+_READ_QUEUE = _READ_STOP = None
+
+
+def _init_read_queue(queue, stop) -> None:
+    """the initializer of the worker process of read_many."""
+    global _READ_QUEUE, _READ_STOP
+    _READ_QUEUE, _READ_STOP = queue, stop
+    # the worker doesn't wait for the rows not consumed while exiting.
+    queue.cancel_join_thread()
+
+
+def _put_chunk(message: tuple) -> bool:
+    """put the message into the queue of read_many, it's blocked while the
+    queue is full until read_many gets a chunk or it's closed, return False
+    if it's closed.
+    """
+    while not _READ_STOP.is_set():
+        try:
+            _READ_QUEUE.put(message, timeout=0.1)
+            return True
+        except Full:
+            pass
+    return False
+
+
+def _stream_sheet(
+    seq: int,
+    filename: str,
+    sheet: t.Union[str, int],
+    headers_idx: int,
+    kwargs: dict,
+    engine: str = "openpyxl",
+    chunk_size: int = 1000,
+) -> None:
+    """the task of read_many in the worker process, the rows of the sheet are
+    put into the queue in chunks as (seq, title, rows) while reading, and
+    (seq, title, None) is put at last even if it's failed.
+    """
+    title, index = (None, sheet) if isinstance(sheet, int) else (sheet, None)
+    try:
+        with WorkSheet(
+            filename,
+            title,
+            index,
+            headers_idx=headers_idx,
+            read_only=True,
+            engine=engine,
+        ) as ws:
+            title = ws.ws.title
+            rows = ws.to_dict(**kwargs)
+            # the reading is stopped if read_many is closed.
+            while True:
+                chunk = list(itertools.islice(rows, chunk_size))
+                if not chunk or not _put_chunk((seq, title, chunk)):
+                    break
+    finally:
+        _put_chunk((seq, title, None))
+
+
+def _get_chunk(queue, futures: t.List) -> tuple:
+    """get a chunk put by `_stream_sheet`, the failure of a worker process
+    which can't put the last one, such as it's killed, is raised.
+    """
+    while True:
+        try:
+            return queue.get(timeout=0.1)
+        except Empty:
+            for future in futures:
+                if future.done() and future.exception() is not None:
+                    future.result()
+
+
+def read_many(
+    sources: t.Iterable[t.Union[str, t.Tuple[str, t.Union[str, int]]]],
+    workers: t.Optional[int] = None,
+    ordered: bool = True,
+    batched: bool = False,
+    headers_idx: t.Optional[int] = 1,
+    max_col: t.Optional[int] = None,
+    show_col_names: bool = False,
+    col_mapping: t.Optional[t.Mapping] = None,
+    engine: str = "openpyxl",
+    chunk_size: int = 1000,
+    queue_size: t.Optional[int] = None,
+) -> t.Generator:
+    """read the sheets of the workbooks in a process pool, the xml parsing is
+    cpu bound, so the sheets are spread across the processes. every sheet is
+    read by `WorkSheet.to_dict` in read_only mode in a worker.
+
+    the rows are sent back from the worker in chunks while it's reading and
+    yielded as they arrive if not batched, so a sheet is never held in the
+    worker. at most queue_size chunks are in the queue, the workers wait
+    while it's full, so the rows in flight are bounded if they're consumed
+    slower than read. but if ordered, the chunks of the sheets after the one
+    being yielded are still taken out of the queue and buffered in the
+    parent until their turn, so a slow first sheet may buffer the rest.
+
+    Args:
+        `sources`: the workbooks or sheets to read, each one is:
+            a directory: read all the sheets of the .xlsx files in it.
+            a filename: read all the sheets of the workbook.
+            a tuple (filename, title or index): read the sheet only.
+
+        `workers`: the max processes, default is the cpu count.
+
+        `ordered`: yield the sheets in the sources order if True, or yield
+            the sheet as soon as it's read otherwise.
+
+        `batched`: yield a sheet's rows in a batch if True, or one by one otherwise.
+
+        `headers_idx`, `max_col`, `show_col_names`, `col_mapping`: see the
+            WorkSheet and its to_dict.
+
+        `engine`: the engine to read the sheets, "openpyxl" or "fast", see
+            the WorkSheet.
+
+        `chunk_size`: the max rows sent back from the worker at once if not
+            batched.
+
+        `queue_size`: the max chunks sent back but not yet taken by the parent
+            if not batched, default is twice the workers.
+
+    Yields:
+        [Tuple]: ((filename, title), row_dict), or ((filename, title), [row_dict, ...])
+            if batched.
+    """
+    sheets = []
+    for source in [sources] if isinstance(sources, str) else sources:
+        if isinstance(source, (tuple, list)):
+            sheets.append(tuple(source))
+        elif os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                # the `~$` file is the lock file opened by the excel.
+                if name.endswith(SUPPORTED_FILE_TYPE) and not name.startswith(
+                    "~$"
+                ):
+                    filename = os.path.join(source, name)
+                    sheets.extend(
+                        (filename, title) for title in _sheet_names(filename)
+                    )
+        else:
+            sheets.extend((source, title) for title in _sheet_names(source))
+
+    kwargs = {
+        "max_col": max_col,
+        "show_col_names": show_col_names,
+        "col_mapping": col_mapping,
+    }
+    if not batched:
+        yield from _read_many_streamed(
+            sheets,
+            workers,
+            ordered,
+            headers_idx,
+            kwargs,
+            engine,
+            chunk_size,
+            queue_size,
+        )
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                _read_sheet, filename, sheet, headers_idx, kwargs, engine
+            ): filename
+            for filename, sheet in sheets
+        }
+        try:
+            for future in futures if ordered else as_completed(futures):
+                title, rows = future.result()
+                yield (futures[future], title), rows
+        finally:
+            # stop the pending sheets if the reading is stopped.
+            for future in futures:
+                future.cancel()
+
+
+def _read_many_streamed(
+    sheets: t.List[tuple],
+    workers: t.Optional[int],
+    ordered: bool,
+    headers_idx: int,
+    kwargs: dict,
+    engine: str,
+    chunk_size: int,
+    queue_size: t.Optional[int] = None,
+) -> t.Generator:
+    """read_many yielding the rows one by one, see the `_stream_sheet`."""
+    if queue_size is None:
+        queue_size = 2 * (workers or os.cpu_count() or 1)
+    queue = multiprocessing.Queue(queue_size)
+    stop = multiprocessing.Event()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_read_queue,
+        initargs=(queue, stop),
+    ) as executor:
+        futures = [
+            executor.submit(
+                _stream_sheet,
+                seq,
+                filename,
+                sheet,
+                headers_idx,
+                kwargs,
+                engine,
+                chunk_size,
+            )
+            for seq, (filename, sheet) in enumerate(sheets)
+        ]
+        # the chunks of the sheets after the next one if ordered.
+        buffered = defaultdict(list)
+        following = 0
+        try:
+            while following < len(futures):
+                seq, title, chunk = _get_chunk(queue, futures)
+                if ordered and seq != following:
+                    buffered[seq].append((title, chunk))
+                    continue
+                chunks = [(title, chunk)]
+                while chunks:
+                    title, chunk = chunks.pop(0)
+                    if chunk is None:
+                        # raise the failure of the sheet.
+                        futures[seq].result()
+                        following += 1
+                        if ordered:
+                            seq = following
+                            chunks = buffered.pop(seq, [])
+                        continue
+                    source = (sheets[seq][0], title)
+                    for row in chunk:
+                        yield source, row
+        finally:
+            # stop the pending and the running sheets if it's closed.
+            stop.set()
+            for future in futures:
+                future.cancel()
+            queue.close()
+
+
+# the result of a file rendered by render_many, the error is the traceback
+# if it's failed or None.
+RenderResult = namedtuple(
+    "RenderResult", ("filename", "rows", "seconds", "error")
+)
+
+# the templates parsed in the worker process of render_many.
+_RENDER_TEMPLATES = TemplateCache()
+
+
+def _encode_rows(rows: t.Iterable) -> t.Tuple[t.Optional[tuple], list]:
+    """return the rows in the compact form to ship to the worker, the dict
+    rows in the same keys are the keys and the tuples of the values, so the
+    keys are pickled once instead of in every row.
+    """
+    rows = list(rows)
+    if not rows or not isinstance(rows[0], dict):
+        return None, rows
+    keys = tuple(rows[0])
+    values = []
+    for row in rows:
+        if not isinstance(row, dict) or tuple(row) != keys:
+            return None, rows
+        values.append(tuple(row.values()))
+    return keys, values
+
+
+def _render_batch(
+    template: str, batch: t.List[tuple], style, options: dict
+) -> t.List[RenderResult]:
+    """the task of render_many in the worker process, render the files of
+    the batch one by one, the failure of a file is in its result.
+    """
+    results = []
+    for filename, keys, rows in batch:
+        start = time.perf_counter()
+        error = None
+        try:
+            if keys is not None:
+                rows = [dict(zip(keys, values)) for values in rows]
+            with WorkSheet(
+                filename,
+                template=template,
+                template_cache=_RENDER_TEMPLATES,
+                **options,
+            ) as ws:
+                ws.extend(rows, style=style)
+            if not os.path.exists(filename):
+                # the failure while saving is logged by the close only.
+                raise OSError(f"The file: {filename} isn't saved.")
+        except Exception:
+            error = traceback.format_exc()
+        results.append(
+            RenderResult(
+                filename,
+                len(rows),
+                round(time.perf_counter() - start, 6),
+                error,
+            )
+        )
+    return results
+
+
+def _render_batches(
+    partitions: t.Iterable[t.Tuple[str, t.Iterable]], batch_size: int
+) -> t.Generator:
+    """yield the batches of about the batch_size rows of the partitions, a
+    batch has one partition at least, see the `_encode_rows`.
+    """
+    batch, size = [], 0
+    for filename, rows in partitions:
+        keys, rows = _encode_rows(rows)
+        batch.append((filename, keys, rows))
+        size += len(rows)
+        if size >= batch_size:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def render_many(
+    template: str,
+    partitions: t.Union[
+        t.Mapping[str, t.Iterable], t.Iterable[t.Tuple[str, t.Iterable]]
+    ],
+    workers: t.Optional[int] = None,
+    ordered: bool = True,
+    batch_size: int = 1000,
+    style=None,
+    **options,
+) -> t.Generator:
+    """render a file from the template for each partition of the rows in a
+    process pool, such as a workbook per customer. every file is written by
+    `WorkSheet(filename, template=template)` and `extend` in a worker, and
+    the template is parsed once per worker by its `TemplateCache`.
+
+    the partitions are shipped to the workers in batches of about the
+    batch_size rows, a batch has one partition at least, and the dict rows
+    in the same keys are shipped as the tuples of the values. the batches
+    are built lazily and 2 * workers of them are in flight at most, so the
+    partitions can be a generator bigger than the memory. a failed file
+    doesn't abort the others, its error is in the result.
+
+        results = list(render_many(TEMPLATE, {"a.xlsx": rows_a, ...}))
+        failed = [res for res in results if res.error]
+
+    Args:
+        `template`: the template file.
+
+        `partitions`: the destination filename and its rows, in a mapping or
+            the pairs, the rows are the same as the `WorkSheet.extend`.
+
+        `workers`: the max processes, default is the cpu count.
+
+        `ordered`: yield the results in the partitions order if True, or
+            yield them as soon as the batch is rendered otherwise.
+
+        `batch_size`: the rows to ship to a worker in a task.
+
+        `style`: the style of the rows, see the `WorkSheet.extend`.
+
+        `options`: the other args of the WorkSheet, such as the title, the
+            headers_idx, the autofit and the compression.
+
+    Yields:
+        [RenderResult]: (filename, rows, seconds, error) of each file.
+    """
+    if not os.path.exists(template):
+        raise FileNotFoundError(f"The template file: {template} not found!")
+    if not isinstance(batch_size, int) or batch_size < 1:
+        raise ValueError("The batch_size must be a positive integer.")
+    if isinstance(partitions, t.Mapping):
+        partitions = partitions.items()
+
+    batches = _render_batches(partitions, batch_size)
+    max_pending = 2 * (workers or os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # the {future: batch} in flight, in the submitting order.
+        futures = {}
+
+        def submit():
+            for batch in itertools.islice(batches, max_pending - len(futures)):
+                future = executor.submit(
+                    _render_batch, template, batch, style, options
+                )
+                futures[future] = batch
+
+        try:
+            submit()
+            while futures:
+                if ordered:
+                    done = [next(iter(futures))]
+                else:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = futures.pop(future)
+                    try:
+                        results = future.result()
+                    except Exception:
+                        # the batch isn't rendered, such as the worker is
+                        # crashed.
+                        error = traceback.format_exc()
+                        results = [
+                            RenderResult(filename, len(rows), 0, error)
+                            for filename, _, rows in batch
+                        ]
+                    # keep the workers busy while the results are consumed.
+                    submit()
+                    yield from results
+        finally:
+            # stop the pending batches if the rendering is stopped.
+            for future in futures:
+                future.cancel()
 
 
 if __name__ == "__main__":
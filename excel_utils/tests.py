@@ -8,20 +8,67 @@
 @Contact :   rootlulu@163.com
 """
 
+import array
+import asyncio
+import contextlib
 import copy
+import datetime
+import decimal
+import gc
+import io
+import json
+import multiprocessing
 import os
+import re
 import shutil
+import stat
+import struct
+import weakref
+import zipfile
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from hashlib import md5
 
+import openpyxl
 import pytest
+from openpyxl import Workbook as WB
+from openpyxl import load_workbook
+from openpyxl.reader.strings import read_string_table
+from openpyxl.utils.datetime import CALENDAR_MAC_1904
+from openpyxl.utils.exceptions import IllegalCharacterError
 from openpyxl.utils.exceptions import InvalidFileException
+from openpyxl.utils.exceptions import ReadOnlyWorkbookException
 
 CUR_DIR = os.curdir
+OPENPYXL_VERSION = tuple(map(int, openpyxl.__version__.split(".")[:2]))
+# openpyxl < 3.1 reads the timedelta as the datetime in read_only mode.
+READ_ONLY_TIMEDELTA = OPENPYXL_VERSION >= (3, 1)
 
 
+from excel_utils import COMPRESSIONS
+from excel_utils import MAX_COL
+from excel_utils import ArrayFormula
+from excel_utils import AsyncWorkSheet
+from excel_utils import CellStyler
+from excel_utils import WorkBookConflictError
 from excel_utils import WorkSheet
+from excel_utils import _CachedWorkbook
+from excel_utils import _FastWorkbook
+from excel_utils import _FileLock
+from excel_utils import _ParallelZipFile
+from excel_utils import _StyleCache
+from excel_utils import _ColumnBuffer
+from excel_utils import _ColumnWidths
+from excel_utils import _encode_rows
+from excel_utils import _RowIndex
+from excel_utils import _SharedStrings
+from excel_utils import _Snapshot
 from excel_utils import _WorkSheetMixin
+from excel_utils import SheetCache
+from excel_utils import TemplateCache
+from excel_utils import log_sink
+from excel_utils import read_many
+from excel_utils import render_many
 
 # todo What is lack of the excepted scene in Testcases. append in the future.
 # todo What is lack of the excepted scene in Testcases. append in the future.
@@ -232,7 +279,7 @@ class TestExcelRead(ExcelInit):
     def test_with_a_beyond_range_max_col(self):
         with WorkSheet(self.FILE_READ, self.SHEET1.name) as ws:
             with pytest.raises(ValueError):
-                next(ws.to_dict(max_col=29))
+                next(ws.to_dict(max_col=MAX_COL + 1))
 
     def test_with_max_col(self):
         max_col = 2
@@ -302,12 +349,774 @@ class TestExcelRead(ExcelInit):
             next(ws.to_dict(max_col=max_col))
             assert ws.headers == expected_headers
 
+    def test_to_batches(self):
+        with WorkSheet(self.FILE_READ, self.SHEET1.name) as ws:
+            batches = list(ws.to_batches(size=2))
+        assert batches == [
+            ("name", "sex", "age"),
+            [("xiaomi", "female", "19"), ("lulu", "male", 20)],
+            [("wenbao", "female", 3)],
+        ]
+
+    def test_to_batches_with_col_mapping(self):
+        with WorkSheet(self.FILE_READ, self.SHEET1.name) as ws:
+            batches = list(
+                ws.to_batches(col_mapping=self.SHEET1.col_mapping, max_col=2)
+            )
+        assert batches == [
+            ("姓名", "性别"),
+            [("xiaomi", "female"), ("lulu", "male"), ("wenbao", "female")],
+        ]
+
+    def test_to_batches_with_headers_idx(self):
+        with WorkSheet(
+            self.FILE_READ, self.SHEET1.name, headers_idx=2, read_only=True
+        ) as ws:
+            batches = list(ws.to_batches())
+        assert batches == [
+            ("xiaomi", "female", "19"),
+            [("lulu", "male", 20), ("wenbao", "female", 3)],
+        ]
+
+    def test_to_batches_with_blank_row(self, tmp_path):
+        filename = str(tmp_path / "blank.xlsx")
+        with WorkSheet(filename, self.SHEET1.name, write_only=True) as ws:
+            ws.extend([["name", "age"], ["lulu", 20], [None, None], ["x", 3]])
+        with WorkSheet(filename, self.SHEET1.name, read_only=True) as ws:
+            batches = list(ws.to_batches())
+        assert batches == [("name", "age"), [("lulu", 20), ("x", 3)]]
+
+    def test_to_batches_with_invalid_size(self):
+        with WorkSheet(self.FILE_READ, self.SHEET1.name) as ws:
+            with pytest.raises(ValueError):
+                next(ws.to_batches(size=0))
+
+    def test_to_records(self):
+        with WorkSheet(self.FILE_READ, self.SHEET1.name) as ws:
+            records = list(ws.to_records())
+        assert [r._asdict() for r in records] == self.SHEET1.values
+        assert records[1].name == records[1][0] == records[1]["name"]
+        assert tuple(records[1]) == ("lulu", "male", 20)
+        assert not hasattr(records[1], "__dict__")
+        assert type(records[0]) is type(records[2])
+
+    def test_to_records_with_col_mapping(self):
+        with WorkSheet(self.FILE_READ, self.SHEET1.name) as ws:
+            records = list(ws.to_records(col_mapping=self.SHEET1.col_mapping))
+        assert [r._asdict() for r in records] == (
+            self.SHEET1.values_with_col_mapping
+        )
+        assert records[0].姓名 == "xiaomi"
+
+    def test_to_records_with_invalid_headers(self, tmp_path):
+        filename = str(tmp_path / "records.xlsx")
+        with WorkSheet(filename, self.SHEET1.name, write_only=True) as ws:
+            ws.extend([["class", None, "a b", "class"], [1, 2, 3, 4]])
+        with WorkSheet(filename, self.SHEET1.name, read_only=True) as ws:
+            (record,) = ws.to_records()
+        assert record.col_0 == record["class"] == 1
+        assert record.col_1 == record[None] == 2
+        assert record.col_2 == record["a b"] == 3
+        assert record.col_3 == record[3] == 4
+        with pytest.raises(KeyError):
+            record["x"]
+
     def test_value_with_empty_file(self):
         with WorkSheet(self.FILE_READ, self.SHEET2.name) as ws:
             with pytest.raises(StopIteration):
                 next(ws.to_dict())
 
 
+class TestExcelReadOnly(ExcelInit):
+    """
+    test read excel test.xlsx in read_only mode, the rows are streamed.
+    """
+
+    def test_to_dict(self):
+        with WorkSheet(self.FILE_READ, self.SHEET1.name, read_only=True) as ws:
+            assert list(ws.to_dict()) == self.SHEET1.values
+
+    def test_to_dict_with_col(self):
+        with WorkSheet(self.FILE_READ, index=1, read_only=True) as ws:
+            assert (
+                list(ws.to_dict(show_col_names=True))
+                == self.SHEET1.values_with_headers
+            )
+
+    def test_to_dict_with_col_mapping(self):
+        with WorkSheet(self.FILE_READ, self.SHEET1.name, read_only=True) as ws:
+            assert (
+                list(ws.to_dict(col_mapping=self.SHEET1.col_mapping))
+                == self.SHEET1.values_with_col_mapping
+            )
+
+    def test_not_saved(self):
+        with open(self.FILE_READ, "rb") as f:
+            md5_value1 = md5(f.read()).digest()
+        with WorkSheet(self.FILE_READ, self.SHEET1.name, read_only=True) as ws:
+            list(ws.to_dict())
+        with open(self.FILE_READ, "rb") as f:
+            md5_value2 = md5(f.read()).digest()
+        assert md5_value1 == md5_value2
+
+    def test_append(self):
+        with WorkSheet(self.FILE_READ, self.SHEET1.name, read_only=True) as ws:
+            with pytest.raises(ReadOnlyWorkbookException):
+                ws.append(["shaobo", "male", 17])
+
+    def test_sheet_not_existed(self):
+        with pytest.raises(ValueError):
+            WorkSheet(self.FILE_READ, "NotExisted", read_only=True)
+
+    def test_file_not_existed(self):
+        with pytest.raises(FileNotFoundError):
+            WorkSheet("./not_existed.xlsx", read_only=True)
+
+
+class TestExcelReadMany(ExcelInit):
+    """
+    test read the sheets of the workbooks in the process pool.
+    """
+
+    SHEET3 = [{"name": "shaobo", "sex": "male"}]
+
+    @pytest.fixture
+    def workbooks(self, tmp_path):
+        file_a = str(tmp_path / "a.xlsx")
+        file_b = str(tmp_path / "b.xlsx")
+        for filename in (file_a, file_b):
+            with WorkSheet(filename, self.SHEET1.name, write_only=True) as ws:
+                ws.extend(self.SHEET1.values)
+        with WorkSheet(file_a, "Sheet3") as ws:
+            ws.extend(self.SHEET3)
+        return str(tmp_path), file_a, file_b
+
+    def test_directory(self, workbooks):
+        directory, file_a, file_b = workbooks
+        expected = (
+            [((file_a, self.SHEET1.name), row) for row in self.SHEET1.values]
+            + [((file_a, "Sheet3"), row) for row in self.SHEET3]
+            + [((file_b, self.SHEET1.name), row) for row in self.SHEET1.values]
+        )
+        assert list(read_many(directory, workers=2)) == expected
+
+    def test_unordered_batched(self, workbooks):
+        _, file_a, file_b = workbooks
+        res = read_many(
+            [file_a, (file_b, 1)], workers=2, ordered=False, batched=True
+        )
+        assert sorted(res) == [
+            ((file_a, self.SHEET1.name), self.SHEET1.values),
+            ((file_a, "Sheet3"), self.SHEET3),
+            ((file_b, self.SHEET1.name), self.SHEET1.values),
+        ]
+
+    @pytest.mark.parametrize("queue_size", [None, 1])
+    @pytest.mark.parametrize("ordered", [True, False])
+    def test_chunks(self, workbooks, ordered, queue_size):
+        directory, file_a, file_b = workbooks
+        expected = list(read_many(directory, batched=True))
+        res = list(
+            read_many(
+                directory,
+                workers=3,
+                ordered=ordered,
+                chunk_size=1,
+                queue_size=queue_size,
+            )
+        )
+        if not ordered:
+            # the rows of a sheet are still in order.
+            res.sort(key=lambda item: item[0])
+        assert res == [
+            (source, row) for source, rows in expected for row in rows
+        ]
+
+    def test_closed_with_queue_full(self, workbooks):
+        directory, file_a, _ = workbooks
+        res = read_many(directory, workers=3, chunk_size=1, queue_size=1)
+        assert next(res) == (
+            (file_a, self.SHEET1.name),
+            self.SHEET1.values[0],
+        )
+        # the workers blocked by the full queue are stopped.
+        res.close()
+
+    def test_failed(self, workbooks):
+        _, file_a, _ = workbooks
+        res = read_many([file_a, (file_a, "Sheet4")], workers=2)
+        with pytest.raises(ValueError):
+            list(res)
+
+    def test_to_dict_params(self, workbooks):
+        _, file_a, _ = workbooks
+        res = read_many(
+            [(file_a, self.SHEET1.name)],
+            col_mapping=self.SHEET1.col_mapping,
+            batched=True,
+        )
+        assert list(res) == [
+            ((file_a, self.SHEET1.name), self.SHEET1.values_with_col_mapping)
+        ]
+        res = read_many(
+            [(file_a, self.SHEET1.name)],
+            headers_idx=2,
+            max_col=2,
+            batched=True,
+        )
+        assert list(res) == [
+            (
+                (file_a, self.SHEET1.name),
+                [
+                    {"xiaomi": "lulu", "female": "male"},
+                    {"xiaomi": "wenbao", "female": "female"},
+                ],
+            )
+        ]
+
+
+class TestExcelRenderMany(ExcelInit):
+    """
+    test render the files from the template in the process pool.
+    """
+
+    ROW = {"name": "shaobo", "sex": "male", "age": 17}
+
+    def _values(self, filename, title=None):
+        with WorkSheet(filename, title or self.SHEET1.name) as ws:
+            return list(ws.to_dict())
+
+    def test_render(self, tmp_path):
+        partitions = {
+            str(tmp_path / "a.xlsx"): [self.ROW, self.ROW],
+            str(tmp_path / "b.xlsx"): [["lulu", "male", 20]],
+            str(tmp_path / "c.xlsx"): iter([]),
+        }
+        results = list(
+            render_many(self.FILE_EXISTED, partitions, workers=2, batch_size=2)
+        )
+        assert [res.filename for res in results] == list(partitions)
+        assert [res.rows for res in results] == [2, 1, 0]
+        assert all(res.error is None and res.seconds > 0 for res in results)
+        values = self.SHEET1.values
+        assert self._values(results[0].filename) == [*values, *[self.ROW] * 2]
+        assert self._values(results[1].filename) == [
+            *values,
+            {"name": "lulu", "sex": "male", "age": 20},
+        ]
+        assert self._values(results[2].filename) == values
+
+    def test_failures(self, tmp_path):
+        existed = str(tmp_path / "existed.xlsx")
+        shutil.copyfile(self.FILE_EXISTED, existed)
+        partitions = [
+            (existed, [self.ROW]),
+            (str(tmp_path / "invalid.xlsx"), ["name: shaobo"]),
+            (str(tmp_path / "ok.xlsx"), [self.ROW]),
+        ]
+        results = {
+            res.filename: res
+            for res in render_many(
+                self.FILE_EXISTED,
+                partitions,
+                workers=1,
+                ordered=False,
+                title="Sheet3",
+            )
+        }
+        assert "FileExistsError" in results[existed].error
+        assert "TypeError" in results[str(tmp_path / "invalid.xlsx")].error
+        assert not os.path.exists(tmp_path / "invalid.xlsx")
+        ok = results[str(tmp_path / "ok.xlsx")]
+        assert ok.error is None
+        assert self._values(ok.filename, "Sheet3") == [self.ROW]
+
+    def test_lazy(self, tmp_path):
+        consumed = []
+
+        def partitions():
+            for i in range(6):
+                consumed.append(i)
+                yield str(tmp_path / f"{i}.xlsx"), [self.ROW]
+
+        results = render_many(
+            self.FILE_EXISTED, partitions(), workers=1, batch_size=1
+        )
+        assert next(results).error is None
+        # 2 * workers batches in flight, the next one is submitted as soon
+        # as a batch is rendered.
+        assert consumed == [0, 1, 2]
+        assert [res.filename for res in results] == [
+            str(tmp_path / f"{i}.xlsx") for i in range(1, 6)
+        ]
+        assert consumed == list(range(6))
+
+    def test_encode_rows(self):
+        keys, rows = _encode_rows([self.ROW, dict(self.ROW)])
+        assert keys == tuple(self.ROW)
+        assert rows == [tuple(self.ROW.values())] * 2
+        mixed = [self.ROW, {"name": "lulu"}]
+        assert _encode_rows(mixed) == (None, mixed)
+        assert _encode_rows([[1, 2]]) == (None, [[1, 2]])
+
+    def test_invalid(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            list(render_many("./not_existed.xlsx", {}))
+        with pytest.raises(ValueError):
+            list(render_many(self.FILE_EXISTED, {}, batch_size=0))
+
+
+class TestExcelReadRows(ExcelInit):
+    """
+    test read the range of rows by the row index.
+    """
+
+    ROWS = 1000
+
+    @pytest.fixture
+    def workbook(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(_RowIndex, "STRIDE", 16)
+        filename = str(tmp_path / "rows.xlsx")
+        day = datetime.datetime(2022, 8, 4)
+        with WorkSheet(filename, self.SHEET1.name, write_only=True) as ws:
+            ws.append(["id", "name", "day"])
+            for i in range(self.ROWS):
+                # the row 102, 203 ... are blank.
+                if i % 101 == 100:
+                    ws.append([None, None, None])
+                else:
+                    ws.append([i, f"name{i}", day + datetime.timedelta(i)])
+        return filename
+
+    def _expected(self, filename, start, stop, **kwargs):
+        """the rows of to_dict whose row numbers in [start, stop)."""
+        with WorkSheet(filename, self.SHEET1.name, read_only=True) as ws:
+            rows = list(ws.to_dict(**kwargs))
+        return [
+            row
+            for row in rows
+            if start <= list(row.values())[0] + 2 < (stop or self.ROWS + 2)
+        ]
+
+    @pytest.mark.parametrize(
+        "start, stop", [(1, 10), (2, 3), (300, 350), (500, None), (990, 2000)]
+    )
+    def test_read_rows(self, workbook, start, stop):
+        expected = self._expected(workbook, start, stop)
+        with WorkSheet(workbook, self.SHEET1.name, read_only=True) as ws:
+            assert list(ws.read_rows(start, stop)) == expected
+        assert os.path.exists(workbook + _RowIndex.SUFFIX)
+
+    def test_read_rows_with_params(self, workbook):
+        expected = self._expected(
+            workbook, 100, 200, max_col=2, col_mapping={"id": "编号"}
+        )
+        with WorkSheet(workbook, self.SHEET1.name, read_only=True) as ws:
+            res = ws.read_rows(100, 200, max_col=2, col_mapping={"id": "编号"})
+            assert list(res) == expected
+
+    def test_read_rows_in_full_mode(self, workbook):
+        expected = self._expected(workbook, 300, 350)
+        with WorkSheet(workbook, self.SHEET1.name) as ws:
+            assert list(ws.read_rows(300, 350)) == expected
+        assert not os.path.exists(workbook + _RowIndex.SUFFIX)
+
+    def test_sidecar_reused(self, workbook, monkeypatch):
+        with WorkSheet(workbook, self.SHEET1.name, read_only=True) as ws:
+            expected = list(ws.read_rows(300, 350))
+
+        def build(self):
+            raise AssertionError("The index is rebuilt.")
+
+        monkeypatch.setattr(_RowIndex, "_build", build)
+        with WorkSheet(workbook, self.SHEET1.name, read_only=True) as ws:
+            assert list(ws.read_rows(300, 350)) == expected
+
+    def test_sidecar_rebuilt_if_changed(self, workbook):
+        with WorkSheet(workbook, self.SHEET1.name, read_only=True) as ws:
+            next(ws.read_rows(300, 350))
+        with open(workbook + _RowIndex.SUFFIX) as f:
+            fingerprint = json.load(f)["fingerprint"]
+        with WorkSheet(workbook, self.SHEET1.name) as ws:
+            ws.set_cell(300, 2, {"bold": True}, "changed")
+        with WorkSheet(workbook, self.SHEET1.name, read_only=True) as ws:
+            assert next(ws.read_rows(300, 350))["name"] == "changed"
+        with open(workbook + _RowIndex.SUFFIX) as f:
+            assert json.load(f)["fingerprint"] != fingerprint
+
+    @pytest.mark.parametrize("start, stop", [(0, None), ("1", None), (5, 4)])
+    def test_read_rows_with_invalid_range(self, workbook, start, stop):
+        with WorkSheet(workbook, self.SHEET1.name, read_only=True) as ws:
+            with pytest.raises(ValueError):
+                next(ws.read_rows(start, stop))
+
+
+class TestExcelSheetCache(ExcelInit):
+    """
+    test read the sheets from the persistent cache.
+    """
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return SheetCache(str(tmp_path / "cache"))
+
+    def _read(self, filename=None, **kwargs):
+        with WorkSheet(
+            filename or self.FILE_READ, read_only=True, **kwargs
+        ) as ws:
+            return list(ws.to_dict())
+
+    def test_hit_and_miss(self, cache):
+        assert self._read(cache=cache) == self.SHEET1.values
+        assert cache.stats == {"hits": 0, "misses": 1, "evictions": 0}
+        assert self._read(cache=cache) == self.SHEET1.values
+        assert cache.stats == {"hits": 1, "misses": 1, "evictions": 0}
+        assert cache.size() > 0
+
+    def test_hit_without_loading(self, cache, monkeypatch):
+        self._read(cache=cache)
+
+        def load(self):
+            raise AssertionError("The file is loaded.")
+
+        monkeypatch.setattr("excel_utils._CachedWorkbook.load", load)
+        with WorkSheet(
+            self.FILE_READ, index=1, read_only=True, cache=cache
+        ) as ws:
+            assert list(ws.to_dict()) == self.SHEET1.values
+            assert list(ws.read_rows(3, 4)) == self.SHEET1.values[1:2]
+
+    def test_cache_directory(self, tmp_path):
+        directory = str(tmp_path / "cache")
+        assert self._read(cache=directory) == self.SHEET1.values
+        assert os.listdir(directory)
+
+    def test_missed_if_changed(self, cache, tmp_path):
+        filename = str(tmp_path / "changed.xlsx")
+        shutil.copyfile(self.FILE_READ, filename)
+        self._read(filename, cache=cache)
+        with WorkSheet(filename, self.SHEET1.name) as ws:
+            ws.append({"name": "shaobo", "sex": "male", "age": 1})
+        assert self._read(filename, cache=cache)[-1]["name"] == "shaobo"
+        assert cache.stats["misses"] == 2
+
+    def test_lru_eviction(self, cache, tmp_path):
+        files = []
+        for i in range(3):
+            files.append(str(tmp_path / f"{i}.xlsx"))
+            shutil.copyfile(self.FILE_READ, files[-1])
+            self._read(files[-1], cache=cache)
+        entry = cache.size() // 3
+        cache.max_bytes = entry * 2
+        # the file 0 is used recently, so the file 1 is evicted.
+        self._read(files[0], cache=cache)
+        cache.stats.update(hits=0, misses=0)
+        filename = str(tmp_path / "3.xlsx")
+        shutil.copyfile(self.FILE_READ, filename)
+        self._read(filename, cache=cache)
+        assert cache.stats["evictions"] == 2
+        self._read(files[0], cache=cache)
+        self._read(files[1], cache=cache)
+        assert cache.stats["hits"] == 1
+        assert cache.stats["misses"] == 2
+
+    def test_hashed_once(self, cache, tmp_path, monkeypatch):
+        filename = str(tmp_path / "sheets.xlsx")
+        shutil.copyfile(self.FILE_READ, filename)
+        with WorkSheet(filename, "Sheet3") as ws:
+            ws.append(["name", "sex"])
+        digest = SheetCache.digest
+        calls = []
+
+        def counted(self, filename):
+            calls.append(filename)
+            return digest(self, filename)
+
+        monkeypatch.setattr(SheetCache, "digest", counted)
+        wb = _CachedWorkbook(filename, cache)
+        try:
+            assert [ws.snapshot.nrows for ws in wb.worksheets] == [4, 0, 1]
+        finally:
+            wb.close()
+        # the file is hashed once for all the sheets.
+        assert calls == [filename]
+        assert cache.stats == {"hits": 0, "misses": 3, "evictions": 0}
+
+    def test_cache_in_other_modes(self, cache):
+        with pytest.raises(ValueError):
+            WorkSheet(self.FILE_READ, cache=cache)
+
+    def test_snapshot(self):
+        rows = [
+            ("a", 1, 1.5, True, None),
+            (),
+            (
+                datetime.datetime(2022, 8, 4, 9, 48, 44, 123),
+                datetime.date(2022, 8, 4),
+                datetime.time(9, 48),
+                datetime.timedelta(days=-1, microseconds=1),
+                1 << 64,
+                "中文",
+                "a",
+            ),
+            (None, float("inf"), False, 0, ""),
+        ]
+        snapshot = _Snapshot(_Snapshot.dump(rows))
+        assert [snapshot.row(i) for i in range(len(rows))] == rows
+        assert snapshot.row(0, max_col=7) == rows[0] + (None, None)
+        assert snapshot.row(2, max_col=2) == rows[2][:2]
+        snapshot.close()
+
+
+class _CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.calls = 0
+
+    def submit(self, *args, **kwargs):
+        self.calls += 1
+        return super().submit(*args, **kwargs)
+
+
+class TestExcelAsync(ExcelInit):
+    """
+    test the AsyncWorkSheet.
+    """
+
+    def test_to_dict(self):
+        executor = _CountingExecutor()
+
+        async def read():
+            async with AsyncWorkSheet(
+                self.FILE_READ,
+                self.SHEET1.name,
+                read_only=True,
+                executor=executor,
+                batch_size=2,
+            ) as ws:
+                return [row async for row in ws.to_dict()]
+
+        assert asyncio.run(read()) == self.SHEET1.values
+        # open, 2 batches, the last empty batch and close.
+        assert executor.calls == 5
+        executor.shutdown()
+
+    def test_break_and_read_rows(self):
+        async def read():
+            async with AsyncWorkSheet(self.FILE_READ, read_only=True) as ws:
+                async for row in ws.to_dict():
+                    break
+                rows = [row async for row in ws.read_rows(3)]
+                columns = await ws.to_columns(["name"])
+            return row, rows, list(columns["name"])
+
+        row, rows, names = asyncio.run(read())
+        assert row == self.SHEET1.values[0]
+        assert rows == self.SHEET1.values[1:]
+        assert names == [row["name"] for row in self.SHEET1.values]
+
+    def test_write(self, tmp_path):
+        filename = str(tmp_path / "async.xlsx")
+
+        async def write():
+            ws = await AsyncWorkSheet(filename, write_only=True).open()
+            await ws.extend(self.SHEET1.values[:2])
+            await ws.append(self.SHEET1.values[2])
+            await ws.close()
+
+        asyncio.run(write())
+        with WorkSheet(filename, read_only=True) as ws:
+            assert list(ws.to_dict()) == self.SHEET1.values
+
+    def test_not_opened(self):
+        ws = AsyncWorkSheet(self.FILE_READ, read_only=True)
+        with pytest.raises(RuntimeError):
+            ws.to_dict()
+
+    def test_invalid_batch_size(self):
+        with pytest.raises(ValueError):
+            AsyncWorkSheet(self.FILE_READ, batch_size=0)
+
+
+class TestExcelInstrument(ExcelInit):
+    """
+    test the stats and the sinks of the worksheet.
+    """
+
+    STYLE = {"color": "00FF0000"}
+
+    def test_disabled(self):
+        with WorkSheet(self.FILE_READ, self.SHEET1.name) as ws:
+            list(ws.to_dict())
+            assert ws.stats is None
+
+    def test_write(self, tmp_path):
+        events = []
+        filename = str(tmp_path / "stats.xlsx")
+        with WorkSheet(
+            filename, sinks=[lambda *args: events.append(args[:2])]
+        ) as ws:
+            ws.append(self.SHEET1.values[0], style=self.STYLE)
+            ws.append(list(self.SHEET1.values[1].values()))
+            ws.extend(self.SHEET1.values[2:], style=[self.STYLE, {}])
+            ws.set_cell(5, 1, self.STYLE, "shaobo")
+        assert [event for event, _ in events] == ["load", "save", "close"]
+        stats = events[-1][1]
+        assert stats["rows_written"] == 4
+        # the headers and the first row, a cell of the last row and set_cell.
+        assert stats["cells_styled"] == 3 + 3 + 1 + 1
+        assert stats["style_cache_hits"] + stats["style_cache_misses"] > 0
+        assert stats["save_bytes"] == os.path.getsize(filename)
+        assert stats["save_seconds"] > 0
+        assert stats["load_seconds"] > 0
+
+    def test_read(self):
+        with WorkSheet(
+            self.FILE_READ, self.SHEET1.name, read_only=True, instrument=True
+        ) as ws:
+            assert ws.stats["rows_read"] == 0
+            list(ws.to_dict())
+            # the headers row and the 3 rows.
+            assert ws.stats["rows_read"] == 4
+            list(ws.read_rows(3))
+            assert ws.stats["rows_read"] == 6
+            list(ws.to_batches())
+            assert ws.stats["rows_read"] == 10
+            assert ws.stats["rows_written"] == 0
+
+    def test_read_headers_idx(self):
+        with WorkSheet(
+            self.FILE_READ, self.SHEET1.name, headers_idx=2, instrument=True
+        ) as ws:
+            assert ws.stats["rows_read"] == 0
+            assert len(list(ws.to_dict())) == 2
+            # the rows from the headers_idx only.
+            assert ws.stats["rows_read"] == 3
+
+    def test_sinks(self, monkeypatch, caplog):
+        events = []
+
+        def broken(event, stats, ws):
+            raise RuntimeError("broken")
+
+        monkeypatch.setattr(
+            WorkSheet, "SINKS", [lambda *args: events.append(args[0])]
+        )
+        caplog.set_level("INFO")
+        with WorkSheet(
+            self.FILE_READ, read_only=True, sinks=[broken, log_sink]
+        ) as ws:
+            list(ws.to_dict())
+        assert events == ["load", "close"]
+        assert "is failed" in caplog.text
+        assert "close the sheet: Sheet1" in caplog.text
+
+
+class TestExcelToColumns(ExcelInit):
+    """
+    test read the columns in numpy arrays, or in array.array and lists if
+    there is not the numpy.
+    """
+
+    ROWS = [
+        ["int", "float", "none_float", "mixed", "promoted"],
+        [1, 1.5, None, 1, 1],
+        [2, 2.5, 2, "2", 2.5],
+        [3, 3.5, 3, 3, 3],
+    ]
+
+    @pytest.fixture(params=["numpy", "array"])
+    def np(self, request, monkeypatch):
+        import excel_utils
+
+        if request.param == "array":
+            monkeypatch.setattr(excel_utils, "np", None)
+        elif excel_utils.np is None:
+            pytest.skip("the numpy is not installed.")
+        # grow the buffers while reading.
+        monkeypatch.setattr(_ColumnBuffer, "INITIAL_SIZE", 2)
+        return excel_utils.np
+
+    @pytest.fixture
+    def ws(self, tmp_path):
+        filename = str(tmp_path / "columns.xlsx")
+        with WorkSheet(filename, "Sheet1", write_only=True) as ws:
+            ws.extend(self.ROWS)
+        with WorkSheet(filename, "Sheet1", read_only=True) as ws:
+            yield ws
+
+    def _typecode(self, np, column):
+        if np is None:
+            assert isinstance(column, array.array)
+            return column.typecode
+        return column.dtype.str[1:]
+
+    def test_inferred(self, np, ws):
+        res = ws.to_columns()
+        assert list(res) == self.ROWS[0]
+        assert list(res["int"]) == [1, 2, 3]
+        assert self._typecode(np, res["int"]) in ("q", "i8")
+        assert list(res["float"]) == [1.5, 2.5, 3.5]
+        assert self._typecode(np, res["float"]) in ("d", "f8")
+        # the None is NaN in the float column.
+        assert res["none_float"][0] != res["none_float"][0]
+        assert list(res["none_float"])[1:] == [2, 3]
+        assert self._typecode(np, res["none_float"]) in ("d", "f8")
+        assert list(res["mixed"]) == [1, "2", 3]
+        assert list(res["promoted"]) == [1, 2.5, 3]
+        assert self._typecode(np, res["promoted"]) in ("d", "f8")
+
+    def test_columns_and_dtypes(self, np, ws):
+        res = ws.to_columns(
+            columns=["float", "i"],
+            dtypes={"i": "i", "float": float},
+            col_mapping={"int": "i"},
+        )
+        assert list(res) == ["float", "i"]
+        assert list(res["i"]) == [1, 2, 3]
+        assert self._typecode(np, res["i"]) in ("i", "i4")
+        assert list(res["float"]) == [1.5, 2.5, 3.5]
+
+    def test_numpy_dtypes(self, np, ws):
+        if np is None:
+            pytest.skip("numpy is not installed.")
+        res = ws.to_columns(
+            dtypes={
+                "int": np.dtype("int32"),
+                "float": np.dtype("float32"),
+                "mixed": np.dtype(object),
+            }
+        )
+        assert list(res["int"]) == [1, 2, 3]
+        assert res["int"].dtype == np.dtype("int32")
+        assert list(res["float"]) == [1.5, 2.5, 3.5]
+        assert res["float"].dtype == np.dtype("float32")
+        assert list(res["mixed"]) == [1, "2", 3]
+
+    def test_numpy_dtypes_equal_to_types(self, np, ws):
+        if np is None:
+            pytest.skip("numpy is not installed.")
+        # np.dtype("float64") == float, np.dtype(object) == object.
+        res = ws.to_columns(
+            dtypes={"float": np.dtype("float64"), "mixed": np.dtype(object)}
+        )
+        assert res["float"].dtype == np.dtype("float64")
+        assert list(res["float"]) == [1.5, 2.5, 3.5]
+        assert list(res["mixed"]) == [1, "2", 3]
+
+    def test_not_in_headers(self, np, ws):
+        with pytest.raises(KeyError):
+            ws.to_columns(columns=["x"])
+
+    def test_fixture(self, np):
+        with WorkSheet(self.FILE_READ, self.SHEET1.name, read_only=True) as ws:
+            res = ws.to_columns()
+        assert {k: list(v) for k, v in res.items()} == {
+            k: [row[k] for row in self.SHEET1.values]
+            for k in self.SHEET1.values[0]
+        }
+
+
 class TestExcelWrite(ExcelInit):
     """
     test write excel test_new.xlsx.
@@ -413,8 +1222,9 @@ class TestExcelWrite(ExcelInit):
                 assert res == self.SHEET1.values[i]
 
     def test_template(self):
-        # todo the both files are the same, but the testcase is not passed.
-        with WorkSheet(self.FILE_WRITE, template=self.FILE_EXISTED):
+        with WorkSheet(
+            self.FILE_WRITE, template=self.FILE_EXISTED, skip_unmodified=True
+        ):
             pass
         with open(self.FILE_EXISTED, "rb") as f:
             content = f.read()
@@ -450,6 +1260,51 @@ class TestExcelWrite(ExcelInit):
             for i, res in enumerate(ws.to_dict()):
                 assert res == expected[i]
 
+    def test_extend_dict_to_new_sheet(self):
+        with WorkSheet(self.FILE_WRITE, self.SHEET2.name) as ws:
+            ws.extend(row for row in self.SHEET1.values)
+        with WorkSheet(self.FILE_WRITE, self.SHEET2.name) as ws:
+            assert list(ws.to_dict()) == self.SHEET1.values
+
+    def test_extend_to_existed_sheet(self):
+        to_extend = [
+            {"age": 17, "name": "shaobo"},
+            ["xiaohong", "female", 18],
+        ]
+        expected = self.SHEET1.values + [
+            {"name": "shaobo", "sex": None, "age": 17},
+            {"name": "xiaohong", "sex": "female", "age": 18},
+        ]
+        shutil.copy(self.FILE_EXISTED, self.FILE_WRITE)
+        with WorkSheet(self.FILE_WRITE, self.SHEET1.name) as ws:
+            ws.extend(to_extend)
+        with WorkSheet(self.FILE_WRITE, self.SHEET1.name) as ws:
+            assert list(ws.to_dict()) == expected
+
+    def test_extend_seq_to_new_excel(self):
+        with WorkSheet(self.FILE_WRITE, self.SHEET2.name) as ws:
+            ws.extend([["name", "sex", "age"], ("shaobo", "male", 17)])
+            ws.extend([{"name": "xiaohong", "sex": "female", "age": 18}])
+        with WorkSheet(self.FILE_WRITE, self.SHEET2.name) as ws:
+            assert list(ws.to_dict()) == [
+                {"name": "shaobo", "sex": "male", "age": 17},
+                {"name": "xiaohong", "sex": "female", "age": 18},
+            ]
+
+    def test_extend_write_only(self):
+        with WorkSheet(
+            self.FILE_WRITE, self.SHEET2.name, write_only=True
+        ) as ws:
+            ws.extend(self.SHEET1.values, style={"size": 15})
+        with WorkSheet(self.FILE_WRITE, self.SHEET2.name) as ws:
+            assert list(ws.to_dict()) == self.SHEET1.values
+            assert ws.ws["A1"].font.size == ws.ws["C4"].font.size == 15
+
+    def test_extend_string(self):
+        with WorkSheet(self.FILE_WRITE, self.SHEET2.name) as ws:
+            with pytest.raises(TypeError):
+                ws.extend(["name: shaobo, sex: male, age: 17"])
+
     # the below is abnormal scene.
     def test_string(self):
         """
@@ -462,6 +1317,966 @@ class TestExcelWrite(ExcelInit):
                 ws.append(to_append_string)
 
 
+class TestExcelTemplateCache(ExcelInit):
+    """
+    test the reports cloned from the cached template.
+    """
+
+    def _render(self, filename, cache, template=None, rows=()):
+        with WorkSheet(
+            filename,
+            template=template or self.FILE_EXISTED,
+            template_cache=cache,
+        ) as ws:
+            ws.extend(rows)
+        with WorkSheet(filename, read_only=True) as ws:
+            return list(ws.to_dict())
+
+    def test_clone(self, tmp_path):
+        cache = TemplateCache()
+        row = {"name": "shaobo", "sex": "male", "age": 17}
+        first = self._render(str(tmp_path / "1.xlsx"), cache, rows=[row])
+        second = self._render(str(tmp_path / "2.xlsx"), cache)
+        assert first == [*self.SHEET1.values, row]
+        # the reports don't share the workbook.
+        assert second == self.SHEET1.values
+        assert cache.stats == {"hits": 1, "misses": 1, "evictions": 0}
+        assert cache.size() > 0
+
+    def test_modified(self, tmp_path):
+        template = str(tmp_path / "template.xlsx")
+        shutil.copyfile(self.FILE_EXISTED, template)
+        cache = TemplateCache()
+        self._render(str(tmp_path / "1.xlsx"), cache, template)
+        row = {"name": "shaobo", "sex": "male", "age": 17}
+        with WorkSheet(template) as ws:
+            ws.append(row)
+        values = self._render(str(tmp_path / "2.xlsx"), cache, template)
+        assert values == [*self.SHEET1.values, row]
+        assert cache.stats["misses"] == 2
+
+    def test_evicted(self, tmp_path):
+        cache = TemplateCache(max_bytes=0)
+        for i in range(2):
+            values = self._render(str(tmp_path / f"{i}.xlsx"), cache)
+            assert values == self.SHEET1.values
+        assert cache.stats == {"hits": 0, "misses": 2, "evictions": 2}
+
+    def test_not_pickled(self, tmp_path, monkeypatch):
+        def dumps(*args, **kwargs):
+            raise TypeError("can't pickle")
+
+        monkeypatch.setattr("excel_utils.pickle.dumps", dumps)
+        cache = TemplateCache()
+        for i in range(2):
+            values = self._render(str(tmp_path / f"{i}.xlsx"), cache)
+            assert values == self.SHEET1.values
+        assert cache.stats["hits"] == 1 and cache.size() == 0
+
+    def test_invalid(self, tmp_path):
+        with pytest.raises(ValueError):
+            TemplateCache(max_bytes=-1)
+        with pytest.raises(ValueError):
+            WorkSheet(str(tmp_path / "1.xlsx"), template_cache=TemplateCache())
+
+
+class TestExcelSave(ExcelInit):
+    """
+    test the workbook is saved only if it's dirty if skip_unmodified, and
+    it's saved atomically.
+    """
+
+    @pytest.fixture
+    def filename(self, tmp_path):
+        filename = str(tmp_path / "save.xlsx")
+        shutil.copyfile(self.FILE_READ, filename)
+        return filename
+
+    def _state(self, filename):
+        with open(filename, "rb") as f:
+            return os.stat(filename).st_mtime_ns, md5(f.read()).digest()
+
+    def test_not_saved_if_not_modified(self, filename):
+        state = self._state(filename)
+        with WorkSheet(filename, self.SHEET1.name, skip_unmodified=True) as ws:
+            assert list(ws.to_dict()) == self.SHEET1.values
+        assert self._state(filename) == state
+
+    def test_direct_edit_saved(self, filename):
+        ws = WorkSheet(filename, self.SHEET1.name)
+        ws.ws["B1"] = "direct"
+        ws.close()
+        assert load_workbook(filename)[self.SHEET1.name]["B1"].value == (
+            "direct"
+        )
+
+    @pytest.mark.parametrize(
+        "write",
+        [
+            lambda ws: ws.append(["shaobo", "male", 17]),
+            lambda ws: ws.extend([["shaobo", "male", 17]]),
+            lambda ws: ws.set_cell(2, 1, {"bold": True}),
+            lambda ws: ws.set_col_style("A", {"width": 20}),
+            lambda ws: ws.mark_dirty(),
+        ],
+    )
+    def test_saved_if_modified(self, filename, write):
+        state = self._state(filename)
+        with WorkSheet(filename, self.SHEET1.name, skip_unmodified=True) as ws:
+            write(ws)
+        assert self._state(filename) != state
+        assert os.listdir(os.path.dirname(filename)) == ["save.xlsx"]
+
+    def test_new_sheet_saved(self, filename):
+        with WorkSheet(filename, "Sheet3"):
+            pass
+        assert "Sheet3" in load_workbook(filename).sheetnames
+
+    def test_crash_while_saving(self, filename, monkeypatch):
+        state = self._state(filename)
+
+        def save(wb, tmp):
+            with open(tmp, "wb") as f:
+                f.write(b"half of the file")
+            raise OSError("No space left on device")
+
+        monkeypatch.setattr("excel_utils.WB.save", save)
+        with WorkSheet(filename, self.SHEET1.name) as ws:
+            ws.append(["shaobo", "male", 17])
+        assert self._state(filename) == state
+        assert os.listdir(os.path.dirname(filename)) == ["save.xlsx"]
+
+    def test_mode_kept(self, filename):
+        os.chmod(filename, 0o640)
+        with WorkSheet(filename, self.SHEET1.name) as ws:
+            ws.append(["shaobo", "male", 17])
+        assert stat.S_IMODE(os.stat(filename).st_mode) == 0o640
+
+
+class TestExcelCompression(ExcelInit):
+    """
+    test save excel in the compression presets, the members are deflated in
+    parallel if there are more than one worker.
+    """
+
+    ROWS = [[f"text{i}", i, i * 1.5] for i in range(2000)]
+    MODES = [
+        {},
+        {"write_only": True},
+        {"write_only": True, "engine": "native"},
+        {"write_only": True, "engine": "native", "shared_strings": True},
+    ]
+
+    @pytest.fixture(params=[1, 2], ids=["serial", "parallel"])
+    def workers(self, request, monkeypatch):
+        monkeypatch.setattr(_ParallelZipFile, "WORKERS", request.param)
+        return request.param
+
+    def _write(self, filename, **kwargs):
+        # the empty sheet is saved with the other one.
+        WorkSheet(filename, "Sheet0", **kwargs)
+        with WorkSheet(filename, self.SHEET1.name, **kwargs) as ws:
+            ws.append(["name", "age", "score"], style={"bold": True})
+            ws.extend(self.ROWS)
+        return filename
+
+    @staticmethod
+    def _read(filename):
+        wb = load_workbook(filename)
+        try:
+            return {
+                ws.title: [list(row) for row in ws.values]
+                for ws in wb.worksheets
+            }
+        finally:
+            wb.close()
+
+    @pytest.mark.parametrize("kwargs", MODES)
+    def test_presets(self, tmp_path, workers, kwargs):
+        expected = self._read(
+            self._write(str(tmp_path / "default.xlsx"), **kwargs)
+        )
+        sizes = {}
+        for compression in COMPRESSIONS:
+            filename = self._write(
+                str(tmp_path / f"{compression}.xlsx"),
+                compression=compression,
+                **kwargs,
+            )
+            with zipfile.ZipFile(filename) as archive:
+                assert archive.testzip() is None
+                assert {info.compress_type for info in archive.infolist()} == {
+                    COMPRESSIONS[compression][0]
+                }
+            assert self._read(filename) == expected
+            sizes[compression] = os.path.getsize(filename)
+        assert sizes["stored"] > sizes["fast"] >= sizes["max"]
+
+    def test_parallel_same_as_serial(self, tmp_path, monkeypatch):
+        names = []
+        for workers in (1, 2):
+            monkeypatch.setattr(_ParallelZipFile, "WORKERS", workers)
+            filename = self._write(
+                str(tmp_path / f"{workers}.xlsx"), compression="max"
+            )
+            with zipfile.ZipFile(filename) as archive:
+                # the core properties are with the modified time.
+                names.append(
+                    [
+                        (
+                            (i.filename, i.file_size)
+                            if i.filename == "docProps/core.xml"
+                            else (i.filename, i.file_size, i.CRC)
+                        )
+                        for i in archive.infolist()
+                    ]
+                )
+        assert names[0] == names[1]
+
+    def test_parallel_zip_file(self, monkeypatch):
+        monkeypatch.setattr(_ParallelZipFile, "WORKERS", 2)
+        members = {
+            "a.xml": b"<a/>" * 10000,
+            "b.xml": b"",
+            "c.xml": os.urandom(1 << 16),
+        }
+        buffer = io.BytesIO()
+        with _ParallelZipFile(buffer, compresslevel=1) as archive:
+            archive.writestr("a.xml", members["a.xml"].decode())
+            archive.writestr(zipfile.ZipInfo("b.xml"), members["b.xml"])
+            archive.writestream("c.xml", [members["c.xml"][:7], b"", b"x"])
+        members["c.xml"] = members["c.xml"][:7] + b"x"
+        with zipfile.ZipFile(buffer) as archive:
+            assert archive.testzip() is None
+            assert archive.namelist() == list(members)
+            for info in archive.infolist():
+                assert archive.read(info) == members[info.filename]
+                assert info.compress_type == zipfile.ZIP_DEFLATED
+                # the local header is the same as the central directory.
+                buffer.seek(info.header_offset)
+                header = struct.unpack("<4s5H3L", buffer.read(26))
+                assert header[3] == zipfile.ZIP_DEFLATED
+                assert header[6:] == (
+                    info.CRC,
+                    info.compress_size,
+                    info.file_size,
+                )
+
+    def test_native_default_not_parallel(self, tmp_path, monkeypatch):
+        def parallel(*args, **kwargs):
+            raise AssertionError("The parallel zip file is used.")
+
+        monkeypatch.setattr(_ParallelZipFile, "WORKERS", 2)
+        monkeypatch.setattr(_ParallelZipFile, "__init__", parallel)
+        filename = self._write(
+            str(tmp_path / "native.xlsx"), write_only=True, engine="native"
+        )
+        assert self._read(filename)[self.SHEET1.name][1:] == self.ROWS
+
+    def test_invalid(self, tmp_path):
+        filename = str(tmp_path / "invalid.xlsx")
+        with pytest.raises(ValueError):
+            WorkSheet(filename, compression="lzma")
+        with pytest.raises(ValueError):
+            WorkSheet(self.FILE_READ, read_only=True, compression="fast")
+        with pytest.raises(ValueError):
+            WorkSheet(
+                filename,
+                write_only=True,
+                engine="native",
+                compression="fast",
+                compresslevel=1,
+            )
+
+
+class TestExcelWriteOnly(ExcelInit):
+    """
+    test write excel test_new.xlsx in write_only mode, the rows are flushed.
+    """
+
+    def teardown_method(self):
+        """remove the writing test file."""
+        if os.path.exists(self.FILE_WRITE):
+            os.remove(self.FILE_WRITE)
+
+    setup_method = teardown_method
+
+    def test_dict(self):
+        with WorkSheet(
+            self.FILE_WRITE, self.SHEET1.name, write_only=True
+        ) as ws:
+            for row in self.SHEET1.values:
+                ws.append(row)
+        with WorkSheet(self.FILE_WRITE, self.SHEET1.name) as ws:
+            assert list(ws.to_dict()) == self.SHEET1.values
+
+    def test_seq(self):
+        with WorkSheet(
+            self.FILE_WRITE, self.SHEET1.name, write_only=True
+        ) as ws:
+            for row in self.SHEET1.values_with_headers:
+                ws.append(list(row.values()))
+            # the headers is the first row.
+            ws.append({"age": 17, "name": "shaobo"})
+        expected = self.SHEET1.values + [
+            {"name": "shaobo", "sex": None, "age": 17}
+        ]
+        with WorkSheet(self.FILE_WRITE, self.SHEET1.name) as ws:
+            assert list(ws.to_dict()) == expected
+
+    def test_style(self):
+        style = [{"color": "00FF00FF"}, {"size": 15}]
+        with WorkSheet(
+            self.FILE_WRITE,
+            self.SHEET1.name,
+            write_only=True,
+            before_styled={"A": {"width": 49}},
+        ) as ws:
+            ws.append({"name": "shaobo", "sex": "male", "age": 16}, style)
+        with WorkSheet(self.FILE_WRITE, self.SHEET1.name) as ws:
+            assert ws.ws["A2"].font.color.rgb == style[0]["color"]
+            assert ws.ws["B2"].font.size == style[1]["size"]
+            assert ws.ws["C2"].value == 16
+            assert ws.ws.column_dimensions["A"].width == 49
+
+    def test_file_existed(self):
+        shutil.copy(self.FILE_EXISTED, self.FILE_WRITE)
+        with pytest.raises(FileExistsError):
+            WorkSheet(self.FILE_WRITE, write_only=True)
+
+    def test_read(self):
+        with WorkSheet(
+            self.FILE_WRITE, self.SHEET1.name, write_only=True
+        ) as ws:
+            with pytest.raises(ValueError):
+                next(ws.to_dict())
+
+    def test_wide_sheet(self):
+        cols = 150
+        row = {f"col{i}": i for i in range(cols)}
+        with WorkSheet(
+            self.FILE_WRITE,
+            self.SHEET2.name,
+            before_styled={"EN": {"width": 49}},
+        ) as ws:
+            ws.append(row, style={"size": 15})
+            ws.extend([row])
+        with WorkSheet(self.FILE_WRITE, self.SHEET2.name) as ws:
+            assert list(ws.headers.values())[-1] == "ET"
+            assert list(ws.to_dict()) == [row, row]
+            assert (
+                list(ws.to_dict(max_col=cols - 1))
+                == [{k: v for k, v in row.items() if v < cols - 1}] * 2
+            )
+            assert ws.ws["ET2"].font.size == 15
+            assert ws.ws.column_dimensions["EN"].width == 49
+
+    def test_set_cell(self):
+        with WorkSheet(
+            self.FILE_WRITE, self.SHEET1.name, write_only=True
+        ) as ws:
+            with pytest.raises(ValueError):
+                ws.set_cell(1, 1, {"size": 15}, "name")
+
+    def test_col_style_after_append(self):
+        with WorkSheet(
+            self.FILE_WRITE, self.SHEET1.name, write_only=True
+        ) as ws:
+            ws.set_col_style("A", {"width": 40})
+            ws.append(["name", "sex", "age"])
+            # the cols are written before the rows by openpyxl.
+            with pytest.raises(ValueError):
+                ws.set_col_style("B", {"width": 33})
+        wb = load_workbook(self.FILE_WRITE)
+        dims = wb[self.SHEET1.name].column_dimensions
+        assert dims["A"].width == 40 and dims["B"].width != 33
+        wb.close()
+
+    def test_after_styled_col(self):
+        with pytest.raises(ValueError):
+            with WorkSheet(
+                self.FILE_WRITE,
+                self.SHEET1.name,
+                write_only=True,
+                after_styled={"A": {"width": 40}},
+            ) as ws:
+                ws.append(["name", "sex", "age"])
+        # the workbook is dropped without saving.
+        assert not os.path.exists(self.FILE_WRITE)
+        with WorkSheet(
+            self.FILE_WRITE, self.SHEET1.name, write_only=True
+        ) as ws:
+            ws.append(["name", "sex", "age"])
+
+
+class TestExcelNative(ExcelInit):
+    """
+    test write excel in write_only mode by the native engine, the file is
+    read back the same as the one written by openpyxl.
+    """
+
+    ROWS = [
+        ["a\r\nb", " x ", "=SUM(1,2)", True, 1.5, 10**16, "", "#N/A"],
+        [],
+        [None, None, 3, b"bytes", decimal.Decimal("1.25"), float("nan")],
+        [
+            datetime.datetime(2020, 1, 2, 3, 4, 5),
+            datetime.date(2020, 1, 2),
+            datetime.time(1, 2, 3),
+            datetime.timedelta(hours=30),
+        ],
+        [None] * 3,
+    ]
+    STYLES = [{"bold": True}, {"color": "00FF0000", "fgColor": "00FFFF00"}]
+
+    def _write(self, filename, **kwargs):
+        with WorkSheet(filename, write_only=True, **kwargs) as ws:
+            ws.set_col_style("B", {"width": 30})
+            ws.append(["h1", "h2", "h3"], style=self.STYLES[0])
+            for i, row in enumerate(self.ROWS):
+                ws.append(row, style=self.STYLES if i % 2 else None)
+            ws.extend(self.ROWS, style=self.STYLES[1])
+        return filename
+
+    @staticmethod
+    def _read(filename):
+        wb = load_workbook(filename)
+        try:
+            ws = wb.worksheets[0]
+            return (
+                [
+                    [
+                        (
+                            cell.value,
+                            cell.number_format,
+                            cell.font.b,
+                            cell.font.color and cell.font.color.rgb,
+                            cell.fill.fgColor.rgb,
+                        )
+                        for cell in row
+                    ]
+                    for row in ws.iter_rows()
+                ],
+                ws.column_dimensions["B"].width,
+            )
+        finally:
+            wb.close()
+
+    @pytest.mark.parametrize("shared_strings", [False, True])
+    def test_same_as_openpyxl(self, tmp_path, shared_strings):
+        expected = self._read(self._write(str(tmp_path / "openpyxl.xlsx")))
+        native = self._write(
+            str(tmp_path / "native.xlsx"),
+            engine="native",
+            shared_strings=shared_strings,
+        )
+        assert self._read(native) == expected
+
+    def test_to_dict(self, tmp_path):
+        filename = str(tmp_path / "native.xlsx")
+        with WorkSheet(
+            filename, self.SHEET1.name, write_only=True, engine="native"
+        ) as ws:
+            ws.append(self.SHEET1.values[0])
+            ws.extend(self.SHEET1.values[1:])
+            ws.append({"age": 17, "name": "shaobo"})
+        expected = self.SHEET1.values + [
+            {"name": "shaobo", "sex": None, "age": 17}
+        ]
+        for read_only in (False, True):
+            with WorkSheet(
+                filename, self.SHEET1.name, read_only=read_only
+            ) as ws:
+                assert list(ws.to_dict()) == expected
+
+    def test_dimension(self, tmp_path):
+        filename = str(tmp_path / "native.xlsx")
+        with WorkSheet(filename, write_only=True, engine="native") as ws:
+            ws.extend([["a", "b"], ["c", None, None, "d"], [None]])
+            # the col style can be set after appending.
+            ws.set_col_style("D", {"width": 40})
+        wb = load_workbook(filename, read_only=True)
+        assert wb.worksheets[0].calculate_dimension() == "A1:D3"
+        wb.close()
+        wb = load_workbook(filename)
+        assert wb.worksheets[0].column_dimensions["D"].width == 40
+        wb.close()
+
+    def test_sheets(self, tmp_path):
+        filename = str(tmp_path / "native.xlsx")
+        WorkSheet(filename, "a&b", write_only=True, engine="native")
+        with WorkSheet(
+            filename, '"c"', write_only=True, engine="native"
+        ) as ws:
+            ws.append(["c"])
+        wb = load_workbook(filename)
+        assert wb.sheetnames == ["a&b", '"c"']
+        assert wb['"c"']["A1"].value == "c"
+        wb.close()
+
+    def test_compresslevel(self, tmp_path):
+        sizes = []
+        for level in (0, 9):
+            filename = str(tmp_path / f"native{level}.xlsx")
+            with WorkSheet(
+                filename, write_only=True, engine="native", compresslevel=level
+            ) as ws:
+                ws.extend([[f"text{i}", i] for i in range(1000)])
+            sizes.append(os.path.getsize(filename))
+        assert sizes[0] > sizes[1]
+
+    def test_invalid(self, tmp_path):
+        filename = str(tmp_path / "native.xlsx")
+        with pytest.raises(ValueError):
+            WorkSheet(filename, engine="lxml")
+        with pytest.raises(ValueError):
+            WorkSheet(filename, engine="native")
+        with pytest.raises(ValueError):
+            WorkSheet(
+                filename, write_only=True, engine="native", compresslevel=10
+            )
+        with WorkSheet(filename, write_only=True, engine="native") as ws:
+            with pytest.raises(IllegalCharacterError):
+                ws.append(["\x01"])
+            with pytest.raises(ValueError):
+                ws.append([object()])
+            with pytest.raises(ValueError):
+                WorkSheet(filename, "Sheet2", write_only=True)
+
+
+class TestExcelFast(ExcelInit):
+    """
+    test read excel in read_only mode by the fast engine, the rows are the
+    same as the ones read by openpyxl.
+    """
+
+    ROWS = [
+        ["a\r\nb", " x ", "=SUM(1,2)", True, 1.5, 10**16, "", "#N/A"],
+        [],
+        [None, None, 3, datetime.datetime(2020, 1, 2, 3, 4, 5)],
+        [datetime.date(2020, 1, 2), datetime.time(1, 2, 3)],
+        [
+            datetime.timedelta(hours=30) if READ_ONLY_TIMEDELTA else None,
+            None,
+            "中文",
+        ],
+    ]
+    # the sheet xml with a prefix, inline and rich strings, shared formulas.
+    SHEET_XML = (
+        '<x:worksheet xmlns:x="http://schemas.openxmlformats.org/'
+        'spreadsheetml/2006/main"><x:sheetData>'
+        '<x:row r="1"><x:c r="A1"><x:v>1</x:v></x:c><x:c r="B1">'
+        '<x:f t="shared" si="0" ref="B1:B3">A1+1</x:f><x:v>2</x:v></x:c>'
+        '<x:c r="C1" t="inlineStr"><x:is><x:r><x:t>ri</x:t></x:r><x:r>'
+        '<x:t xml:space="preserve"> ch</x:t></x:r><x:rPh sb="0" eb="1">'
+        "<x:t>PH</x:t>"
+        "</x:rPh></x:is></x:c></x:row>"
+        '<x:row r="3"><x:c r="B3"><x:f t="shared" si="0"/></x:c>'
+        '<x:c t="inlineStr"><x:is><x:t>p&amp;q</x:t></x:is></x:c>'
+        '<x:c t="e"><x:v>#DIV/0!</x:v></x:c><x:c t="b"><x:v>0</x:v></x:c>'
+        '<x:c r="F3" t="d"><x:v>2020-01-02T03:04:05</x:v></x:c></x:row>'
+        "<x:row/>"
+        "</x:sheetData></x:worksheet>"
+    )
+    KWARGS = [
+        {},
+        {"min_row": 3},
+        {"max_col": 3},
+        {"min_row": 2, "max_row": 5},
+        {"max_row": 20},
+        {"min_col": 2, "max_col": 4},
+    ]
+
+    def _openpyxl(self, filename, write_only):
+        wb = WB(write_only=write_only)
+        ws = wb.create_sheet() if write_only else wb.active
+        ws.append(["h1", "h2", "h3"])
+        for row in self.ROWS:
+            ws.append(row)
+        wb.save(filename)
+        return filename
+
+    def _native(self, filename):
+        with WorkSheet(filename, write_only=True, engine="native") as ws:
+            ws.append(["h1", "h2", "h3"])
+            ws.extend(self.ROWS)
+        return filename
+
+    def _date1904(self, filename):
+        wb = WB()
+        wb.epoch = CALENDAR_MAC_1904
+        wb.active.append(["h1", "h2"])
+        wb.active.append([datetime.datetime(2020, 1, 2), 1])
+        wb.save(filename)
+        return filename
+
+    def _crafted(self, filename):
+        self._openpyxl(filename, False)
+        with zipfile.ZipFile(filename) as src:
+            parts = {name: src.read(name) for name in src.namelist()}
+        parts["xl/worksheets/sheet1.xml"] = self.SHEET_XML.encode()
+        with zipfile.ZipFile(filename, "w") as dst:
+            for name, data in parts.items():
+                dst.writestr(name, data)
+        return filename
+
+    @pytest.fixture(params=["fixture", "openpyxl", "write_only", "native"])
+    def workbook(self, request, tmp_path):
+        filename = str(tmp_path / f"{request.param}.xlsx")
+        if request.param == "fixture":
+            return self.FILE_READ
+        if request.param == "native":
+            return self._native(filename)
+        return self._openpyxl(filename, request.param == "write_only")
+
+    @staticmethod
+    def _rows(ws, **kwargs):
+        return [
+            tuple(
+                (
+                    (value.ref, value.text)
+                    if ArrayFormula and isinstance(value, ArrayFormula)
+                    else value
+                )
+                for value in row
+            )
+            for row in ws.iter_rows(values_only=True, **kwargs)
+        ]
+
+    def _assert_same(self, filename):
+        expected = load_workbook(filename, read_only=True)
+        fast = _FastWorkbook(filename)
+        try:
+            assert fast.sheetnames == expected.sheetnames
+            for title in expected.sheetnames:
+                for kwargs in self.KWARGS:
+                    assert self._rows(fast[title], **kwargs) == self._rows(
+                        expected[title], **kwargs
+                    )
+        finally:
+            expected.close()
+            fast.close()
+
+    def test_same_as_openpyxl(self, workbook):
+        self._assert_same(workbook)
+
+    def test_date1904(self, tmp_path):
+        self._assert_same(self._date1904(str(tmp_path / "1904.xlsx")))
+
+    def test_timedelta(self, tmp_path):
+        filename = str(tmp_path / "timedelta.xlsx")
+        wb = WB()
+        wb.active.append([datetime.timedelta(hours=30)])
+        wb.save(filename)
+        fast = _FastWorkbook(filename)
+        assert self._rows(fast.worksheets[0]) == [
+            (datetime.timedelta(hours=30),)
+        ]
+        fast.close()
+
+    def test_crafted(self, tmp_path):
+        filename = self._crafted(str(tmp_path / "crafted.xlsx"))
+        self._assert_same(filename)
+        fast = _FastWorkbook(filename)
+        assert self._rows(fast.worksheets[0], max_row=3) == [
+            (1, "=A1+1", "ri ch"),
+            (),
+            (
+                None,
+                "=A3+1",
+                "p&q",
+                "#DIV/0!",
+                False,
+                datetime.datetime(2020, 1, 2, 3, 4, 5),
+            ),
+        ]
+        fast.close()
+
+    def test_to_dict(self, workbook):
+        def read(engine):
+            with WorkSheet(
+                workbook, index=1, read_only=True, engine=engine
+            ) as ws:
+                return (
+                    list(ws.to_dict()),
+                    list(ws.to_dict(show_col_names=True, max_col=2)),
+                    list(ws.to_records()),
+                    {k: list(v) for k, v in ws.to_columns().items()},
+                    list(ws.read_rows(2, 4)),
+                )
+
+        assert read("fast") == read("openpyxl")
+
+    def test_cache(self, tmp_path):
+        cache = SheetCache(str(tmp_path / "cache"))
+        for _ in range(2):
+            with WorkSheet(
+                self.FILE_READ, read_only=True, engine="fast", cache=cache
+            ) as ws:
+                assert list(ws.to_dict()) == self.SHEET1.values
+        assert cache.stats["hits"] == 1
+
+    def test_read_many(self):
+        rows = [
+            row
+            for _, row in read_many([self.FILE_READ], workers=1, engine="fast")
+        ]
+        assert rows == self.SHEET1.values
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            WorkSheet(self.FILE_READ, engine="fast")
+        with pytest.raises(ValueError):
+            WorkSheet(self.FILE_READ, write_only=True, engine="fast")
+        with WorkSheet(self.FILE_READ, read_only=True, engine="fast") as ws:
+            with pytest.raises(ValueError):
+                next(ws.ws.iter_rows())
+            with pytest.raises(ValueError):
+                WorkSheet(self.FILE_READ, read_only=True)
+
+
+class TestExcelLazyStrings(ExcelInit):
+    """
+    test read excel with the shared strings loaded lazily, the strings are
+    the same as the ones loaded by openpyxl.
+    """
+
+    NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    STRINGS = [
+        "<si><t>plain</t></si>",
+        '<si><t xml:space="preserve"> a &amp; b </t></si>',
+        "<si><t>a\r\nb&#10;c</t></si>",
+        "<si><t/></si>",
+        "<si><r><t>ri</t></r><r><rPr><b/></rPr><t>ch</t></r>"
+        '<rPh sb="0" eb="1"><t>PH</t></rPh></si>',
+        "<si><t>_x005F_x000D_中文</t></si>",
+    ]
+
+    def _part(self, prefix=""):
+        xml = "".join(self.STRINGS)
+        if prefix:
+            xml = re.sub(r"<(/?)([a-zA-Z])", rf"<\1{prefix}:\2", xml)
+            return (
+                f'<{prefix}:sst xmlns:{prefix}="{self.NS}">\n{xml}\n'
+                f"</{prefix}:sst>"
+            ).encode()
+        return f'<sst xmlns="{self.NS}">{xml}</sst>'.encode()
+
+    @pytest.mark.parametrize("prefix", ["", "x"])
+    def test_same_as_openpyxl(self, prefix):
+        part = self._part(prefix)
+        expected = read_string_table(io.BytesIO(part))
+        strings = _SharedStrings(io.BytesIO(part), maxsize=2)
+        try:
+            assert len(strings) == len(expected)
+            assert list(strings) == expected
+            assert strings[-1] == expected[-1]
+            assert strings._decode.cache_info().currsize == 2
+            with pytest.raises(IndexError):
+                strings[len(expected)]
+        finally:
+            strings.close()
+
+    def test_empty(self):
+        strings = _SharedStrings(
+            io.BytesIO(f'<sst xmlns="{self.NS}"/>'.encode())
+        )
+        assert len(strings) == 0
+        assert list(strings) == []
+        strings.close()
+
+    @pytest.mark.parametrize("engine", ["openpyxl", "fast"])
+    def test_to_dict(self, tmp_path, engine):
+        filename = str(tmp_path / "strings.xlsx")
+        with WorkSheet(
+            filename, write_only=True, engine="native", shared_strings=True
+        ) as ws:
+            ws.append(["name", "sex", "age"])
+            for i in range(100):
+                ws.append([f"name{i % 7}", "a & b" if i % 2 else "\n", i])
+
+        def read(**kwargs):
+            with WorkSheet(
+                filename, read_only=True, engine=engine, **kwargs
+            ) as ws:
+                return list(ws.to_dict())
+
+        assert read(lazy_strings=True) == read()
+        cache = SheetCache(str(tmp_path / "cache"))
+        assert read(lazy_strings=True, cache=cache) == read()
+
+    @pytest.mark.skipif(
+        not os.path.isdir("/proc/self/fd"), reason="/proc is required."
+    )
+    @pytest.mark.parametrize("engine", ["openpyxl", "fast"])
+    def test_fd_not_leaked(self, tmp_path, engine):
+        filename = str(tmp_path / "strings.xlsx")
+        with WorkSheet(
+            filename, write_only=True, engine="native", shared_strings=True
+        ) as ws:
+            ws.extend([["name"], ["a"], ["b"]])
+
+        def fds():
+            # openpyxl < 3.1 keeps the xlsx open until the gc if its rows
+            # aren't exhausted, only the others are counted.
+            links = []
+            for fd in os.listdir("/proc/self/fd"):
+                with contextlib.suppress(OSError):
+                    links.append(os.readlink(f"/proc/self/fd/{fd}"))
+            return len([link for link in links if link != filename])
+
+        # the garbage of the other tests doesn't close its files meanwhile.
+        gc.collect()
+        gc.disable()
+        try:
+            opened = fds()
+            for _ in range(3):
+                with WorkSheet(
+                    filename, read_only=True, engine=engine, lazy_strings=True
+                ) as ws:
+                    assert [row["name"] for row in ws.to_dict()] == ["a", "b"]
+            assert fds() == opened
+        finally:
+            gc.enable()
+
+    def test_freed_without_gc(self):
+        strings = _SharedStrings(io.BytesIO(self._part()))
+        assert strings[0] == "plain"
+        ref = weakref.ref(strings)
+        gc.disable()
+        try:
+            strings.close()
+            del strings
+            assert ref() is None
+        finally:
+            gc.enable()
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            WorkSheet(self.FILE_READ, lazy_strings=True)
+
+
+def _append_process_safe(filename, title, row):
+    with WorkSheet(
+        filename, title, process_safe=True, on_conflict="merge"
+    ) as ws:
+        ws.append(row)
+
+
+class TestExcelProcessSafe(ExcelInit):
+    """
+    test write excel test_new.xlsx, which is modified by another process.
+    """
+
+    ROW = {"name": "shaobo", "sex": "male", "age": 17}
+    OTHER_ROW = {"name": "xiaohong", "sex": "female", "age": 18}
+
+    def teardown_method(self):
+        """remove the writing test file and its lock file."""
+        for filename in (self.FILE_WRITE, f"{self.FILE_WRITE}.lock"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    setup_method = teardown_method
+
+    def _modify(self):
+        """modify the file as another process does."""
+        wb = load_workbook(self.FILE_WRITE)
+        wb[self.SHEET1.name].append(list(self.OTHER_ROW.values()))
+        wb.save(self.FILE_WRITE)
+
+    def test_no_conflict(self):
+        shutil.copy(self.FILE_EXISTED, self.FILE_WRITE)
+        with WorkSheet(
+            self.FILE_WRITE, self.SHEET1.name, process_safe=True
+        ) as ws:
+            ws.append(self.ROW)
+        with WorkSheet(self.FILE_WRITE, self.SHEET1.name) as ws:
+            assert list(ws.to_dict()) == self.SHEET1.values + [self.ROW]
+
+    def test_conflict_raise(self):
+        shutil.copy(self.FILE_EXISTED, self.FILE_WRITE)
+        conflicts = WorkSheet.lock_stats()["conflicts"]
+        with pytest.raises(WorkBookConflictError):
+            with WorkSheet(
+                self.FILE_WRITE, self.SHEET1.name, process_safe=True
+            ) as ws:
+                ws.append(self.ROW)
+                self._modify()
+        assert WorkSheet.lock_stats()["conflicts"] == conflicts + 1
+        with WorkSheet(self.FILE_WRITE, self.SHEET1.name) as ws:
+            assert list(ws.to_dict()) == self.SHEET1.values + [self.OTHER_ROW]
+
+    def test_conflict_merge(self):
+        shutil.copy(self.FILE_EXISTED, self.FILE_WRITE)
+        merged = WorkSheet.lock_stats()["merged"]
+        with WorkSheet(
+            self.FILE_WRITE,
+            self.SHEET1.name,
+            process_safe=True,
+            on_conflict="merge",
+        ) as ws:
+            ws.append(self.ROW)
+            ws.set_col_style("A", {"width": 49})
+            self._modify()
+        assert WorkSheet.lock_stats()["merged"] == merged + 1
+        with WorkSheet(self.FILE_WRITE, self.SHEET1.name) as ws:
+            assert list(ws.to_dict()) == self.SHEET1.values + [
+                self.OTHER_ROW,
+                self.ROW,
+            ]
+            assert ws.ws.column_dimensions["A"].width == 49
+
+    def test_conflict_overwrite(self):
+        shutil.copy(self.FILE_EXISTED, self.FILE_WRITE)
+        with WorkSheet(
+            self.FILE_WRITE,
+            self.SHEET1.name,
+            process_safe=True,
+            on_conflict="overwrite",
+        ) as ws:
+            ws.append(self.ROW)
+            self._modify()
+        with WorkSheet(self.FILE_WRITE, self.SHEET1.name) as ws:
+            assert list(ws.to_dict()) == self.SHEET1.values + [self.ROW]
+
+    def test_lock_timeout(self):
+        shutil.copy(self.FILE_EXISTED, self.FILE_WRITE)
+        stats = WorkSheet.lock_stats()
+        with _FileLock(self.FILE_WRITE).exclusive():
+            with pytest.raises(TimeoutError):
+                WorkSheet(
+                    self.FILE_WRITE,
+                    self.SHEET1.name,
+                    process_safe=True,
+                    lock_timeout=0.05,
+                )
+        assert WorkSheet.lock_stats()["contended"] == stats["contended"] + 1
+        assert WorkSheet.lock_stats()["timeouts"] == stats["timeouts"] + 1
+
+    def test_processes(self):
+        shutil.copy(self.FILE_EXISTED, self.FILE_WRITE)
+        rows = [{"name": f"p{i}", "sex": "male", "age": i} for i in range(4)]
+        processes = [
+            multiprocessing.Process(
+                target=_append_process_safe,
+                args=(self.FILE_WRITE, self.SHEET1.name, row),
+            )
+            for row in rows
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            assert process.exitcode == 0
+        with WorkSheet(self.FILE_WRITE, self.SHEET1.name) as ws:
+            res = list(ws.to_dict())
+        assert res[: len(self.SHEET1.values)] == self.SHEET1.values
+        assert sorted(res[len(self.SHEET1.values) :], key=str) == sorted(
+            rows, key=str
+        )
+
+
 class TestExcelSetStyle(ExcelInit):
     def teardown_method(self):
         # remove the writing test file.
@@ -562,6 +2377,22 @@ class TestExcelSetStyle(ExcelInit):
             assert ws.ws["B2"].font.color.rgb == style[1]["color"]
             assert ws.ws["C2"].font.color.rgb == style[2]["color"]
 
+    def test_extend_with_seq_style(self):
+        style = [
+            {"size": 15, "color": "00FF00FF"},
+            {},
+            {"size": 35, "color": "00CCFFCC"},
+        ]
+        with WorkSheet(self.FILE_WRITE, self.SHEET2.name) as ws:
+            ws.extend(self.SHEET1.values, style=style)
+        with WorkSheet(self.FILE_WRITE, self.SHEET2.name) as ws:
+            for row in (1, 4):
+                assert ws.ws[f"A{row}"].font.size == style[0]["size"]
+                assert ws.ws[f"A{row}"].font.color.rgb == style[0]["color"]
+                assert ws.ws[f"B{row}"].has_style is False
+                assert ws.ws[f"C{row}"].font.size == style[2]["size"]
+                assert ws.ws[f"C{row}"].font.color.rgb == style[2]["color"]
+
     def test_set_col_before_style(self):
         before_style = {"A": {"width": 49}}
         with WorkSheet(
@@ -586,12 +2417,26 @@ class TestExcelSetStyle(ExcelInit):
             )
 
     def test_set_row_before_style(self):
-        # todo, the code is not finished.
-        pass
+        before_style = {2: {"height": 30, "bold": True}}
+        with WorkSheet(
+            self.FILE_WRITE, self.SHEET2.name, before_styled=before_style
+        ) as ws:
+            ws.append({"name": "shaobo", "sex": "male", "age": 19})
+        with WorkSheet(self.FILE_WRITE, self.SHEET2.name) as ws:
+            assert ws.ws.row_dimensions[2].height == 30
+            assert ws.ws.row_dimensions[2].font.b
+            assert ws.ws["A2"].font.b
 
     def test_set_row_after_style(self):
-        # todo, the code is not finished.
-        pass
+        after_style = {2: {"height": 30, "fgColor": "00EEEEEE"}}
+        with WorkSheet(
+            self.FILE_WRITE, self.SHEET2.name, after_styled=after_style
+        ) as ws:
+            ws.append({"name": "shaobo", "sex": "male", "age": 19})
+        with WorkSheet(self.FILE_WRITE, self.SHEET2.name) as ws:
+            assert ws.ws.row_dimensions[2].height == 30
+            assert ws.ws.row_dimensions[2].fill.fgColor.rgb == "00EEEEEE"
+            assert ws.ws["C2"].fill.fgColor.rgb == "00EEEEEE"
 
     def test_set_cell(self):
         style = {"color": "0033CCCC", "size": 50}
@@ -607,47 +2452,339 @@ class TestExcelSetStyle(ExcelInit):
             assert ws.ws["A2"].font.color.rgb == style["color"]
 
 
+class TestExcelRowStyle(ExcelInit):
+    """
+    test style the rows by the row dimensions.
+    """
+
+    GREY = "00EEEEEE"
+    STYLE = {
+        "height": 30,
+        "hidden": True,
+        "outline_level": 1,
+        "bold": True,
+        "fgColor": GREY,
+        "fill_type": "solid",
+        "horizontal": "center",
+    }
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {},
+            {"write_only": True},
+            {"write_only": True, "engine": "native"},
+        ],
+        ids=["full", "write_only", "native"],
+    )
+    @pytest.mark.parametrize("method", ["append", "extend"])
+    def test_row_dimensions(self, tmp_path, kwargs, method):
+        filename = str(tmp_path / "rows.xlsx")
+        ws = WorkSheet(filename, **kwargs)
+        ws.set_row_style(2, self.STYLE)
+        rows = [
+            ["name", "date", "amount"],
+            ["xiaomi", datetime.date(2020, 1, 1), None],
+            ["lulu", None, 1],
+        ]
+        if method == "append":
+            ws.append(rows[0])
+            ws.append(rows[1], style=[{"italic": True}])
+            ws.append(rows[2])
+        else:
+            ws.extend(rows[:1])
+            ws.extend(rows[1:2], style=[{"italic": True}])
+            ws.extend(rows[2:])
+        ws.close()
+
+        wb = load_workbook(filename)
+        sheet = wb[self.SHEET1.name]
+        dim = sheet.row_dimensions[2]
+        assert (dim.height, dim.hidden, dim.outline_level) == (30, True, 1)
+        assert dim.font.b and dim.fill.fgColor.rgb == self.GREY
+        assert dim.alignment.horizontal == "center"
+        # the cell styled itself is kept.
+        assert sheet["A2"].font.i and not sheet["A2"].font.b
+        # the cell without a style shares the row's, with its number format.
+        assert sheet["B2"].font.b and sheet["B2"].fill.fgColor.rgb == self.GREY
+        assert sheet["B2"].value == datetime.datetime(2020, 1, 1)
+        assert sheet["B2"].is_date
+        # the empty cell is styled by the row in the excel.
+        assert sheet["C2"].value is None and not sheet["C2"].has_style
+        assert not sheet.row_dimensions[3].hidden
+        assert not sheet["A3"].has_style
+        wb.close()
+
+    def test_invalid(self, tmp_path):
+        with WorkSheet(str(tmp_path / "rows.xlsx")) as ws:
+            with pytest.raises(ValueError):
+                ws.set_row_style(1, {"width": 10})
+            with pytest.raises(ValueError):
+                ws.set_row_style(1, {"height": "10"})
+            with pytest.raises(ValueError):
+                ws.set_row_style(1, {"outline_level": 8})
+            with pytest.raises(TypeError):
+                ws.set_row_style(1, [{"bold": True}])
+
+    @pytest.mark.parametrize("engine", ["openpyxl", "native"])
+    @pytest.mark.parametrize("method", ["append", "extend"])
+    def test_appended_in_write_only(self, tmp_path, engine, method):
+        filename = str(tmp_path / "rows.xlsx")
+        with WorkSheet(filename, write_only=True, engine=engine) as ws:
+            if method == "append":
+                ws.append(["name", "sex", "age"])
+                ws.append(["lulu", "male", 17])
+            else:
+                ws.extend([["name", "sex", "age"], ["lulu", "male", 17]])
+            for row_idx in (1, 2):
+                with pytest.raises(ValueError):
+                    ws.set_row_style(row_idx, self.STYLE)
+            ws.set_row_style(3, self.STYLE)
+            ws.append(["xiaomi", "female", 18])
+        wb = load_workbook(filename)
+        sheet = wb[self.SHEET1.name]
+        assert not sheet.row_dimensions[2].hidden
+        assert sheet.row_dimensions[3].hidden and sheet["A3"].font.b
+        wb.close()
+
+
+class TestExcelStyleRule(ExcelInit):
+    """
+    test style the cells in bulk by the rules while saving.
+    """
+
+    RED = "00FF0000"
+    GREY = "00EEEEEE"
+    ROWS = [["a", 1, -1], ["b", 2, 3], ["c", 3, "x"], ["d", 4, -5]]
+
+    def _write(self, filename, rules, style=None, **kwargs):
+        with WorkSheet(filename, **kwargs) as ws:
+            ws.append(["name", "id", "amount"])
+            for row in self.ROWS:
+                ws.append(row, style=style)
+            for rule in rules:
+                ws.add_style_rule(*rule[:1], **rule[1])
+        return filename
+
+    def _rules(self, when=lambda v: v < 0):
+        return [
+            ({"bold": True}, {"rows": "header"}),
+            ({"fgColor": self.GREY}, {"rows": slice(3, None, 2)}),
+            ({"color": self.RED}, {"cols": "C", "when": when}),
+        ]
+
+    def test_apply(self, tmp_path):
+        filename = self._write(
+            str(tmp_path / "rules.xlsx"), self._rules(), style={"italic": True}
+        )
+        wb = load_workbook(filename)
+        ws = wb[self.SHEET1.name]
+        assert [cell.font.b for cell in ws[1]] == [True] * 3
+        for row in range(2, 6):
+            fills = {ws.cell(row, col).fill.fgColor.rgb for col in (1, 2, 3)}
+            assert fills == ({self.GREY} if row % 2 else {"00000000"})
+            for col in (1, 2, 3):
+                cell = ws.cell(row, col)
+                # the style of the append is kept.
+                assert cell.font.i
+                red = col == 3 and row in (2, 5)
+                assert (cell.font.color and cell.font.color.rgb) == (
+                    self.RED if red else None
+                )
+        assert not ws.conditional_formatting
+        wb.close()
+
+    def test_cells_styled(self, tmp_path):
+        ws = WorkSheet(str(tmp_path / "rules.xlsx"), instrument=True)
+        ws.extend(self.ROWS)
+        ws.add_style_rule({"bold": True}, cols="A:B")
+        ws.add_style_rule({"bold": True}, cols="C", when=bool)
+        ws.close()
+        assert ws.stats["cells_styled"] == 6 + 3
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {},
+            {"write_only": True},
+            {"write_only": True, "engine": "native"},
+        ],
+    )
+    def test_conditional(self, tmp_path, kwargs):
+        filename = self._write(
+            str(tmp_path / "rules.xlsx"), self._rules(when="C2<0"), **kwargs
+        )
+        wb = load_workbook(filename)
+        ws = wb[self.SHEET1.name]
+        rules = {
+            str(cf.sqref): (rule.formula, rule.dxf)
+            for cf in ws.conditional_formatting
+            for rule in cf.rules
+        }
+        if kwargs:
+            header, stripes = rules["A1:C1"], rules["A3:C5"]
+            assert header[0] == ["TRUE"] and header[1].font.b
+            assert stripes[0] == ["AND(MOD(ROW()-3,2)=0,TRUE)"]
+            assert stripes[1].fill.bgColor.rgb == self.GREY
+            assert ws["A1"].font.b is False
+        else:
+            assert set(rules) == {"C2:C5"}
+            assert ws["A1"].font.b
+        formula, dxf = rules["C2:C5"]
+        assert formula == ["C2<0"] and dxf.font.color.rgb == self.RED
+        assert [list(row) for row in ws.iter_rows(values_only=True)] == [
+            ["name", "id", "amount"]
+        ] + self.ROWS
+        wb.close()
+
+    def test_invalid(self, tmp_path):
+        filename = str(tmp_path / "rules.xlsx")
+        with WorkSheet(filename) as ws:
+            with pytest.raises(ValueError):
+                ws.add_style_rule({"width": 10})
+            with pytest.raises(ValueError):
+                ws.add_style_rule({"bold": True}, cols="A:1")
+            with pytest.raises(ValueError):
+                ws.add_style_rule({"bold": True}, rows=0)
+            with pytest.raises(TypeError):
+                ws.add_style_rule({"bold": True}, when=1)
+        with WorkSheet(filename + ".xlsx", write_only=True) as ws:
+            with pytest.raises(ValueError):
+                ws.add_style_rule({"bold": True}, when=bool)
+        with WorkSheet(self.FILE_READ, read_only=True) as ws:
+            with pytest.raises(ReadOnlyWorkbookException):
+                ws.add_style_rule({"bold": True})
+
+
+class TestExcelAutofit(ExcelInit):
+    """
+    test fit the col widths to the values appended.
+    """
+
+    ROWS = [
+        ["name", "city", "amount"],
+        ["xiaomi", "北京市海淀区", 1.5],
+        ["a", "line\nthe longest line", 123456789],
+    ]
+
+    def _widths(self, filename):
+        wb = load_workbook(filename)
+        dims = wb[self.SHEET1.name].column_dimensions
+        widths = {col: dims[col].width for col in "ABCD"}
+        wb.close()
+        return widths
+
+    @pytest.mark.parametrize(
+        "kwargs", [{}, {"write_only": True, "engine": "native"}]
+    )
+    @pytest.mark.parametrize("method", ["append", "append_dict", "extend"])
+    def test_widths(self, tmp_path, kwargs, method):
+        filename = str(tmp_path / "autofit.xlsx")
+        with WorkSheet(filename, autofit=True, **kwargs) as ws:
+            if method == "append":
+                for row in self.ROWS:
+                    ws.append(row)
+            elif method == "append_dict":
+                # the headers row is appended by the first dict.
+                for row in self.ROWS[1:]:
+                    ws.append(dict(zip(self.ROWS[0], row)))
+            else:
+                ws.extend(self.ROWS)
+        widths = self._widths(filename)
+        # the CJK char is 2, and the longest line of the multiline str.
+        assert widths["A"] == len("xiaomi") + 2
+        assert widths["B"] == len("the longest line") + 2
+        assert widths["C"] == len("123456789") + 2
+        assert widths["D"] == 13
+
+    def test_width(self):
+        width = _ColumnWidths.width
+        assert width("北京abc") == 7
+        assert width(True) == 5
+        assert width(1 / 3) == 11
+        assert width(datetime.date(2020, 1, 1)) == 10
+        widths = _ColumnWidths()
+        widths.update(["x" * 300, None])
+        assert widths.widths == [300, 0]
+
+    def test_set_col_style_kept(self, tmp_path):
+        filename = str(tmp_path / "autofit.xlsx")
+        with WorkSheet(filename, autofit=True) as ws:
+            ws.extend(self.ROWS)
+            ws.set_col_style("B", {"width": 40})
+        widths = self._widths(filename)
+        assert widths["A"] == 8 and widths["B"] == 40
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            WorkSheet(self.FILE_READ, autofit=True, read_only=True)
+        with pytest.raises(ValueError):
+            WorkSheet(self.FILE_READ, autofit=True, write_only=True)
+
+
+class TestExcelStyleCache(ExcelInit):
+    def teardown_method(self):
+        # remove the writing test file.
+        if os.path.exists(self.FILE_WRITE):
+            os.remove(self.FILE_WRITE)
+        CellStyler.CACHE.clear()
+
+    setup_method = teardown_method
+
+    def test_shared_style(self):
+        style = {"size": 15, "color": "00FF00FF"}
+        with WorkSheet(self.FILE_WRITE, self.SHEET2.name) as ws:
+            ws.append(["name", "sex", "age"], style=style)
+            ws.append(["shaobo", "male", 16], style=dict(style))
+            assert CellStyler.CACHE.misses == 1
+            assert CellStyler.CACHE.hits == 5
+        with WorkSheet(self.FILE_WRITE, self.SHEET2.name) as ws:
+            assert ws.ws["C2"].font.size == style["size"]
+            assert ws.ws["C2"].font.color.rgb == style["color"]
+
+    def test_eviction(self):
+        cache = _StyleCache(maxsize=2)
+        for size in (1, 2, 1, 3):
+            cache.get({"size": size}, CellStyler._build)
+        assert len(cache) == 2
+        assert (cache.hits, cache.misses) == (1, 3)
+        # the size 2 is the least recently used one.
+        cache.get({"size": 2}, CellStyler._build)
+        assert cache.misses == 4
+
+    def test_disabled(self):
+        cache = _StyleCache(maxsize=0)
+        cache.get({"size": 1}, CellStyler._build)
+        cache.get({"size": 1}, CellStyler._build)
+        assert len(cache) == 0
+        assert cache.misses == 2
+
+
 class TestExcelValidator(ExcelInit):
     pass
 
 
-abcd
-
 class TestExcelMixin(_WorkSheetMixin):
     def test_gen_col_name(self):
-        expected = [
-            "A",
-            "B",
-            "C",
-            "D",
-            "E",
-            "F",
-            "G",
-            "H",
-            "I",
-            "J",
-            "K",
-            "L",
-            "M",
-            "N",
-            "O",
-            "P",
-            "Q",
-            "R",
-            "S",
-            "T",
-            "U",
-            "V",
-            "W",
-            "X",
-            "Y",
-            "Z",
-        ]
-        # the A-Z will passed, but the next will raise a ValueError
+        expected = {
+            1: "A",
+            2: "B",
+            26: "Z",
+            27: "AA",
+            52: "AZ",
+            53: "BA",
+            702: "ZZ",
+            703: "AAA",
+            MAX_COL: "XFD",
+        }
+        col_names = []
+        # the A-XFD will passed, but the next will raise a ValueError
         with pytest.raises(
             ValueError,
-            match="The col nums is too big, which supported only A-Z!",
+            match="The col nums is too big, which supported only A-XFD!",
         ):
-            for i, col_name in enumerate(self._gen_col_name()):
-                assert col_name == expected[i]
-
+            for col_name in self._gen_col_name():
+                col_names.append(col_name)
+        assert len(col_names) == MAX_COL
+        for col_idx, col_name in expected.items():
+            assert col_names[col_idx - 1] == col_name